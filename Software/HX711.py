@@ -1,18 +1,128 @@
 #!/usr/bin/env python3
 import time
+from array import array
 from gpiozero import DigitalInputDevice, DigitalOutputDevice
 
+# Zusatzpulse nach den 24 Datenbits -> Kanal und Verstärkung der NÄCHSTEN Wandlung
+GAIN_PULSES = {("A", 128): 1, ("B", 32): 2, ("A", 64): 3}
+
+
+def gain_pulses(channel, gain):
+    try:
+        return GAIN_PULSES[(channel, gain)]
+    except KeyError:
+        raise ValueError(f"Kanal {channel} mit Gain {gain} gibt es nicht (A: 128 oder 64, B: 32)")
+
+
+class GpiozeroBackend:
+    """
+    Standard-Backend: taktet über die gpiozero-Devices (on/off/value).
+    Jeder Aufruf läuft durch die komplette Device-Logik von gpiozero.
+    """
+    def __init__(self, dout, sck):
+        self.dout = dout
+        self.sck = sck
+
+    def shift_in(self, pulses=1):
+        count = 0
+        # 24 Bit einlesen
+        for _ in range(24):
+            self.sck.on()
+            count <<= 1
+            self.sck.off()
+            if self.dout.value:
+                count += 1
+
+        # 25. bis 27. Puls: Gain und Kanal für die nächste Wandlung
+        for _ in range(pulses):
+            self.sck.on()
+            time.sleep(0.0001)
+            self.sck.off()
+        return count
+
+
+class FastBackend:
+    """
+    Schlankes Backend: setzt/liest die Pins direkt über die Pin-Objekte.
+    Die Funktionen werden einmal gebunden, in der Bit-Schleife gibt es
+    keine Attribut-Lookups mehr.
+    """
+    def __init__(self, dout, sck):
+        self.dout = dout
+        self.sck = sck
+        self._set_sck = sck.pin._set_state
+        self._get_dout = dout.pin._get_state
+
+    def shift_in(self, pulses=1):
+        set_sck = self._set_sck
+        get_dout = self._get_dout
+        count = 0
+        for _ in range(24):
+            set_sck(1)
+            set_sck(0)
+            count = (count << 1) | get_dout()
+        # Zusatzpulse ohne sleep: SCK darf max. 60 µs high sein,
+        # sonst geht der HX711 in den Power-Down.
+        for _ in range(pulses):
+            set_sck(1)
+            set_sck(0)
+        return count
+
+
+class MultiFastBackend:
+    """
+    Wie FastBackend, aber für mehrere HX711 an einer gemeinsamen SCK-Leitung:
+    nach jeder Taktflanke werden alle DOUT-Leitungen gelesen.
+    """
+    def __init__(self, douts, sck):
+        self.douts = douts
+        self.sck = sck
+        self._set_sck = sck.pin._set_state
+        self._get_douts = [dout.pin._get_state for dout in douts]
+
+    def shift_in(self, pulses=1):
+        set_sck = self._set_sck
+        getters = self._get_douts
+        # Während des Taktens nur die Bits sammeln, zusammengesetzt wird danach
+        bits = []
+        append = bits.append
+        for _ in range(24):
+            set_sck(1)
+            set_sck(0)
+            for get in getters:
+                append(get())
+        for _ in range(pulses):
+            set_sck(1)
+            set_sck(0)
+        chips = len(getters)
+        counts = []
+        for j in range(chips):
+            count = 0
+            for bit in bits[j::chips]:
+                count = (count << 1) | bit
+            counts.append(count)
+        return counts
+
+
 class HX711:
-    def __init__(self, dout_pin, sck_pin, reference_unit=1, readings=1):
+    def __init__(self, dout_pin, sck_pin, reference_unit=1, readings=1, backend=GpiozeroBackend,
+                 channel="A", gain=128):
         """
         readings=1 -> Keine Mittelung, so hast du jeden einzelnen Messwert direkt.
+        backend    -> Klasse für das Bit-Banging (GpiozeroBackend oder FastBackend).
+        channel/gain -> "A" mit 128 oder 64, "B" mit 32. Gilt ab der zweiten Wandlung,
+                      nach dem Reset wandelt der Chip immer auf A mit 128.
         """
         # Auf dem Pi 5: kein interner Pull-up
         self.dout = DigitalInputDevice(dout_pin, pull_up=False)
         self.sck = DigitalOutputDevice(sck_pin, initial_value=False)
+        self.backend = backend(self.dout, self.sck)
+        self.pulses = gain_pulses(channel, gain)
         self.reference_unit = reference_unit
         self.offset = 0
         self.readings = readings
+        self.timeouts = 0    # read() ohne Data ready innerhalb von 0.5 s
+        self.zero_reads = 0  # Rohwert genau 0 (meist Leitung offen oder Timeout)
         self.reset()
         
     def reset(self):
@@ -30,35 +140,60 @@ class HX711:
         # Warte, bis DOUT auf LOW geht (Data ready), max. 0.5s
         if not self.dout.wait_for_inactive(timeout=0.5):
             # Timeout -> keine neuen Daten
+            self.timeouts += 1
             return 0
-        
-        count = 0
-        # 24 Bit einlesen
-        for _ in range(24):
-            self.sck.on()
-            count <<= 1
-            self.sck.off()
-            if self.dout.value:
-                count += 1
-        
-        # 25. Puls (Gain und Kanal bleiben hier auf Standard)
-        self.sck.on()
-        time.sleep(0.0001)
-        self.sck.off()
-        
+        return self.read_now()
+
+    def read_now(self):
+        """
+        Liest sofort einen Rohwert, ohne auf DOUT zu warten.
+        Nur aufrufen, wenn bekannt ist, dass Daten bereitstehen.
+        """
+        count = self.backend.shift_in(self.pulses)
+        if count == 0:
+            self.zero_reads += 1
         # 2er-Komplement
         if count & 0x800000:
             count -= 0x1000000
         return count
-        
+
+    def read_many(self, n, out=None):
+        """
+        Liest n Rohwerte am Stück in einen vorab angelegten Puffer.
+        out kann ein array('l') oder ein NumPy-Array sein, sonst wird
+        ein array('l') der Länge n angelegt.
+        """
+        if out is None:
+            out = array('l', bytes(n * array('l').itemsize))
+        wait = self.dout.wait_for_inactive
+        shift_in = self.backend.shift_in
+        pulses = self.pulses
+        for i in range(n):
+            if not wait(timeout=0.5):
+                self.timeouts += 1
+                out[i] = 0
+                continue
+            count = shift_in(pulses)
+            if count == 0:
+                self.zero_reads += 1
+            if count & 0x800000:
+                count -= 0x1000000
+            out[i] = count
+        return out
+
     def read_average(self, readings=None):
-        """Mittelwert über 'readings'-Messungen."""
+        """Mittelwert über 'readings'-Messungen. Timeouts zählen nicht mit."""
         if readings is None:
             readings = self.readings
         total = 0
+        valid = 0
         for _ in range(readings):
-            total += self.read()
-        return total / readings
+            timeouts = self.timeouts
+            value = self.read()
+            if self.timeouts == timeouts:
+                total += value
+                valid += 1
+        return total / valid if valid else self.offset
         
     def get_value(self, readings=None):
         """Offset-korrigierter Wert."""
@@ -78,23 +213,121 @@ class HX711:
     def set_reference_unit(self, reference_unit):
         self.reference_unit = reference_unit
 
+    def set_gain(self, channel="A", gain=128):
+        """Kanal/Gain ab der übernächsten Wandlung (die Pulse gehen beim nächsten Auslesen raus)."""
+        self.pulses = gain_pulses(channel, gain)
+
+
+class MultiHX711:
+    """
+    Mehrere HX711 an einer gemeinsamen SCK-Leitung. Jede Taktflanke liest alle
+    DOUT-Leitungen, N Chips kosten damit etwa so viel Zeit wie einer, und die
+    Werte eines Auslesens gehören zur selben Wandlung.
+
+    modes: Liste von (Kanal, Gain), z.B. [("A", 128), ("B", 32)]. Die Zusatzpulse
+    gehen über die gemeinsame SCK an alle Chips, eine Einstellung gilt also immer
+    für alle Chips zugleich. Mehrere Einstellungen werden nacheinander gefahren:
+    dwell gültige Wandlungen pro Einstellung, nach jedem Wechsel werden settle
+    Wandlungen verworfen (Einschwingzeit laut Datenblatt 4 Perioden).
+    """
+    def __init__(self, dout_pins, sck_pin, modes=(("A", 128),), dwell=8, settle=4,
+                 backend=MultiFastBackend):
+        # Auf dem Pi 5: kein interner Pull-up
+        self.douts = [DigitalInputDevice(pin, pull_up=False) for pin in dout_pins]
+        self.sck = DigitalOutputDevice(sck_pin, initial_value=False)
+        self.backend = backend(self.douts, self.sck)
+        self.modes = [tuple(mode) for mode in modes]
+        self._pulses = [gain_pulses(*mode) for mode in self.modes]
+        self.dwell = dwell
+        self.settle = settle
+        self.timeouts = 0
+        self.discarded = 0  # verworfene Wandlungen (Einschwingen nach Wechsel)
+        self.reset()
+
+    @property
+    def chips(self):
+        return len(self.douts)
+
+    def reset(self):
+        """Setzt alle HX711 zurück, danach wandeln sie auf Kanal A mit Gain 128."""
+        self.sck.on()
+        time.sleep(0.0006)
+        self.sck.off()
+        time.sleep(0.0006)
+        # Einstellung der laufenden Wandlung (None = keine der gewünschten)
+        self._active = self.modes.index(("A", 128)) if ("A", 128) in self.modes else None
+        self._valid = 0  # gültige Wandlungen seit dem letzten Wechsel
+        self._skip = 0   # noch zu verwerfende Wandlungen
+
+    def ready(self):
+        """True, wenn alle Chips Daten bereitstellen (alle DOUT LOW)."""
+        for dout in self.douts:
+            if dout.value:
+                return False
+        return True
+
+    def read(self, timeout=0.5):
+        """Wartet, bis alle Chips bereit sind, und liest sie. (None, None) bei Timeout."""
+        deadline = time.monotonic() + timeout
+        for dout in self.douts:
+            if not dout.wait_for_inactive(timeout=max(0.0, deadline - time.monotonic())):
+                self.timeouts += 1
+                return None, None
+        return self.read_now()
+
+    def read_now(self):
+        """
+        Liest alle Chips sofort. Liefert (Einstellung, [Rohwert je Chip]), die
+        Einstellung als Index in modes. Verworfene Wandlungen liefern None als Einstellung.
+        """
+        mode = self._active
+        valid = mode is not None and self._skip == 0
+        if valid:
+            self._valid += 1
+        elif self._skip:
+            self._skip -= 1
+        next_mode = mode
+        if mode is None:
+            next_mode = 0
+        elif len(self.modes) > 1 and self._valid >= self.dwell:
+            next_mode = (mode + 1) % len(self.modes)
+        if next_mode != mode:
+            self._valid = 0
+            self._skip = self.settle
+        counts = self.backend.shift_in(self._pulses[next_mode])
+        self._active = next_mode
+        # 2er-Komplement
+        values = [count - 0x1000000 if count & 0x800000 else count for count in counts]
+        if not valid:
+            self.discarded += 1
+            return None, values
+        return mode, values
+
+    def close(self):
+        for dout in self.douts:
+            dout.close()
+        self.sck.close()
+
 
 def main():
     try:
         dout_pin = 5
         sck_pin = 6
-        hx = HX711(dout_pin, sck_pin, reference_unit=420.0, readings=1)
+        # Digits pro N aus dem aktiven Kraftaufnehmer-Profil (calibration.py)
+        from calibration import ProfileStore
+        profile = ProfileStore().get()
+        hx = HX711(dout_pin, sck_pin, reference_unit=1 / profile.scale, readings=1)
         
         print("Stelle sicher, dass keine Last aufliegt.")
         input("Drücke Enter, um zu tarieren...")
-        hx.tare()
+        hx.tare(readings=16)
         print("Tarierung abgeschlossen.")
         
         print("Starte Messung bei ~3 Hz (alle 0,33s). Strg+C zum Beenden...")
         while True:
             # Lies 1 Messung vom HX711
             weight = hx.get_weight()
-            print(f"Gewicht: {weight:.2f}")
+            print(f"Kraft: {weight:.2f} N")
             # Warte 0,33s => ~3 Hz
             time.sleep(0.33)
     except KeyboardInterrupt:
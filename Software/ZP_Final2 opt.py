@@ -1,122 +1,163 @@
+import time
+_T_START = time.perf_counter()  # Startzeiten (startup.py) zählen ab hier
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import tkinter as tk
 import sys
-import threading
-import time
 import os
-from HX711 import HX711
-from gpiozero import PWMOutputDevice, DigitalOutputDevice
+import threading
+from display import DisplayRenderer
+from liveplot import LivePlot
+from startup import StartupReport, hardware_ready, format_entry
+_T_IMPORTED = time.perf_counter()
+# Erst nach dem ersten Bild bzw. bei Bedarf geladen: service, zugpruefmaschine (--ein-prozess),
+# stream_server (--stream), catalog, metrics (Diagnose)
 
 
 class ZugpruefmaschineGUI:
-    def __init__(self, root):
+    def __init__(self, root, machine=None):
         self.root = root
         self.root.attributes('-fullscreen', True)
         self.root.title("Zugprüfmaschine Touch-Steuerung")
+        self.startup = StartupReport(_T_START)
+        self.startup.mark("import", _T_IMPORTED)
 
         # ------------------------------------------
-        # 1) Initialisierung HX711
-        # ------------------------------------------
-        self.hx = HX711(dout_pin=5, sck_pin=6, reference_unit=420.0, readings=1)
-        self.hx.tare()
-
-        # Kraftanzeige-Variablen
-        self.current_force = 0.0
-        self.force_value_var = tk.StringVar(value="Kraft: 0.00 N")
-        self.max_force_value = 0.0
-        self.max_force_var = tk.StringVar(value="Max: 0.00 N")
-
-        # Für den Filter:
-        self.last_valid_force = None
-        self.candidate_count = 0
-        self.candidate_sum = 0.0
-
-        # ------------------------------------------
-        # 2) Initialisierung Schrittmotor
-        # ------------------------------------------
-        self.step_pin = 18
-        self.dir_pin = 19
-        self.enable_pin = 26
-        self.step = DigitalOutputDevice(self.step_pin, active_high=True, initial_value=False)
-        self.dir = DigitalOutputDevice(self.dir_pin, active_high=True, initial_value=False)
-        self.enable = DigitalOutputDevice(self.enable_pin, active_high=True, initial_value=False)
-
-        self.steps_per_rev = 1600
-        self.rotation_distance = 3.125  # mm pro Umdrehung
-        self.position = 0.0             # Aktuelle Position in mm
-
-        # ------------------------------------------
-        # 3) Variablen für Kraftabfall, Zuglänge, Vorschub, Logfile
+        # 1) Maschine (HX711, Schrittmotor, Messwertverarbeitung)
+        #    Standard: eigener Prozess auf CPU 3 (service.py), --ein-prozess: alles in der GUI.
+        #    Aufgebaut wird sie erst nach dem ersten Bild (start_machine), bis dahin
+        #    zeigen die Anzeigen "…" und die Statuszeile den Aufbau pro Gerät.
         # ------------------------------------------
-        self.kraft_abfall_grenze = 0
-        self.zuglaenge = 5
-        self.feed_rate = 5
-
-        # Logbase-Name (wird über das GUI-Entry gesetzt)
+        self.machine = None
+        self._given_machine = machine
+        self._built_machine = None   # vom Aufbau-Thread (--ein-prozess) fertig gebaut
+        self._devices = {}           # Aufbau pro Gerät, solange es noch keine Maschine gibt
+        self.startup_error = None
+        self.stream_server = None
+        self.ring = None
+        self.catalog = None
+        self.display_fps = 30
+        self.plot_seq = 0
+        self.plot_active = False
+
+        # Logbase-Name und Material (werden über die GUI-Entries gesetzt)
         self.log_base_var = tk.StringVar(value="zugversuch_log")
-
-        # Prozess-Flags
-        self.is_testing = False
-        self.process_stop_event = threading.Event()
-        self.process_thread = None
+        self.material_var = tk.StringVar(value="")
 
         # GUI aufbauen
         self.build_layout()
+        self.renderer = DisplayRenderer(self.root, fps=self.display_fps)
+        self.bind_value(self.pos_display, lambda: self.machine.motor.position_mm, "Position: {:.2f} mm")
+        self.bind_value(self.force_value, lambda: self.machine.display.force, "Kraft: {:.2f} N")
+        self.bind_value(self.max_force_label, lambda: self.machine.display.max_force, "Max: {:.2f} N")
+        self.bind_value(self.zuglaenge_label, lambda: self.machine.zuglaenge, "{} mm")
+        self.bind_value(self.feed_display, lambda: self.machine.feed_rate, "Vorschub: {} mm/min")
+        self.bind_value(self.kraft_display, lambda: self.machine.kraft_abfall_grenze, "Grenze: {} N")
+        self.bind_value(self.peak_drop_display, lambda: self.machine.abfall_vom_maximum, "Vom Maximum: {} N")
+        self.renderer.bind(self.logfile_label, lambda: self.machine.display.logfile if self.machine else "")
+        self.renderer.bind(self.tare_label, lambda: self.machine.tare_status if self.machine else "")
+        self.renderer.bind(self.device_label, self.device_text)
+        self.plot = LivePlot(self.plot_canvas, x_range=5)
+        self.renderer.on_frame(self.update_plot)
+        self.renderer.on_frame(self.poll_startup)
+        self.renderer.start()
+        self.root.after_idle(self.first_frame)
+
+    def bind_value(self, widget, getter, fmt="{}"):
+        """Wie renderer.bind, zeigt aber "…", solange die Maschine oder der Wert noch fehlt."""
+        placeholder = fmt.split("{")[0] + "…"
+
+        def text():
+            value = getter() if self.machine is not None else None
+            return fmt.format(value) if value is not None else placeholder
+        self.renderer.bind(widget, text)
 
-        # ------------------------------------------
-        # 4) Sensor-Thread: Liest den HX711 alle 0.1 s (10 Hz)
-        # ------------------------------------------
-        self.stop_event = threading.Event()
-        self.sensor_thread = threading.Thread(target=self.update_force_loop, daemon=True)
-        self.sensor_thread.start()
-
-    # Neue Methode: Ausfallsicheres Auslesen mittels Timeout, das auf das Signal des HX711 wartet
-    def read_value_with_timeout(self, timeout_ms=15):
-        start_time = time.perf_counter()  # Startzeit in Sekunden
-        timeout_sec = timeout_ms / 1000.0  # Timeout in Sekunden
-        # Warte darauf, dass der DOUT-Pin signalisiert, dass ein neuer Wert vorliegt (also LOW)
-        while self.hx.dout.value:
-            if (time.perf_counter() - start_time) > timeout_sec:
-                return None
-        return self.hx.get_value()
-
-    # Filterfunktion: Verarbeitet einen neuen Kraftwert anhand des zuletzt akzeptierten Wertes.
-    # Bei einem plötzlichen Sprung über den Schwellenwert (15 N) wird der neue Wert als Kandidat registriert.
-    # Liegen zwei aufeinanderfolgende Kandidaten innerhalb einer Toleranz von 2 N, wird der Übergang akzeptiert.
-    def filter_force(self, new_val, threshold=15.0, tolerance=2.0):
-        if self.last_valid_force is None:
-            self.last_valid_force = new_val
-            self.candidate_count = 0
-            self.candidate_sum = 0.0
-            return new_val
-        # Wenn die Differenz zum letzten gültigen Wert innerhalb des Schwellenwerts liegt, sofort übernehmen.
-        if abs(new_val - self.last_valid_force) <= threshold:
-            self.candidate_count = 0
-            self.candidate_sum = 0.0
-            self.last_valid_force = new_val
-            return new_val
+    # ------------------------------------------
+    # Start: erst das Fenster, dann die Hardware
+    # ------------------------------------------
+    def first_frame(self):
+        self.root.update_idletasks()
+        self.startup.mark("first_frame")
+        self.start_machine()
+        # Ergebniskatalog: vergibt die Lognamen und hält Parameter und Ergebnisse fest
+        from catalog import Catalog
+        self.catalog = Catalog()
+
+    def start_machine(self):
+        """Startet den Aufbau der Maschine, ohne auf die Hardware zu warten."""
+        from service import MachineClient
+        if self._given_machine is not None:
+            self.attach_machine(self._given_machine)
+            self.machine.start()
+        elif "--ein-prozess" in sys.argv:
+            threading.Thread(target=self._build_local_machine, daemon=True).start()
         else:
-            # Neuer Messwert unterscheidet sich deutlich vom letzten gültigen.
-            if self.candidate_count == 0:
-                # Ersten Kandidaten speichern und alten Wert anzeigen.
-                self.candidate_count = 1
-                self.candidate_sum = new_val
-                return self.last_valid_force
-            elif self.candidate_count == 1:
-                # Zweiter Kandidat: Prüfen, ob beide Kandidaten innerhalb der Toleranz liegen.
-                if abs(new_val - self.candidate_sum) <= tolerance:
-                    # Übergang akzeptieren: Mittelwert der Kandidaten berechnen.
-                    filtered = (self.candidate_sum + new_val) / 2.0
-                    self.last_valid_force = filtered
-                    self.candidate_count = 0
-                    self.candidate_sum = 0.0
-                    return filtered
-                else:
-                    # Kandidaten nicht konsistent: Ausreißer verwerfen, alten Wert beibehalten.
-                    self.candidate_count = 0
-                    self.candidate_sum = 0.0
-                    return self.last_valid_force
+            # Der Service-Prozess meldet den Aufbau pro Gerät, die Einstellungen kommen mit dem ersten Status
+            machine = MachineClient(cpu=3, priority=50)
+            machine.start(wait=False)
+            self.attach_machine(machine)
+
+    def _build_local_machine(self):
+        """Aufbau-Thread (--ein-prozess): gpiozero, HX711-Reset, Motor-Pins, Profil."""
+        def report(device, text):
+            self._devices = {**self._devices, device: text}
+        try:
+            from zugpruefmaschine import Zugpruefmaschine
+            machine = Zugpruefmaschine.from_gpio(report)
+        except Exception as e:
+            self.startup_error = f"{type(e).__name__}: {e}"
+            return
+        self._built_machine = machine
+
+    def attach_machine(self, machine):
+        """Übernimmt die Maschine im Tk-Thread und richtet den Ringpuffer für den Live-Plot ein."""
+        from service import SharedSampleRing
+        # Live-Plot liest die Messwerte aus dem Ringpuffer des Service-Prozesses,
+        # im Ein-Prozess-Betrieb aus einem eigenen Ringpuffer
+        self.ring = getattr(machine, "ring", None)
+        if self.ring is None:
+            self.ring = SharedSampleRing(size=8192)
+            machine.publisher = self.ring.publish
+        self.plot_seq = self.ring.count
+        self.machine = machine
+
+    def machine_ready(self):
+        """Maschine aufgebaut und (beim Service-Prozess) erster Status da."""
+        return self.machine is not None and getattr(self.machine, "ready", True)
+
+    def device_status(self):
+        return self.machine.device_status() if self.machine is not None else dict(self._devices)
+
+    def device_text(self):
+        error = self.startup_error or getattr(self.machine, "error", None)
+        if error:
+            return f"Hardware: Fehler: {error}"
+        status = self.device_status()
+        if not status:
+            return "Hardware startet..."
+        return "   ".join(f"{device}: {text}" for device, text in status.items())
+
+    def poll_startup(self):
+        """Bei jedem Bild: fertig gebaute Maschine übernehmen, Startzeiten festhalten."""
+        if self.machine is None and self._built_machine is not None:
+            self.attach_machine(self._built_machine)
+            self.machine.start()
+        if not self.machine_ready():
+            return
+        if self.stream_server is None and "--stream" in sys.argv and hasattr(self.machine, "ring"):
+            # --stream: Live-Daten per TCP (Port 8765) für Dashboards, nur mit Service-Prozess
+            from stream_server import StreamServer
+            self.stream_server = StreamServer(self.machine.ring, self.machine.motor.mm_per_step,
+                                              recording=self.current_recording, host="0.0.0.0").start()
+        if not self.startup.saved and hardware_ready(self.device_status(), self.machine.tare_status):
+            self.startup.mark("hardware_ready")
+            self.save_startup_report()
+
+    def save_startup_report(self):
+        entry = self.startup.save(mode="ein-prozess" if "--ein-prozess" in sys.argv else "service")
+        if entry is not None and "--startup-report" in sys.argv:
+            print(format_entry(entry))
+            self.exit_app()
 
     # ------------------------------------------
     # GUI Layout
@@ -132,12 +173,16 @@ class ZugpruefmaschineGUI:
         self.pos_display = ttk.Label(display_frame, text="Position: 0.00 mm", font=("Helvetica", 24))
         self.pos_display.pack(side='left', padx=40)
 
-        self.force_value = ttk.Label(display_frame, textvariable=self.force_value_var, font=("Helvetica", 24))
+        self.force_value = ttk.Label(display_frame, text="Kraft: 0.00 N", font=("Helvetica", 24))
         self.force_value.pack(side='left', padx=40)
 
-        self.max_force_label = ttk.Label(display_frame, textvariable=self.max_force_var, font=("Helvetica", 24))
+        self.max_force_label = ttk.Label(display_frame, text="Max: 0.00 N", font=("Helvetica", 24))
         self.max_force_label.pack(side='left', padx=40)
 
+        # Kraft-Weg-Kurve des laufenden Versuchs, grau darunter der vorherige
+        self.plot_canvas = tk.Canvas(frame, height=260, background="#222222", highlightthickness=0)
+        self.plot_canvas.pack(fill='x', pady=5)
+
         # Mittlerer Bereich: Position steuern und Zuglänge einstellen
         control_row = ttk.Frame(frame)
         control_row.pack(fill='x', pady=10)
@@ -159,7 +204,7 @@ class ZugpruefmaschineGUI:
         zug_frame = ttk.LabelFrame(control_row, text="Zuglänge", padding=20)
         zug_frame.pack(side='left', fill='both', expand=True, padx=10)
 
-        self.zuglaenge_label = ttk.Label(zug_frame, text=f"{self.zuglaenge} mm", font=("Helvetica", 24))
+        self.zuglaenge_label = ttk.Label(zug_frame, text="…", font=("Helvetica", 24))
         self.zuglaenge_label.pack(pady=10)
 
         zug_btn_frame = ttk.Frame(zug_frame)
@@ -178,7 +223,7 @@ class ZugpruefmaschineGUI:
         feed_frame = ttk.LabelFrame(feed_kraft_frame, text="Vorschub verstellen", padding=20)
         feed_frame.pack(side='left', fill='x', expand=True, padx=10)
 
-        self.feed_display = ttk.Label(feed_frame, text=f"Vorschub: {self.feed_rate} mm/min", font=("Helvetica", 24))
+        self.feed_display = ttk.Label(feed_frame, text="Vorschub: …", font=("Helvetica", 24))
         self.feed_display.pack(pady=10)
 
         feed_btn_frame = ttk.Frame(feed_frame)
@@ -194,7 +239,7 @@ class ZugpruefmaschineGUI:
         kraft_frame = ttk.LabelFrame(feed_kraft_frame, text="Kraftabfall-Grenze", padding=20)
         kraft_frame.pack(side='left', fill='x', expand=True, padx=10)
 
-        self.kraft_display = ttk.Label(kraft_frame, text=f"Grenze: {self.kraft_abfall_grenze} N", font=("Helvetica", 24))
+        self.kraft_display = ttk.Label(kraft_frame, text="Grenze: …", font=("Helvetica", 24))
         self.kraft_display.pack(pady=10)
 
         kraft_btn_frame = ttk.Frame(kraft_frame)
@@ -205,6 +250,18 @@ class ZugpruefmaschineGUI:
             ttk.Button(kraft_btn_frame, text=label, bootstyle=PRIMARY, width=10,
                        command=lambda d=delta: self.adjust_kraft_grenze(d)).pack(side='left', padx=10)
 
+        # Abfall vom bisherigen Maximum, eigenes Kriterium (0 = aus)
+        self.peak_drop_display = ttk.Label(kraft_frame, text="Vom Maximum: …", font=("Helvetica", 14))
+        self.peak_drop_display.pack(pady=(10, 5))
+
+        peak_drop_btn_frame = ttk.Frame(kraft_frame)
+        peak_drop_btn_frame.pack()
+
+        for delta in [-5, 5]:
+            label = f"{delta:+} N"
+            ttk.Button(peak_drop_btn_frame, text=label, bootstyle=SECONDARY, width=10,
+                       command=lambda d=delta: self.adjust_abfall_vom_maximum(d)).pack(side='left', padx=10)
+
         # Unterer Bereich: Tarieren und Log-Base Eingabe
         control_frame = ttk.Frame(frame)
         control_frame.pack(fill='x', pady=15)
@@ -212,11 +269,20 @@ class ZugpruefmaschineGUI:
         ttk.Button(control_frame, text="Tarieren", bootstyle=WARNING, width=10,
                    command=self.tare).pack(side='left', padx=10)
 
+        self.tare_label = ttk.Label(control_frame, text="", font=("Helvetica", 14))
+        self.tare_label.pack(side='left', padx=10)
+
+        ttk.Button(control_frame, text="Diagnose", bootstyle=SECONDARY, width=10,
+                   command=self.open_diagnostics).pack(side='left', padx=10)
+
         log_base_frame = ttk.Frame(control_frame)
         log_base_frame.pack(side='right', padx=10)
         ttk.Label(log_base_frame, text="Log-Base:", font=("Helvetica", 14)).pack(side='left', padx=5)
         self.log_base_entry = ttk.Entry(log_base_frame, textvariable=self.log_base_var, width=20)
         self.log_base_entry.pack(side='left', padx=5)
+        ttk.Label(log_base_frame, text="Material:", font=("Helvetica", 14)).pack(side='left', padx=5)
+        self.material_entry = ttk.Entry(log_base_frame, textvariable=self.material_var, width=12)
+        self.material_entry.pack(side='left', padx=5)
 
         # Prozessbereich
         process_frame = ttk.Frame(frame)
@@ -238,152 +304,145 @@ class ZugpruefmaschineGUI:
         ttk.Button(process_frame, text="Beenden", bootstyle=DANGER, width=12,
                    command=self.exit_app).pack(side='right', padx=20)
 
-    # ------------------------------------------
-    # Sensor-Thread: Liest den HX711 alle 0.1 s (10 Hz) und wendet den Filter an
-    # ------------------------------------------
-    def update_force_loop(self):
-        sample_interval = 0.0125  # in Sekunden (10 Hz)
-        while not self.stop_event.is_set():
-            loop_start = time.perf_counter()
-            raw_value = self.read_value_with_timeout(timeout_ms=15)
-            if raw_value is not None:
-                force = raw_value * -0.0003024406
-                # Filterung: neuer Wert wird durch den Filter verarbeitet.
-                filtered_force = self.filter_force(force)
-                self.current_force = filtered_force
-                self.force_value_var.set(f"Kraft: {filtered_force:.2f} N")
-                if filtered_force > self.max_force_value:
-                    self.max_force_value = filtered_force
-                    self.max_force_var.set(f"Max: {self.max_force_value:.2f} N")
-            elapsed = time.perf_counter() - loop_start
-            if elapsed < sample_interval:
-                time.sleep(sample_interval - elapsed)
+        # Statuszeile: Aufbau und Zustand der Geräte (HX711, Motor, Profil)
+        self.device_label = ttk.Label(frame, text="Hardware startet...", font=("Helvetica", 12))
+        self.device_label.pack(fill='x', padx=10)
 
     # ------------------------------------------
-    # Motorsteuerung, Position usw.
+    # Motorsteuerung, Position usw. (Logik in Zugpruefmaschine)
     # ------------------------------------------
     def move_by(self, mm):
-        mm_per_step = self.rotation_distance / self.steps_per_rev
-        steps = int(mm / mm_per_step)
-        if steps >= 0:
-            self.dir.on()
-            x = 1
-        else:
-            self.dir.off()
-            x = -1
-
-        mm_to_move = abs(mm)
-        mm_moved = 0
-        
-        while mm_moved < mm_to_move:
-            frequency = 853
-            self.step.value = 1
-            step_time = 1 / frequency
-            time.sleep(step_time)
-            self.step.value = 0
-            self.position += mm_per_step * x
-            self.pos_display.configure(text=f"Position: {self.position:.2f} mm")
-            self.pos_display.update_idletasks()
-            
-            mm_moved += mm_per_step
+        if self.machine_ready():
+            self.machine.move_by(mm)
 
+    # ------------------------------------------
+    # Live-Plot: neue Messwerte bei jedem Bild aus dem Ringpuffer
+    # ------------------------------------------
+    def update_plot(self):
+        if self.ring is None:
+            return
+        self.plot_seq, items, _ = self.ring.read_since(self.plot_seq)
+        if self.plot_active:
+            mm_per_step = self.machine.motor.mm_per_step
+            plot = self.plot
+            for t, raw, force, steps in items:
+                plot.add(steps * mm_per_step, force)
+            # Versuch zu Ende: die restlichen Werte sind gerade noch übernommen worden
+            self.plot_active = self.machine.is_testing
+        self.plot.draw()
+
+    def current_recording(self):
+        name = self.machine.logfile_name
+        return os.path.splitext(name)[0] + ".rec" if name else None
 
     def exit_app(self):
-        self.stop_event.set()
+        # Hardware nie fertig geworden: Startzeiten trotzdem festhalten (hardware_ready null)
+        if not self.startup.saved:
+            self.save_startup_report()
+        if self.stream_server is not None:
+            self.stream_server.stop()
+        if self.machine is not None:
+            self.machine.shutdown()
+            if not hasattr(self.machine, "ring"):
+                self.ring.close()
         self.root.destroy()
         sys.exit()
 
+    # Die Anzeigen der Einstellungen aktualisiert der Renderer mit dem nächsten Bild
     def adjust_feed(self, delta):
-        self.feed_rate = max(1, self.feed_rate + delta)
-        self.feed_display.configure(text=f"Vorschub: {self.feed_rate} mm/min")
+        if self.machine_ready():
+            m = self.machine
+            m.feed_rate = max(1, m.feed_rate + delta)
 
     def adjust_kraft_grenze(self, delta):
-        self.kraft_abfall_grenze = max(0, self.kraft_abfall_grenze + delta)
-        self.kraft_display.configure(text=f"Grenze: {self.kraft_abfall_grenze} N")
+        if self.machine_ready():
+            m = self.machine
+            m.kraft_abfall_grenze = max(0, m.kraft_abfall_grenze + delta)
+
+    def adjust_abfall_vom_maximum(self, delta):
+        if self.machine_ready():
+            m = self.machine
+            m.abfall_vom_maximum = max(0, m.abfall_vom_maximum + delta)
 
     def adjust_zuglaenge(self, delta):
-        self.zuglaenge = max(1, self.zuglaenge + delta)
-        self.zuglaenge_label.configure(text=f"{self.zuglaenge} mm")
+        if self.machine_ready():
+            m = self.machine
+            m.zuglaenge = max(1, m.zuglaenge + delta)
 
     def tare(self):
-        self.hx.tare()
+        # Kehrt sofort zurück, der Sensor-Thread tariert mit den nächsten Messwerten
+        if self.machine_ready():
+            self.machine.tare()
 
     def reset_position(self):
-        self.position = 0.0
-        self.pos_display.configure(text=f"Position: {self.position:.2f} mm")
+        if self.machine_ready():
+            self.machine.reset_position()
+
+    # ------------------------------------------
+    # Diagnose: Zähler und Histogramme aus metrics.py, alle 500 ms aktualisiert
+    # ------------------------------------------
+    def open_diagnostics(self):
+        if not self.machine_ready():
+            return
+        from metrics import format_summary
+        window = ttk.Toplevel(self.root)
+        window.title("Diagnose")
+        label = ttk.Label(window, text="", font=("Courier", 12), justify='left', padding=10)
+        label.pack(fill='both', expand=True)
+        ttk.Button(window, text="Schließen", bootstyle=SECONDARY,
+                   command=window.destroy).pack(pady=10)
+
+        def refresh():
+            if not window.winfo_exists():
+                return
+            try:
+                label.configure(text=format_summary(self.machine.metrics_summary()))
+            except RuntimeError as e:  # ServiceTimeout/ServiceError: nächster Versuch mit dem nächsten Takt
+                label.configure(text=f"Keine Kennzahlen vom Service: {e}")
+            window.after(500, refresh)
+        refresh()
 
     def return_to_zero(self):
-        self.move_by(-self.position)
+        if self.machine_ready():
+            self.machine.return_to_zero()
 
     # ------------------------------------------
-    # Erzeugt einen unique Log-Filename
+    # Reserviert den nächsten Versuch im Katalog und liefert dessen Log-Filename
     # ------------------------------------------
     def get_log_filename(self):
-        log_dir = "./logs"
-        os.makedirs(log_dir, exist_ok=True)
+        m = self.machine
         base_name = self.log_base_var.get().strip() or "zugversuch_log"
-        index = 1
-        filename = f"{log_dir}/{base_name}_{index}.csv"
-        while os.path.exists(filename):
-            index += 1
-            filename = f"{log_dir}/{base_name}_{index}.csv"
+        _, filename = self.catalog.reserve(
+            base_name, material=self.material_var.get().strip() or None,
+            feed_rate=m.feed_rate, zuglaenge=m.zuglaenge,
+            kraft_abfall_grenze=m.kraft_abfall_grenze, profile=m.profile_name,
+            abfall_vom_maximum=m.abfall_vom_maximum)
         return filename
 
     # ------------------------------------------
-    # Prozess-Thread: Führt den Zugversuch aus und loggt Messwerte
+    # Prozess: Führt den Zugversuch aus und zeichnet alle Messwerte auf
     # ------------------------------------------
     def toggle_process(self):
-        if self.is_testing:
+        if not self.machine_ready() or self.catalog is None:
             return
-        self.max_force_value = 0.0
-        self.max_force_var.set("Max: 0.00 N")
-        self.position = 0.0
-        self.pos_display.configure(text="Position: 0.00 mm")
-        self.is_testing = True
-        self.process_stop_event.clear()
-        self.process_thread = threading.Thread(target=self.run_test_process, daemon=True)
-        self.process_thread.start()
-
-    def run_test_process(self):
-        feed = self.feed_rate  # mm/min
-        mm_per_step = self.rotation_distance / self.steps_per_rev
-        steps_per_sec = feed / 60 / mm_per_step
-        self.logfile_name = self.get_log_filename()
-        self.logfile_label.configure(text=os.path.basename(self.logfile_name))
-        stop_event = self.process_stop_event
+        if self.machine.is_testing or self.machine.motor.busy:
+            return
+        self.plot.new_run(x_range=self.machine.zuglaenge)
+        self.plot_seq = self.ring.count
+        filename = self.get_log_filename()
         try:
-            with open(self.logfile_name, "w") as logfile:
-                logfile.write("Position;Force\n")
-                def log_task():
-                    previous_force = None
-                    while not stop_event.is_set():
-                        force = self.current_force
-                        logfile.write(f"{self.position:.2f};{force:.2f}\n")
-                        logfile.flush()
-                        if previous_force is not None and self.kraft_abfall_grenze > 0:
-                            if (previous_force - force) >= self.kraft_abfall_grenze:
-                                stop_event.set()
-                                break
-                        previous_force = force
-                        time.sleep(0.15)
-                log_thread = threading.Thread(target=log_task, daemon=True)
-                log_thread.start()
-                mm_to_move = self.zuglaenge
-                mm_moved = 0
-                while mm_moved < mm_to_move and not stop_event.is_set():
-                    self.dir.on()
-                    #frequency = steps_per_sec
-                    self.step.value = 1
-                    step_time = 1 / steps_per_sec
-                    time.sleep(step_time)
-                    self.step.value = 0
-                    self.position += mm_per_step
-                    self.pos_display.configure(text=f"Position: {self.position:.2f} mm")
-                    mm_moved += mm_per_step
-                stop_event.set()
-                log_thread.join()
-        finally:
-            self.is_testing = False
+            self.plot_active = self.machine.start_test(filename)
+        except RuntimeError as e:
+            # ServiceTimeout/ServiceError: ob der Versuch läuft, zeigt der Status im Ringpuffer.
+            # Läuft er, schließt der Service den Katalogeintrag am Versuchsende ab, sonst hier
+            from service import ServiceTimeout
+            self.plot_active = self.machine.is_testing
+            if not self.plot_active:
+                reason = "timeout" if isinstance(e, ServiceTimeout) else "error"
+                self.catalog.finish(filename, "failed", stop_reason=reason)
+            return
+        if not self.plot_active:
+            self.catalog.finish(filename, "failed", stop_reason="busy")
 
 
 if __name__ == '__main__':
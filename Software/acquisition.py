@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Kontinuierliche HX711-Erfassung: Die fallende Flanke an DOUT (Data ready)
+löst das Auslesen aus, die Rohwerte landen mit Zeitstempel in einem Ringpuffer.
+Anzeige, Logger, Bruch-Erkennung und Tarierung lesen aus dem Puffer,
+statt selbst den Chip abzufragen.
+"""
+import threading
+import time
+from array import array
+
+
+class RingBuffer:
+    """
+    Ringpuffer fester Größe für (Zeitstempel, Rohwert).
+    Ein Schreiber, beliebig viele Leser. Jeder Leser merkt sich seine
+    eigene Sequenznummer (= Anzahl bisher gelesener Werte).
+    """
+    def __init__(self, size=4096):
+        self.size = size
+        self.times = array('d', bytes(size * array('d').itemsize))
+        self.values = array('l', bytes(size * array('l').itemsize))
+        self.count = 0  # Anzahl der bisher geschriebenen Werte
+        self._cond = threading.Condition()
+
+    def append(self, t, value):
+        i = self.count % self.size
+        self.times[i] = t
+        self.values[i] = value
+        with self._cond:
+            self.count += 1
+            self._cond.notify_all()
+
+    def wait(self, seq, timeout=None):
+        """Wartet, bis mehr als seq Werte geschrieben wurden."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.count > seq, timeout)
+
+    def read_since(self, seq):
+        """
+        Liefert (neue Sequenznummer, [(t, wert), ...], verlorene Werte).
+        Ist der Leser mehr als size Werte zurück, werden die ältesten übersprungen.
+        """
+        end = self.count
+        dropped = 0
+        if end - seq > self.size:
+            dropped = end - seq - self.size
+            seq = end - self.size
+        times = self.times
+        values = self.values
+        size = self.size
+        items = [(times[i % size], values[i % size]) for i in range(seq, end)]
+        return end, items, dropped
+
+    def last(self, n):
+        """Die letzten n Rohwerte (oder weniger, falls noch nicht so viele da sind)."""
+        end = self.count
+        n = min(n, end, self.size)
+        return [self.values[i % self.size] for i in range(end - n, end)]
+
+
+class VectorRingBuffer(RingBuffer):
+    """
+    Ringpuffer für mehrere HX711 an einer SCK (MultiHX711): pro Eintrag ein
+    Zeitstempel, die Einstellung (Index in MultiHX711.modes) und ein Rohwert je Chip.
+    """
+    def __init__(self, width, size=4096):
+        super().__init__(size)
+        self.width = width
+        self.modes = array('b', bytes(size))
+        self.values = array('l', bytes(size * width * array('l').itemsize))
+
+    def append(self, t, mode, values):
+        i = self.count % self.size
+        self.times[i] = t
+        self.modes[i] = mode
+        base = i * self.width
+        for j, value in enumerate(values):
+            self.values[base + j] = value
+        with self._cond:
+            self.count += 1
+            self._cond.notify_all()
+
+    def read_since(self, seq):
+        """Liefert (neue Sequenznummer, [(t, einstellung, (wert je Chip)), ...], verlorene Werte)."""
+        end = self.count
+        dropped = 0
+        if end - seq > self.size:
+            dropped = end - seq - self.size
+            seq = end - self.size
+        size = self.size
+        width = self.width
+        values = self.values
+        items = []
+        for k in range(seq, end):
+            i = k % size
+            items.append((self.times[i], self.modes[i], tuple(values[i * width:(i + 1) * width])))
+        return end, items, dropped
+
+    def last(self, n, chip=0):
+        """Die letzten n Rohwerte eines Chips."""
+        end = self.count
+        n = min(n, end, self.size)
+        return [self.values[(i % self.size) * self.width + chip] for i in range(end - n, end)]
+
+
+class ContinuousAcquisition:
+    """
+    Liest den HX711 bei jeder fallenden DOUT-Flanke aus und schreibt
+    (Zeitstempel, Rohwert) in den Ringpuffer.
+    """
+    def __init__(self, hx, buffer, sample_rate=80.0, clock=time.perf_counter, metrics=None):
+        self.hx = hx
+        self.metrics = metrics
+        self.buffer = buffer
+        self.period = 1.0 / sample_rate
+        self.clock = clock
+        self.dropped = 0  # verpasste Wandlungen (aus Lücken in den Zeitstempeln)
+        self._last_t = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.hx.dout.when_deactivated = self._on_data_ready
+
+    def stop(self):
+        self.hx.dout.when_deactivated = None
+
+    def kick(self):
+        """
+        Liest, falls DOUT schon LOW ist. Für den Fall, dass eine Flanke
+        verpasst wurde (DOUT bleibt dann LOW, bis jemand ausliest).
+        """
+        self._on_data_ready()
+
+    def _on_data_ready(self):
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            # Flanken, die während des Auslesens durch die Datenbits entstehen,
+            # kommen verspätet an - dann ist DOUT bereits wieder HIGH.
+            if self.hx.dout.value:
+                return
+            t = self.clock()
+            raw = self.hx.read_now()
+            read_duration = self.clock() - t
+            # Noch unter dem Lock: kick() und Flanken-Callback schreiben sonst
+            # gleichzeitig in den Ringpuffer (ein Schreiber) und die Lückenprüfung
+            self._track_gap(t)
+            self.buffer.append(t, raw)
+        finally:
+            self._lock.release()
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.read_duration.record(read_duration)
+
+    def _track_gap(self, t):
+        metrics = self.metrics
+        if self._last_t is not None:
+            gap = t - self._last_t
+            if metrics is not None:
+                metrics.sample_interval.record(gap)
+            if gap > 1.5 * self.period:
+                missed = round(gap / self.period) - 1
+                self.dropped += missed
+                if metrics is not None:
+                    metrics.dropped_conversions += missed
+        self._last_t = t
+
+
+class MultiAcquisition(ContinuousAcquisition):
+    """
+    Erfassung für MultiHX711: gelesen wird, sobald alle DOUT-Leitungen LOW sind,
+    ein Eintrag im VectorRingBuffer enthält die Werte aller Chips derselben Wandlung.
+    """
+    def start(self):
+        for dout in self.hx.douts:
+            dout.when_deactivated = self._on_data_ready
+
+    def stop(self):
+        for dout in self.hx.douts:
+            dout.when_deactivated = None
+
+    def _on_data_ready(self):
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            # Erst lesen, wenn der letzte Chip fertig ist
+            if not self.hx.ready():
+                return
+            t = self.clock()
+            mode, values = self.hx.read_now()
+            read_duration = self.clock() - t
+            self._track_gap(t)
+            if mode is not None:
+                self.buffer.append(t, mode, values)
+        finally:
+            self._lock.release()
+        if self.metrics is not None:
+            self.metrics.read_duration.record(read_duration)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Auswertung von Zugversuchen nach dem Versuch.
+
+Lädt die Logs (Position;Force-CSV oder .rec-Aufzeichnung) als NumPy-Arrays
+und berechnet Anfangssteigung, 0,2%-Dehngrenze, Höchstkraft und
+Bruchposition vektorisiert. Ein ganzes Verzeichnis wird parallel in einem
+Prozess-Pool ausgewertet und in eine Übersichtstabelle geschrieben.
+
+Aufruf:  python analysis.py ./logs [--gauge-length 10] [--workers 4]
+"""
+import argparse
+import math
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+SUMMARY_FIELDS = (
+    "file", "points", "max_force", "max_force_position", "stiffness",
+    "yield_force", "yield_position", "break_position", "elongation_at_break",
+)
+
+
+def load_log(path):
+    """Liest ein Log und gibt (Position in mm, Kraft in N) als float-Arrays zurück."""
+    if os.path.isdir(path):
+        from recorder import load_recording
+        columns, manifest = load_recording(path)
+        mm_per_step = manifest["metadata"].get("mm_per_step", 3.125 / 1600)
+        return np.asarray(columns["steps"]) * mm_per_step, np.asarray(columns["force"])
+    with warnings.catch_warnings():
+        # Leere Logs sind normal, loadtxt warnt sonst bei jedem
+        warnings.simplefilter("ignore", UserWarning)
+        data = np.loadtxt(path, delimiter=";", skiprows=1, ndmin=2)
+    if data.size == 0 or data.shape[1] < 2:
+        # Nur Kopfzeile (Versuch ohne Messwerte, z.B. Wägezelle nicht angeschlossen)
+        return np.empty(0), np.empty(0)
+    return data[:, 0], data[:, 1]
+
+
+def analyse_curve(position, force, gauge_length=10.0, fit_range=(0.1, 0.4), break_fraction=0.5):
+    """
+    Kennwerte einer Kraft-Weg-Kurve.
+    gauge_length:   Bezugslänge in mm für Dehnung und 0,2%-Versatz
+    fit_range:      Kraftbereich (Anteil der Höchstkraft) für die Anfangssteigung
+    break_fraction: Bruch = erster Wert nach dem Maximum unter diesem Anteil der Höchstkraft
+    """
+    nan = math.nan
+    result = dict.fromkeys(SUMMARY_FIELDS[1:], nan)
+    result["points"] = len(force)
+    if len(force) < 3:
+        return result
+    peak = int(np.argmax(force))
+    max_force = float(force[peak])
+    result["max_force"] = max_force
+    result["max_force_position"] = float(position[peak])
+
+    # Anfangssteigung: Ausgleichsgerade im Bereich fit_range vor dem Maximum
+    rising_force = force[:peak + 1]
+    rising_pos = position[:peak + 1]
+    mask = (rising_force >= fit_range[0] * max_force) & (rising_force <= fit_range[1] * max_force)
+    if np.count_nonzero(mask) >= 2:
+        x = rising_pos[mask]
+        y = rising_force[mask]
+        x_mean = x.mean()
+        denom = np.dot(x - x_mean, x - x_mean)
+        if denom > 0:
+            slope = float(np.dot(x - x_mean, y - y.mean()) / denom)
+            intercept = float(y.mean() - slope * x_mean)
+            result["stiffness"] = slope
+
+            # 0,2%-Dehngrenze: erster Schnittpunkt mit der um 0,2 % verschobenen Geraden
+            if slope > 0:
+                offset = 0.002 * gauge_length
+                diff = rising_force - (slope * (rising_pos - offset) + intercept)
+                start = int(np.argmax(mask))
+                below = np.flatnonzero(diff[start:] <= 0)
+                if below.size:
+                    j = start + int(below[0])
+                    if j > 0 and diff[j - 1] > 0:
+                        # linear zwischen j-1 und j interpolieren
+                        w = diff[j - 1] / (diff[j - 1] - diff[j])
+                    else:
+                        w = 1.0
+                    i = max(j - 1, 0)
+                    result["yield_force"] = float(force[i] + w * (force[j] - force[i]))
+                    result["yield_position"] = float(position[i] + w * (position[j] - position[i]))
+
+    if max_force <= 0:
+        # Keine Zugkraft (z.B. vertauschte Leitungen): ohne positives Maximum kein Bruch
+        return result
+    # Bruch: erster Wert nach dem Maximum unter break_fraction * Höchstkraft
+    drop = np.flatnonzero(force[peak:] < break_fraction * max_force)
+    end = peak + int(drop[0]) - 1 if drop.size else len(force) - 1
+    result["break_position"] = float(position[end])
+    result["elongation_at_break"] = float((position[end] - position[0]) / gauge_length * 100)
+    return result
+
+
+def analyse_file(path, gauge_length=10.0):
+    try:
+        position, force = load_log(path)
+        result = analyse_curve(position, force, gauge_length)
+    except (OSError, ValueError, KeyError, IndexError) as e:
+        print(f"{path}: {e}")
+        result = dict.fromkeys(SUMMARY_FIELDS[1:], math.nan)
+        result["points"] = 0
+    result["file"] = os.path.basename(path)
+    return result
+
+
+def find_logs(directory):
+    """Alle CSV-Logs und .rec-Aufzeichnungen (ohne zugehöriges CSV) im Verzeichnis."""
+    names = sorted(os.listdir(directory))
+    csv_bases = {os.path.splitext(n)[0] for n in names if n.endswith(".csv")}
+    logs = []
+    for name in names:
+        base, ext = os.path.splitext(name)
+        if ext == ".csv" and not name.startswith("zusammenfassung") and not base.endswith(".cycles"):
+            logs.append(os.path.join(directory, name))
+        elif ext == ".rec" and base not in csv_bases:
+            logs.append(os.path.join(directory, name))
+    return logs
+
+
+def _analyse_many(args):
+    paths, gauge_length = args
+    return [analyse_file(p, gauge_length) for p in paths]
+
+
+def analyse_directory(directory, gauge_length=10.0, workers=None, chunk=64):
+    """Wertet alle Logs im Verzeichnis aus, verteilt in Paketen auf einen Prozess-Pool."""
+    logs = find_logs(directory)
+    batches = [(logs[i:i + chunk], gauge_length) for i in range(0, len(logs), chunk)]
+    if workers == 1:
+        return [r for batch in map(_analyse_many, batches) for r in batch]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [r for batch in pool.map(_analyse_many, batches) for r in batch]
+
+
+def write_summary(results, path):
+    with open(path, "w") as f:
+        f.write(";".join(SUMMARY_FIELDS) + "\n")
+        for r in results:
+            values = [r["file"], str(r["points"])]
+            values += [f"{r[k]:.4f}" for k in SUMMARY_FIELDS[2:]]
+            f.write(";".join(values) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auswertung aller Zugversuch-Logs eines Verzeichnisses")
+    parser.add_argument("directory", nargs="?", default="./logs")
+    parser.add_argument("--gauge-length", type=float, default=10.0, help="Bezugslänge in mm")
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl Prozesse (Standard: alle Kerne)")
+    parser.add_argument("--output", default=None, help="Übersichtstabelle (Standard: <dir>/zusammenfassung.csv)")
+    args = parser.parse_args()
+    results = analyse_directory(args.directory, args.gauge_length, args.workers)
+    output = args.output or os.path.join(args.directory, "zusammenfassung.csv")
+    write_summary(results, output)
+    print(f"{len(results)} Versuche ausgewertet -> {output}")
+
+
+if __name__ == "__main__":
+    main()
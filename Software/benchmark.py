@@ -0,0 +1,1334 @@
+#!/usr/bin/env python3
+"""
+Benchmarks für die Zugprüfmaschine, laufen ohne Raspberry Pi
+(gpiozero MockFactory bzw. Simulation).
+
+Aufruf:  python benchmark.py            -> alle Benchmarks
+         python benchmark.py hx711      -> nur einen
+"""
+import sys
+import time
+
+
+def use_mock_pins():
+    from gpiozero import Device
+    from gpiozero.pins.mock import MockFactory
+    Device.pin_factory = MockFactory()
+    return Device.pin_factory
+
+
+# ------------------------------------------
+# HX711: gpiozero- vs. Fast-Backend
+# ------------------------------------------
+def bench_hx711(n=2000):
+    from HX711 import HX711, GpiozeroBackend, FastBackend
+    from simulation import NoHistory
+    factory = use_mock_pins()
+    print(f"HX711.read mit MockFactory, {n} Messungen pro Backend")
+    for backend in (GpiozeroBackend, FastBackend):
+        factory.reset()
+        hx = HX711(dout_pin=5, sck_pin=6, backend=backend)
+        # MockPin protokolliert jede Flanke, das verfälscht die Messung
+        hx.sck.pin.states = NoHistory()
+        start = time.perf_counter()
+        for _ in range(n):
+            hx.read()
+        single = time.perf_counter() - start
+        start = time.perf_counter()
+        hx.read_many(n)
+        bulk = time.perf_counter() - start
+        print(f"  {backend.__name__:16s} read():      {n / single:9.0f} reads/s  {single / n * 1e6:8.1f} µs/read")
+        print(f"  {backend.__name__:16s} read_many(): {n / bulk:9.0f} reads/s  {bulk / n * 1e6:8.1f} µs/read")
+        hx.dout.close()
+        hx.sck.close()
+
+
+# ------------------------------------------
+# Erfassung: Polling-Schleife vs. DOUT-Flanke + Ringpuffer
+# ------------------------------------------
+class _DataReadySource:
+    """
+    Simulierter HX711-Takt: DOUT geht alle 12.5 ms auf LOW (Data ready)
+    und nach dem Auslesen wieder auf HIGH. Wird eine Wandlung nicht
+    ausgelesen, bevor die nächste kommt, zählt sie als verloren.
+    """
+    def __init__(self, hx, rate=80.0):
+        self.hx = hx
+        self.period = 1.0 / rate
+        self.conversions = 0
+        self.dropped = 0
+        self._stop = False
+        read_now = hx.read_now
+        pin = hx.dout.pin
+
+        def read_and_release():
+            value = read_now()
+            pin.drive_high()
+            return value
+        hx.read_now = read_and_release
+        pin.drive_high()
+
+    def run(self, duration):
+        pin = self.hx.dout.pin
+        start = time.perf_counter()
+        for i in range(1, int(duration / self.period) + 1):
+            delay = start + i * self.period - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if not pin.state:
+                self.dropped += 1
+                pin.drive_high()
+            self.conversions += 1
+            pin.drive_low()
+
+
+def _interval_stats(times):
+    intervals = [b - a for a, b in zip(times, times[1:])]
+    mean = sum(intervals) / len(intervals)
+    std = (sum((x - mean) ** 2 for x in intervals) / len(intervals)) ** 0.5
+    return mean, std
+
+
+def bench_acquisition(duration=3.0):
+    import threading
+    from HX711 import HX711, FastBackend
+    from acquisition import RingBuffer, ContinuousAcquisition
+    factory = use_mock_pins()
+    print(f"Erfassung mit simuliertem Data-ready bei 80 SPS, {duration:.0f} s pro Modus")
+
+    # Alte Variante: read_value_with_timeout + update_force_loop
+    factory.reset()
+    hx = HX711(dout_pin=5, sck_pin=6, backend=FastBackend)
+    source = _DataReadySource(hx)
+    stop = threading.Event()
+    times = []
+
+    def polling_loop():
+        sample_interval = 0.0125
+        while not stop.is_set():
+            loop_start = time.perf_counter()
+            start_time = time.perf_counter()
+            value = None
+            while hx.dout.value:
+                if (time.perf_counter() - start_time) > 0.015:
+                    break
+            else:
+                value = hx.get_value()
+            if value is not None:
+                times.append(time.perf_counter())
+            elapsed = time.perf_counter() - loop_start
+            if elapsed < sample_interval:
+                time.sleep(sample_interval - elapsed)
+    reader = threading.Thread(target=polling_loop, daemon=True)
+    cpu = time.process_time()
+    reader.start()
+    source.run(duration)
+    stop.set()
+    reader.join()
+    cpu = time.process_time() - cpu
+    _report_acquisition("Polling", cpu, duration, source, times)
+
+    # Neue Variante: Flanke + Ringpuffer, Verbraucher wartet auf den Puffer
+    factory.reset()
+    hx = HX711(dout_pin=5, sck_pin=6, backend=FastBackend)
+    source = _DataReadySource(hx)
+    buffer = RingBuffer(4096)
+    acq = ContinuousAcquisition(hx, buffer)
+    stop = threading.Event()
+
+    def consumer():
+        seq = 0
+        while not stop.is_set():
+            if buffer.wait(seq, timeout=0.05):
+                seq, _, _ = buffer.read_since(seq)
+    reader = threading.Thread(target=consumer, daemon=True)
+    cpu = time.process_time()
+    acq.start()
+    reader.start()
+    source.run(duration)
+    stop.set()
+    reader.join()
+    acq.stop()
+    cpu = time.process_time() - cpu
+    times = [buffer.times[i] for i in range(buffer.count)]
+    _report_acquisition("Flanke+Ringpuffer", cpu, duration, source, times)
+
+
+def _report_acquisition(name, cpu, duration, source, times):
+    mean, std = _interval_stats(times)
+    print(f"  {name:18s} CPU {cpu / duration * 100:5.1f} %  "
+          f"Werte {len(times):4d}/{source.conversions}  verloren {source.dropped:3d}  "
+          f"Abstand {mean * 1e3:6.2f} ms  Jitter (std) {std * 1e3:5.2f} ms")
+
+
+# ------------------------------------------
+# Schrittmotor: alte sleep-Schleife vs. StepperEngine
+# ------------------------------------------
+class _PulseRecorder:
+    """Ersetzt den STEP-Ausgang und merkt sich den Zeitpunkt jeder steigenden Flanke."""
+    def __init__(self):
+        self.times = []
+
+    def on(self):
+        self.times.append(time.perf_counter())
+
+    def off(self):
+        pass
+
+
+def _report_steps(name, requested_mm_min, mm_per_step, times, schedule):
+    start = times[0]
+    errors = [abs((t - start) - s) for t, s in zip(times, schedule)]
+    duration = times[-1] - start
+    achieved = (len(times) - 1) * mm_per_step / duration * 60
+    print(f"  {name:28s} Soll {requested_mm_min:6.1f} mm/min  Ist {achieved:8.2f} mm/min "
+          f"({(achieved / requested_mm_min - 1) * 100:+6.2f} %)  "
+          f"Fehler/Schritt mittel {sum(errors) / len(errors) * 1e6:8.1f} µs  max {max(errors) * 1e6:8.1f} µs")
+
+
+def bench_stepper(duration=1.0):
+    from stepper import StepperEngine, constant_profile, trapezoid_profile, s_curve_profile
+    engine = StepperEngine(_PulseRecorder(), _PulseRecorder())
+    mm_per_step = engine.mm_per_step
+    print(f"Schrittausgabe gegen Mock-Pin, je ca. {duration:.0f} s")
+    for feed in (5, 60, 853 * mm_per_step * 60):
+        v = feed / 60 / mm_per_step
+        n = max(3, int(v * duration))
+        schedule = constant_profile(n, v)
+
+        # Alte Schleife aus run_test_process/move_by
+        pin = _PulseRecorder()
+        for _ in range(n):
+            pin.on()
+            time.sleep(1 / v)
+            pin.off()
+        _report_steps("sleep(1/f) pro Schritt", feed, mm_per_step, pin.times, schedule)
+
+        engine.step = _PulseRecorder()
+        engine.run(schedule)
+        _report_steps("StepperEngine konstant", feed, mm_per_step, engine.step.times, schedule)
+
+    v = 853
+    for profile in (trapezoid_profile, s_curve_profile):
+        schedule = profile(int(v * duration), v, 4000)
+        engine.step = _PulseRecorder()
+        engine.run(schedule)
+        feed = v * mm_per_step * 60
+        times = engine.step.times
+        errors = [abs((t - times[0]) - s) for t, s in zip(times, schedule)]
+        print(f"  StepperEngine {profile.__name__:17s} Fahrzeit Soll {schedule[-1]:.3f} s  "
+              f"Ist {times[-1] - times[0]:.3f} s  Fehler/Schritt mittel "
+              f"{sum(errors) / len(errors) * 1e6:6.1f} µs  max {max(errors) * 1e6:8.1f} µs")
+
+
+# ------------------------------------------
+# Anzeige: Zeit, die der Mess-Thread in UI-Aufrufen verbringt
+# ------------------------------------------
+def bench_display(n=20000, rate=80):
+    import tkinter as tk
+    from display import DisplayModel, DisplayRenderer
+    # Ohne Display gibt es keine Widgets und keine Tk-Mainloop; gemessen wird
+    # daher im selben Thread gegen einen reinen Tcl-Interpreter. Das ist die
+    # untere Grenze - auf dem Pi kommt das Warten auf den Tk-Thread dazu.
+    print(f"Zeit im Mess-Thread für UI-Aufrufe, {n} Werte bei {rate} Hz")
+    root = tk.Tcl()
+    force_var = tk.StringVar(master=root, value="Kraft: 0.00 N")
+    max_var = tk.StringVar(master=root, value="Max: 0.00 N")
+    forces = [(i % 500) * 0.1 + (i % 7) * 0.001 for i in range(n)]
+
+    start = time.perf_counter()
+    max_force = 0.0
+    old_calls = 0
+    for force in forces:
+        force_var.set(f"Kraft: {force:.2f} N")
+        old_calls += 1
+        if force > max_force:
+            max_force = force
+            max_var.set(f"Max: {max_force:.2f} N")
+            old_calls += 1
+    old = time.perf_counter() - start
+
+    model = DisplayModel()
+    force_label = _FakeLabel(root, force_var)
+    max_label = _FakeLabel(root, max_var)
+    renderer = DisplayRenderer(root, fps=30)
+    renderer.bind(force_label, lambda: model.force, "Kraft: {:.2f} N")
+    renderer.bind(max_label, lambda: model.max_force, "Max: {:.2f} N")
+    frames = int(n / rate * renderer.fps)
+    frame_every = n // frames
+    producer = 0.0
+    tk_side = 0.0
+    max_force = 0.0
+    for i, force in enumerate(forces):
+        start = time.perf_counter()
+        if force > max_force:
+            max_force = force
+        model.publish_force(force, max_force)
+        producer += time.perf_counter() - start
+        if i % frame_every == 0:
+            start = time.perf_counter()
+            renderer.render()
+            tk_side += time.perf_counter() - start
+    print(f"  vorher  StringVar.set im Mess-Thread: {old / n * 1e6:7.2f} µs/Wert, "
+          f"{old_calls} Tk-Aufrufe")
+    print(f"  nachher DisplayModel im Mess-Thread:  {producer / n * 1e6:7.2f} µs/Wert, 0 Tk-Aufrufe")
+    print(f"          Renderer im Tk-Thread ({renderer.fps} fps): {tk_side / frames * 1e6:7.2f} µs/Bild, "
+          f"{force_label.updates + max_label.updates} Tk-Aufrufe für {frames} Bilder")
+
+
+class _FakeLabel:
+    """Label-Ersatz ohne Display: schreibt den Text in eine Tcl-Variable."""
+    def __init__(self, root, var):
+        self.var = var
+        self.updates = 0
+
+    def configure(self, text):
+        self.var.set(text)
+        self.updates += 1
+
+
+# ------------------------------------------
+# Aufzeichnung: CSV-Zeile + flush vs. Recorder
+# ------------------------------------------
+def bench_recorder(n=1_000_000):
+    import os
+    import tempfile
+    import tracemalloc
+    from recorder import Recorder, load_recording, export_csv
+    print(f"Aufzeichnung von {n} Werten (80 SPS entsprechen {n / 80 / 3600:.1f} h Versuch)")
+    with tempfile.TemporaryDirectory() as tmp:
+        m = n // 20
+        start = time.perf_counter()
+        with open(os.path.join(tmp, "alt.csv"), "w") as logfile:
+            for i in range(m):
+                logfile.write(f"{i * 0.00195:.2f};{i * 0.001:.2f}\n")
+                logfile.flush()
+        old = time.perf_counter() - start
+        print(f"  CSV write+flush pro Zeile: {m / old:10.0f} Werte/s  ({old / m * 1e6:6.2f} µs/Wert)")
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        # Volllast weit über 80 SPS: append darf hier auf den Writer warten (an der Maschine nie)
+        rec = Recorder(os.path.join(tmp, "neu.rec"), metadata={"mm_per_step": 0.00195}, wait=5.0)
+        for i in range(n):
+            rec.append(i * 0.0125, i, i * 0.001, i)
+        rec.finalise()
+        new = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  Recorder.append (inkl. fsync je Block): {n / new:10.0f} Werte/s  ({new / n * 1e6:6.2f} µs/Wert, "
+              f"{n / new / 80:.0f}x 80 SPS)  Speicher-Spitze {peak / 1e6:5.2f} MB  verworfen {rec.dropped}")
+
+        columns, manifest = load_recording(os.path.join(tmp, "neu.rec"))
+        assert manifest["complete"] and len(columns["time"]) == n
+        start = time.perf_counter()
+        export_csv(os.path.join(tmp, "neu.rec"), os.path.join(tmp, "neu.csv"), 0.00195)
+        print(f"  CSV-Export nach dem Versuch: {time.perf_counter() - start:6.2f} s")
+
+        # Absturz simulieren: Recorder ohne finalise() verlassen
+        rec = Recorder(os.path.join(tmp, "absturz.rec"), chunk=1024)
+        for i in range(5000):
+            rec.append(i * 0.0125, i, 0.0, i)
+        time.sleep(0.2)
+        columns, manifest = load_recording(os.path.join(tmp, "absturz.rec"))
+        print(f"  Nach Absturz lesbar: {len(columns['time'])} von 5000 Werten "
+              f"(vollständige Blöcke), complete={manifest['complete']}")
+
+
+# ------------------------------------------
+# Zuordnung Kraft <-> Position
+# ------------------------------------------
+def bench_pairing(duration=10.0, seed=1):
+    """
+    Echte Fahrt (StepperEngine in virtueller Zeit) mit echter Erfassung: die
+    Position, die process_sample einem Messwert zuordnet, gegen die Schritte,
+    die der Treiber bis zum Zeitstempel des Messwerts tatsächlich bekommen hat.
+    Die Verarbeitung läuft 0-20 ms nach dem Messwert (wie hinter dem Sensor-Thread).
+    """
+    import bisect
+    import os
+    import random
+    import tempfile
+    from simulation import Simulation, SpecimenModel
+    rng = random.Random(seed)
+    tmp = tempfile.TemporaryDirectory()
+    print(f"Zuordnung Kraftwert -> Position, {duration:.0f} s Fahrt simuliert, "
+          f"Verarbeitung 0-20 ms nach dem Messwert")
+    for feed in (5, 100, 500):
+        sim = Simulation(specimen=SpecimenModel(break_elongation=1e9), seed=seed)
+        m = sim.machine
+        clock = sim.clock
+        sim.settle()
+        # Verarbeitung verzögert statt direkt beim Messwert
+        sim.load_cell.on_sample = lambda: clock.schedule(clock() + rng.uniform(0, 0.02), m.process_pending)
+        steps = sim.driver.step_times = []
+        pairs = []
+
+        def publish(t, raw, force, position):
+            # Messzeitpunkt, zugeordnete Position, Zähler beim Verarbeiten (alte Methode)
+            pairs.append((t, position, m.motor.position_steps))
+        m.publisher = publish
+        start = time.perf_counter()
+        sim.run_test(os.path.join(tmp.name, f"pairing_{feed}.csv"), feed_rate=feed, zuglaenge=feed / 60 * duration, kraft_abfall_grenze=0)
+        elapsed = time.perf_counter() - start
+        m.publisher = None
+        old_err = []
+        new_err = []
+        for t, position, counter in pairs:
+            truth = bisect.bisect_right(steps, t)  # Schritte bis zum Messzeitpunkt
+            old_err.append(abs(counter - truth))
+            new_err.append(abs(position - truth))
+        mm_per_step = m.motor.mm_per_step
+        print(f"  {feed:4d} mm/min  {len(steps):6d} Schritte, {len(pairs):4d} Messwerte  "
+              f"alt: max {max(old_err):5.0f} Schritte ({max(old_err) * mm_per_step * 1e3:6.1f} µm)  "
+              f"neu: max {max(new_err):4.2f} mittel {sum(new_err) / len(new_err):4.2f} Schritte "
+              f"({max(new_err) * mm_per_step * 1e3:5.2f} µm)  ({elapsed:4.1f} s)")
+        # Interpoliert zwischen zwei Schritten, die Wahrheit ist ganzzahlig: Fehler < 1 Schritt
+        assert max(new_err) < 1.0
+    tmp.cleanup()
+
+
+# ------------------------------------------
+# Auswertung: synthetische Logs, seriell vs. Prozess-Pool
+# ------------------------------------------
+def _synthetic_curve(rng, points=1500):
+    import numpy as np
+    k = rng.uniform(300, 500)           # N/mm
+    f_yield = rng.uniform(40, 60)       # N
+    x_break = rng.uniform(1.0, 3.0)     # mm
+    x = np.linspace(0, x_break * 1.05, points)
+    x_yield = f_yield / k
+    plastic = f_yield + 8 * np.sqrt(np.clip(x - x_yield, 0, None))
+    force = np.where(x < x_yield, k * x, plastic)
+    force[x > x_break] *= 0.05
+    return x, force + rng.normal(0, 0.05, points)
+
+
+def bench_analysis(files=3000):
+    import csv
+    import os
+    import tempfile
+    import numpy as np
+    from analysis import analyse_directory, analyse_curve, write_summary
+    rng = np.random.default_rng(1)
+    print(f"Auswertung von {files} synthetischen Logs mit je 1500 Punkten ({os.cpu_count()} Kerne)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(files):
+            x, force = _synthetic_curve(rng)
+            with open(os.path.join(tmp, f"probe_{i}.csv"), "w") as f:
+                f.write("Position;Force\n")
+                np.savetxt(f, np.column_stack((x, force)), fmt="%.2f", delimiter=";")
+
+        # Referenz: zeilenweises Parsen mit dem csv-Modul
+        sample = sorted(os.listdir(tmp))[:200]
+        start = time.perf_counter()
+        for name in sample:
+            with open(os.path.join(tmp, name)) as f:
+                rows = list(csv.reader(f, delimiter=";"))[1:]
+            position = np.array([float(r[0]) for r in rows])
+            force = np.array([float(r[1]) for r in rows])
+            analyse_curve(position, force)
+        per_row = (time.perf_counter() - start) / len(sample)
+        print(f"  csv-Modul zeilenweise:      {per_row * 1e3:6.2f} ms/Log")
+
+        for workers in (1, None):
+            start = time.perf_counter()
+            results = analyse_directory(tmp, workers=workers)
+            elapsed = time.perf_counter() - start
+            label = "seriell" if workers == 1 else "Prozess-Pool"
+            print(f"  analyse_directory {label:12s} {elapsed / len(results) * 1e3:6.2f} ms/Log  "
+                  f"gesamt {elapsed:6.2f} s  ({len(results) / elapsed:7.0f} Logs/s)")
+        write_summary(results, os.path.join(tmp, "zusammenfassung.csv"))
+
+
+# ------------------------------------------
+# Kraftfilter: Streaming und Batch
+# ------------------------------------------
+def bench_filters(stream_n=200_000, batch_n=1_000_000):
+    import numpy as np
+    from filters import (SpikeFilter, MedianFilter, MovingAverage, EmaFilter,
+                         KalmanFilter, FilterChain)
+    rng = np.random.default_rng(2)
+    data = np.cumsum(rng.normal(0, 0.05, batch_n))
+    data[::101] += 40  # Ausreißer
+    stream = data[:stream_n].tolist()
+    stages = [
+        ("SpikeFilter", lambda: SpikeFilter()),
+        ("MedianFilter(5)", lambda: MedianFilter(5)),
+        ("MovingAverage(8)", lambda: MovingAverage(8)),
+        ("EmaFilter(0.3)", lambda: EmaFilter(0.3)),
+        ("KalmanFilter", lambda: KalmanFilter()),
+        ("Kette Spike+Median+EMA", lambda: FilterChain(SpikeFilter(), MedianFilter(5), EmaFilter(0.3))),
+    ]
+    print(f"Filter: Streaming über {stream_n} Werte, Batch über {batch_n} Werte")
+    for name, make in stages:
+        stage = make()
+        update = stage.update
+        start = time.perf_counter()
+        streamed = [update(x) for x in stream]
+        t_stream = time.perf_counter() - start
+        start = time.perf_counter()
+        batched = make().batch(data)
+        t_batch = time.perf_counter() - start
+        diff = float(np.max(np.abs(np.array(streamed) - batched[:stream_n])))
+        print(f"  {name:24s} Streaming {stream_n / t_stream:9.0f} Werte/s ({t_stream / stream_n * 1e6:5.2f} µs, "
+              f"{stream_n / t_stream / 80:6.0f}x 80 SPS)  Batch {batch_n / t_batch / 1e6:6.2f} Mio Werte/s  "
+              f"max. Abweichung {diff:.1e}")
+
+
+# ------------------------------------------
+# Simulation: kompletter Versuch in virtueller Zeit
+# ------------------------------------------
+def _stop_to_last_step(r):
+    """Zeit von der Erkennung bis zum letzten Schritt, 'kein Schritt' wenn danach keiner mehr kam."""
+    dt = r["stop_to_last_step"]
+    if dt is None:
+        return "   n/a"
+    return f"{dt * 1e3:6.2f} ms" if dt > 0 else "kein Schritt"
+
+
+def bench_simulation():
+    import os
+    import tempfile
+    import tkinter as tk
+    from display import DisplayRenderer
+    from simulation import Simulation, SpecimenModel
+    print("Kompletter Zugversuch auf simulierter Hardware (Bruch bei 1.5 mm, Abbruch bei 5 N Kraftabfall in 150 ms)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for feed in (5, 20, 100):
+            sim = Simulation()
+            sim.settle()
+            r = sim.run_test(os.path.join(tmp, f"sim_{feed}.csv"), feed_rate=feed, zuglaenge=3)
+            latency = r["detection_latency"]
+            print(f"  {feed:3d} mm/min: {r['duration']:6.1f} s virtuell in {r['wall_time']:5.2f} s "
+                  f"({r['duration'] / r['wall_time']:5.0f}x Echtzeit)  Erfassung {r['sample_rate']:5.1f} SPS, "
+                  f"verloren {r['dropped']}  Schrittfehler max {r['max_step_lateness'] * 1e6:.1f} µs  "
+                  f"Bruch->Erkennung {latency * 1e3 if latency is not None else float('nan'):6.1f} ms  "
+                  f"Erkennung->letzter Schritt {_stop_to_last_step(r)}")
+
+        # Bruch-Erkennung: Kriterien einzeln, Probe mit langsamem Kraftabfall nach dem Bruch
+        print("  Bruch-Erkennung bei 20 mm/min (Kraft fällt nach dem Bruch über 400 ms auf 0):")
+        for label, criteria in (("Grenze 5 N in 150 ms", dict(kraft_abfall_grenze=5)),
+                                ("drop 5 N", dict(kraft_abfall_grenze=0, abfall_vom_maximum=5)),
+                                ("drop_percent 10 %", dict(kraft_abfall_grenze=0, drop_percent=10)),
+                                ("rate 50 N/s (window 4)", dict(kraft_abfall_grenze=0, rate=50, window=4))):
+            sim = Simulation(specimen=SpecimenModel(break_duration=0.4))
+            sim.settle()
+            r = sim.run_test(os.path.join(tmp, "sim_criteria.csv"), feed_rate=20, zuglaenge=3, **criteria)
+            print(f"    {label:24s} Bruch->Erkennung {r['detection_latency'] * 1e3:6.1f} ms  "
+                  f"Erkennung->letzter Schritt {_stop_to_last_step(r)}  "
+                  f"Maximum {r['max_force']:.1f} N")
+
+        # UI-Kosten: Renderer über dem DisplayModel der Simulation
+        root = tk.Tcl()
+        var = tk.StringVar(master=root)
+        renderer = DisplayRenderer(root, fps=30)
+        m = sim.machine
+        renderer.bind(_FakeLabel(root, var), lambda: m.motor.position_mm, "Position: {:.2f} mm")
+        renderer.bind(_FakeLabel(root, var), lambda: m.display.force, "Kraft: {:.2f} N")
+        renderer.bind(_FakeLabel(root, var), lambda: m.display.max_force, "Max: {:.2f} N")
+        frames = 3000
+        start = time.perf_counter()
+        for i in range(frames):
+            m.display.force = i * 0.01
+            renderer.render()
+        render = (time.perf_counter() - start) / frames
+        per_sample = r["cpu_time"] / max(r["samples"], 1)
+        print(f"  UI: Renderer {render * 1e6:.1f} µs/Bild (3 Labels); Verarbeitung inkl. Motor-Simulation "
+              f"{per_sample * 1e6:.0f} µs CPU pro Messwert")
+
+
+# ------------------------------------------
+# Messgrößen: Kosten der Instrumentierung im Hot Path
+# ------------------------------------------
+def bench_metrics(n=200_000, repeat=9):
+    import os
+    import tempfile
+    from metrics import Histogram
+    from simulation import Simulation
+    import statistics
+    values = [1e-5 * (1 + (i % 997)) for i in range(n)]
+    times = []
+    for _ in range(5):
+        h = Histogram()
+        record = h.record
+        start = time.perf_counter()
+        for v in values:
+            record(v)
+        times.append((time.perf_counter() - start) / n)
+    per_record = statistics.median(times)
+    print(f"Histogram.record: {per_record * 1e9:.0f} ns pro Wert (Median aus 5, "
+          f"{min(times) * 1e9:.0f}-{max(times) * 1e9:.0f} ns), p50 {h.percentile(50) * 1e3:.3f} ms, "
+          f"p99 {h.percentile(99) * 1e3:.3f} ms")
+    # Pro Messwert: Lesedauer, Abstand, Rückstau (+ Schritte je nach Vorschub)
+    per_sample = 3 * per_record
+    print(f"  ~{per_sample * 1e6:.2f} µs pro Messwert = {per_sample / 0.0125 * 100:.4f} % des 12.5-ms-Budgets bei 80 SPS")
+
+    # Gesamter Versuch in der Simulation mit und ohne Instrumentierung. Ein einzelner
+    # Lauf schwankt stärker als der Unterschied: abwechselnd wiederholen, Median und Streuung
+    import statistics
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {"ohne": [], "mit": []}
+        for run in range(repeat):
+            for label, enabled in (("ohne", False), ("mit", True)):
+                sim = Simulation()
+                m = sim.machine
+                if not enabled:
+                    m.acquisition.metrics = None
+                    m.motor.metrics = None
+                    m.metrics.backlog = Histogram("Werte", 1, 10000, 10)
+                sim.settle()
+                r = sim.run_test(os.path.join(tmp, f"metrics_{label}_{run}.csv"), feed_rate=5, zuglaenge=3)
+                results[label].append(r["cpu_time"] / max(r["samples"], 1))
+        for label, values in results.items():
+            print(f"  Simulation {label:4s} Metriken: median {statistics.median(values) * 1e6:6.1f} µs CPU pro Messwert "
+                  f"(min {min(values) * 1e6:5.1f}, max {max(values) * 1e6:5.1f}, {repeat} Läufe)")
+        diff = statistics.median(results["mit"]) - statistics.median(results["ohne"])
+        spread = statistics.stdev(results["ohne"] + results["mit"]) if repeat > 1 else float("nan")
+        print(f"  Unterschied der Mediane {diff * 1e6:+5.1f} µs, Streuung (Standardabw.) {spread * 1e6:4.1f} µs; "
+              f"direkt gemessen kosten die record()-Aufrufe ~{per_sample * 1e6:.2f} µs")
+        summary = m.metrics_summary()
+        print(f"  Zähler: {summary['counters']}")
+        print(f"  Schrittverspätung p99 {summary['step_lateness']['p99'] * 1e6:.1f} µs, "
+              f"Recorder-Warteschlange max {summary['logger_queue'].get('max', 0):.0f} Blöcke")
+
+
+# ------------------------------------------
+# Tarierung und Kalibrierung aus dem Messwertstrom
+# ------------------------------------------
+class _DeadWeight:
+    """Probe mit fester Kraft (Gewicht am Kraftaufnehmer) für die Kalibrierung."""
+    broken_at = None
+
+    def __init__(self):
+        self.load = 0.0
+
+    def force(self, x, t=None):
+        return self.load
+
+    def update(self, x, t):
+        pass
+
+
+def bench_tare(runs=20):
+    import random
+    from calibration import trimmed_mean
+    from simulation import Simulation
+    weight = _DeadWeight()
+    sim = Simulation(specimen=weight, noise=0.05)
+    m = sim.machine
+    zero = sim.load_cell.zero
+    sim.clock.sleep(0.5)
+    calls, periods, errors = [], [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        averaging = m.tare()
+        calls.append(time.perf_counter() - start)
+        t0 = sim.clock()
+        sim.clock.wait(averaging.done, 1.0)
+        periods.append((sim.clock() - t0) / m.acquisition.period)
+        errors.append(abs(m.hx.offset - zero) * abs(m.scale))
+    print(f"Tarierung (16 Werte, 25 % getrimmt): Aufruf {max(calls) * 1e6:.0f} µs (blockiert nicht), "
+          f"fertig nach {max(periods):.1f} Perioden (Grenze 32), Nullpunktfehler max {max(errors) * 1e3:.1f} mN")
+
+    # Robustheit: einzelne Ausreißer (z.B. Rohwert 0 bei Störung) im Fenster
+    rng = random.Random(3)
+    plain, trimmed = [], []
+    for _ in range(1000):
+        values = [zero + rng.gauss(0, 0.05 / abs(m.scale)) for _ in range(16)]
+        values[rng.randrange(16)] = 0
+        plain.append(abs(sum(values) / 16 - zero) * abs(m.scale))
+        trimmed.append(abs(trimmed_mean(values) - zero) * abs(m.scale))
+    print(f"  Mit einem Ausreißer (Rohwert 0) im Fenster: Mittelwert-Fehler {max(plain):.3f} N, "
+          f"getrimmt {max(trimmed) * 1e3:.1f} mN")
+
+    # Kalibrierung: Gewichte 0..50 N, Ausgleichsgerade gegen den Skalenfaktor der Simulation
+    for load in (0.0, 10.0, 20.0, 50.0):
+        weight.load = load
+        sim.clock.sleep(0.1)
+        averaging = m.capture_calibration_point(load)
+        sim.clock.wait(averaging.done, 2.0)
+    profile = m.calibrate("Simulation")
+    print(f"  Kalibrierung mit 4 Punkten: {profile.scale:.10f} N/Digit (Simulation {sim.load_cell.scale:.10f}, "
+          f"{(profile.scale / sim.load_cell.scale - 1) * 100:+.3f} %), Restfehler {profile.rms * 1e3:.1f} mN")
+
+
+# ------------------------------------------
+# Mehrere HX711 an einer gemeinsamen SCK
+# ------------------------------------------
+class _ShiftRegisterChips:
+    """
+    Simuliert die Schieberegister mehrerer HX711 an einer SCK: bei jeder steigenden
+    Flanke legt jeder Chip sein nächstes Datenbit an DOUT, danach zählen die Zusatzpulse.
+    """
+    def __init__(self, backend):
+        self.pins = [dout.pin for dout in backend.douts]
+        self.values = [0] * len(self.pins)
+        self.bit = 0
+        self.pulses = 0
+        set_sck = backend._set_sck
+
+        def clock(state):
+            set_sck(state)
+            if not state:
+                return
+            if self.bit < 24:
+                for pin, value in zip(self.pins, self.values):
+                    if (value >> (23 - self.bit)) & 1:
+                        pin.drive_high()
+                    else:
+                        pin.drive_low()
+                self.bit += 1
+            else:
+                self.pulses += 1
+        backend._set_sck = clock
+
+    def load(self, values):
+        self.values = [value & 0xFFFFFF for value in values]
+        self.bit = 0
+        self.pulses = 0
+
+
+def _best_of(func, n, repeat=5):
+    """Kürzeste mittlere Laufzeit pro Aufruf aus repeat Blöcken zu n Aufrufen."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(n):
+            func()
+        best = min(best, (time.perf_counter() - start) / n)
+    return best
+
+
+def bench_multi(n=1000):
+    import random
+    from HX711 import HX711, FastBackend, MultiHX711
+    from simulation import NoHistory
+    factory = use_mock_pins()
+    dout_pins = (5, 13, 16, 20)
+    sck_pins = (6, 12, 21, 25)
+    print(f"Mehrere HX711 mit MockFactory, bester von 5 Blöcken zu {n} Auslesungen aller Chips")
+    for chips in range(1, 5):
+        factory.reset()
+        # Bisher: ein HX711-Objekt (eigene SCK) pro Chip, nacheinander ausgelesen
+        singles = [HX711(dout_pin=d, sck_pin=c, backend=FastBackend)
+                   for d, c in zip(dout_pins[:chips], sck_pins[:chips])]
+        for hx in singles:
+            hx.sck.pin.states = NoHistory()
+
+        def read_singles():
+            for hx in singles:
+                hx.read_now()
+        sequential = _best_of(read_singles, n)
+        factory.reset()
+        multi = MultiHX711(dout_pins[:chips], sck_pin=6)
+        multi.sck.pin.states = NoHistory()
+        shared = _best_of(multi.read_now, n)
+        print(f"  {chips} Chip(s): nacheinander {sequential * 1e6:6.1f} µs ({chips / sequential:7.0f} Werte/s)  "
+              f"gemeinsame SCK {shared * 1e6:6.1f} µs ({chips / shared:7.0f} Werte/s)  "
+              f"-> {sequential / shared:4.2f}x")
+
+    # Bitgenauigkeit und Umschaltung: simulierte Schieberegister, A128 und B32 im Wechsel
+    factory.reset()
+    multi = MultiHX711(dout_pins, sck_pin=6, modes=[("A", 128), ("B", 32)], dwell=3, settle=1)
+    chips = _ShiftRegisterChips(multi.backend)
+    rng = random.Random(5)
+    errors = 0
+    modes = []
+    for _ in range(16):
+        expected = [rng.randint(-0x800000, 0x7FFFFF) for _ in range(4)]
+        chips.load(expected)
+        mode, values = multi.read_now()
+        errors += values != expected
+        modes.append("-" if mode is None else f"{multi.modes[mode][0]}{multi.modes[mode][1]}")
+    print(f"  4 simulierte Chips: {errors} falsche Vektoren von 16, Einstellung je Auslesen "
+          f"(- = verworfen): {' '.join(modes)}")
+
+
+# ------------------------------------------
+# Eigener Prozess für die Maschine vs. alles in einem Prozess, unter GUI-Last
+# ------------------------------------------
+def _mock_machine(report=None):
+    """
+    Maschine auf Mock-Pins mit 80-SPS-Datenquelle in Echtzeit (läuft auch im
+    Service-Prozess). Meldet die Geräte und tariert wie from_gpio.
+    """
+    import threading
+    from HX711 import HX711, FastBackend
+    from simulation import NoHistory
+    from zugpruefmaschine import Zugpruefmaschine
+    report = report or (lambda device, text: None)
+    use_mock_pins()
+    hx = HX711(dout_pin=5, sck_pin=6, backend=FastBackend)
+    hx.sck.pin.states = NoHistory()
+    hx.dout.pin.states = NoHistory()
+    report("HX711", "ok")
+    source = _DataReadySource(hx)
+    threading.Thread(target=source.run, args=(3600,), daemon=True).start()
+    machine = Zugpruefmaschine(hx, _PulseRecorder(), _PulseRecorder())
+    report("Motor", "ok")
+    machine.devices = {"HX711": "ok", "Motor": "ok"}
+    machine.tare()
+    return machine
+
+
+def _gui_load(stop, busy=0.03, idle=0.005):
+    """Synthetische GUI-Last: 30 ms reines Python (z.B. Neuzeichnen), dann 5 ms Pause."""
+    while not stop.is_set():
+        end = time.perf_counter() + busy
+        x = 0
+        while time.perf_counter() < end:
+            x += sum(range(200))
+        time.sleep(idle)
+
+
+def _run_jitter_test(machine, logfile, load):
+    import threading
+    stop = threading.Event()
+    loader = threading.Thread(target=_gui_load, args=(stop,), daemon=True)
+    if load:
+        loader.start()
+    machine.feed_rate = 60
+    machine.zuglaenge = 3
+    machine.kraft_abfall_grenze = 0
+    machine.start_test(logfile)
+    while machine.is_testing:
+        time.sleep(0.05)
+    stop.set()
+    if load:
+        loader.join()
+    return machine.metrics_summary()
+
+
+def _report_jitter(name, summary):
+    steps = summary["step_lateness"]
+    interval = summary["sample_interval"]
+    counters = summary["counters"]
+    print(f"  {name:28s} Schrittverspätung p99 {steps['p99'] * 1e3:6.2f} ms  max {steps['max'] * 1e3:6.2f} ms  "
+          f"zu spät {counters['step_deadline_misses']:4d}/{steps['count']}  "
+          f"Messwertabstand max {interval['max'] * 1e3:6.1f} ms  verloren {counters['dropped_conversions']}")
+
+
+def bench_service():
+    import os
+    import tempfile
+    from service import MachineClient
+    print("Schrittausgabe (60 mm/min, 3 s) und Erfassung (80 SPS) unter synthetischer GUI-Last")
+    with tempfile.TemporaryDirectory() as tmp:
+        for load in (False, True):
+            machine = _mock_machine()
+            machine.start()
+            time.sleep(0.3)
+            summary = _run_jitter_test(machine, os.path.join(tmp, f"single_{load}.csv"), load)
+            machine.shutdown()
+            _report_jitter("ein Prozess" + (" + GUI-Last" if load else ""), summary)
+
+        client = MachineClient(factory=_mock_machine, cpu=0, priority=50)
+        client.start()
+        time.sleep(0.3)
+        summary = _run_jitter_test(client, os.path.join(tmp, "split.csv"), True)
+        _report_jitter("Service-Prozess + GUI-Last", summary)
+        seq, samples, dropped = client.ring.read_since(0)
+        print(f"  Shared Memory: {seq} Messwerte veröffentlicht, GUI liest die letzten {len(samples)}"
+              f"{'; ' + '; '.join(client.notes) if client.notes else ''}")
+        client.shutdown()
+
+
+# ------------------------------------------
+# Live-Datenserver: Dutzende Clients, langsame Clients, inkrementeller Abruf
+# ------------------------------------------
+def _stream_producer(ring_name, size, rate, duration, conn):
+    """Stand-in für den Service-Prozess: veröffentlicht rate Werte/s und misst die eigene Verspätung."""
+    from service import SharedSampleRing, set_realtime
+    # Wie der echte Service: erhöhte Priorität, soweit erlaubt
+    set_realtime(priority=50)
+    ring = SharedSampleRing(ring_name, size)
+    period = 1.0 / rate
+    lateness = []
+    start = time.perf_counter()
+    for i in range(int(duration * rate)):
+        deadline = start + i * period
+        remaining = deadline - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+        now = time.perf_counter()
+        lateness.append(now - deadline)
+        ring.publish(now, i, 0.01 * i, i)
+        ring.set_status(i * 0.001, 0.01 * i, 0.01 * i, True, True)
+    ring.close()
+    lateness.sort()
+    conn.send((sum(lateness) / len(lateness), lateness[int(len(lateness) * 0.99)], lateness[-1]))
+
+
+def _stream_clients(port, fast, slow, duration, conn):
+    """Client-Prozess: fast Clients lesen laufend, slow Clients (kleiner Empfangspuffer) lesen erst am Ende."""
+    import asyncio
+    import socket
+    from stream_server import read_frame
+
+    async def client(slow_reader):
+        sock = socket.socket()
+        if slow_reader:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        sock.connect(("127.0.0.1", port))
+        # Kleines limit: der StreamReader puffert sonst selbst bis 128 KB vor
+        reader, writer = await asyncio.open_connection(sock=sock, limit=4096 if slow_reader else 2 ** 16)
+        writer.write(b"LIVE\n")
+        await writer.drain()
+        if slow_reader:
+            await asyncio.sleep(duration)
+        received = 0
+        gaps = 0
+        expected = None
+        decimations = set()
+        # Lesen, bis nach dem Erzeuger eine Sekunde lang nichts mehr kommt
+        while True:
+            try:
+                _, _, first, decimation, rows = await asyncio.wait_for(
+                    read_frame(reader), 1.0 if received else duration + 2.0)
+            except asyncio.TimeoutError:
+                break
+            if expected is not None and first != expected:
+                gaps += 1
+            expected = first + len(rows) * decimation
+            decimations.add(decimation)
+            received += len(rows)
+        writer.close()
+        return received, gaps, max(decimations) if decimations else 0
+
+    async def main():
+        return await asyncio.gather(*[client(False) for _ in range(fast)],
+                                    *[client(True) for _ in range(slow)])
+    conn.send(asyncio.run(main()))
+
+
+def bench_stream(rate=2000, duration=4.0, fast=40, slow=8):
+    import multiprocessing as mp
+    import os
+    import tempfile
+    import threading
+    import numpy as np
+    from recorder import Recorder
+    from service import SharedSampleRing
+    from stream_server import StreamServer, COMPLETE, read_frame_header, FRAME
+    print(f"Live-Datenserver: Erzeuger mit {rate} Werten/s im eigenen Prozess, {duration:.0f} s, "
+          f"{fast} schnelle + {slow} langsame Clients")
+
+    def run_producer():
+        parent, child = mp.Pipe()
+        producer = mp.Process(target=_stream_producer, args=(ring.name, ring.size, rate, duration, child))
+        producer.start()
+        return producer, parent
+
+    ring = SharedSampleRing(size=65536)
+    producer, result = run_producer()
+    producer.join()
+    mean, p99, worst = result.recv()
+    print(f"  Erzeuger allein:       Verspätung mittel {mean * 1e6:6.0f} µs  p99 {p99 * 1e6:6.0f} µs  max {worst * 1e6:6.0f} µs")
+
+    server = StreamServer(ring, mm_per_step=3.125 / 1600, port=0).start()
+    parent, child = mp.Pipe()
+    clients = mp.Process(target=_stream_clients, args=(server.port, fast, slow, duration, child))
+    clients.start()
+    time.sleep(0.5)
+    cpu = time.process_time()
+    producer, result = run_producer()
+    producer.join()
+    cpu = time.process_time() - cpu
+    mean, p99, worst = result.recv()
+    stats = parent.recv()
+    clients.join()
+    print(f"  Erzeuger + Server:     Verspätung mittel {mean * 1e6:6.0f} µs  p99 {p99 * 1e6:6.0f} µs  max {worst * 1e6:6.0f} µs  "
+          f"Server-CPU {cpu / duration * 100:4.1f} %")
+    total = int(rate * duration)
+    fast_stats = stats[:fast]
+    slow_stats = stats[fast:]
+    print(f"  Schnelle Clients: {min(r for r, _, _ in fast_stats)}-{max(r for r, _, _ in fast_stats)} "
+          f"von {total} Werten, Lücken {sum(g for _, g, _ in fast_stats)}, "
+          f"Dezimierung max {max(d for _, _, d in fast_stats)}")
+    print(f"  Langsame Clients: {min(r for r, _, _ in slow_stats)}-{max(r for r, _, _ in slow_stats)} Werte, "
+          f"Dezimierung bis {max(d for _, _, d in slow_stats)}; Server hat nie gewartet "
+          f"({server.frames} Frames verschickt)")
+    server.stop()
+    ring.close()
+
+    # Aufgezeichnete Daten inkrementell abrufen, während der Versuch noch schreibt
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "fetch.rec")
+        recorder = Recorder(path, metadata={"mm_per_step": 0.01}, wait=5.0)
+        ring = SharedSampleRing(size=16)
+        server = StreamServer(ring, mm_per_step=0.01, recording=lambda: path, port=0).start()
+        rows = 200_000
+
+        def write():
+            for i in range(rows):
+                recorder.append(i * 0.0125, i, i * 0.5, i)
+                if i % 20000 == 0:
+                    time.sleep(0.01)
+            recorder.finalise()
+        writer = threading.Thread(target=write)
+        writer.start()
+        import socket
+        sock = socket.create_connection(("127.0.0.1", server.port))
+        f = sock.makefile("rb")
+        offset, requests, errors = 0, 0, 0
+        start = time.perf_counter()
+        while True:
+            sock.sendall(f"FETCH {offset}\n".encode())
+            kind, status, first, n, _ = read_frame_header(f.read(FRAME.size))
+            block = np.frombuffer(f.read(n * 24), dtype="<f8").reshape(n, 3)
+            requests += 1
+            if n:
+                errors += int(np.any(block[:, 1] != np.arange(first, first + n) * 0.5))
+            offset = first + n
+            if status & COMPLETE:
+                break
+            if not n:
+                time.sleep(0.005)
+        elapsed = time.perf_counter() - start
+        writer.join()
+        sock.close()
+        server.stop()
+        ring.close()
+        print(f"  FETCH während der Aufzeichnung: {offset} von {rows} Werten in {requests} Abrufen, "
+              f"{elapsed:.2f} s, {errors} fehlerhafte Blöcke")
+
+
+# ------------------------------------------
+# Live-Plot: Zeit pro Bild bei wachsender Kurve
+# ------------------------------------------
+class _CountingCanvas:
+    """Canvas-Ersatz ohne Display: zählt nur die Aufrufe und übergebenen Koordinaten."""
+    def __init__(self, width=800, height=260):
+        self.width = width
+        self.height = height
+        self.items = 0
+        self.coords_sent = 0
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def create_line(self, *coords, **options):
+        self.coords_sent += len(coords) // 2
+        self.items += 1
+        return self.items
+
+    def create_rectangle(self, *args, **options):
+        self.items += 1
+        return self.items
+
+    create_text = create_rectangle
+
+    def delete(self, item):
+        pass
+
+
+def bench_liveplot(n=400_000, rate=1000, fps=30):
+    import numpy as np
+    from liveplot import LivePlot
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        canvas = tk.Canvas(root, width=800, height=260)
+        canvas.pack()
+        root.update()
+        real = True
+    except Exception:
+        # Ohne Display: nur die Python-Seite (Dezimierung, Koordinaten), Tk-Zeit fehlt
+        root = None
+        canvas = _CountingCanvas()
+        real = False
+    per_frame = max(1, rate // fps)
+    x, force = _synthetic_curve(np.random.default_rng(3), n)
+    xs = x.tolist()
+    fs = force.tolist()
+    print(f"Live-Plot: {n} Werte bei {rate} Hz, {fps} Bilder/s, "
+          f"{'Tk-Canvas' if real else 'ohne Display (nur Python-Seite)'}")
+
+    def frame_times(plot):
+        times = []
+        sent = []
+        for i in range(0, n, per_frame):
+            start = time.perf_counter()
+            for j in range(i, min(i + per_frame, n)):
+                plot.add(xs[j], fs[j])
+            plot.draw()
+            if root is not None:
+                root.update_idletasks()
+            times.append(time.perf_counter() - start)
+            sent.append(plot.points_sent)
+        return np.array(times), np.diff(np.array(sent), prepend=0)
+
+    plot = LivePlot(canvas, max_points=2000, x_range=1.0, y_range=10.0)
+    times, sent = frame_times(plot)
+    tenth = len(times) // 10
+    print(f"  inkrementell: erstes Zehntel p99 {np.percentile(times[:tenth], 99) * 1e3:6.2f} ms, "
+          f"letztes Zehntel p99 {np.percentile(times[-tenth:], 99) * 1e3:6.2f} ms, "
+          f"max {times.max() * 1e3:6.2f} ms")
+    print(f"                Punkte an Tk pro Bild: median {np.median(sent):.0f}, max {sent.max()}, "
+          f"{plot.redraws} komplette Neuzeichnungen, {len(plot.current.points())} Punkte sichtbar")
+    peak = max(y for _, y in plot.current.points())
+    print(f"                Maximum der Kurve {peak:.2f} N (Rohdaten {force.max():.2f} N)")
+
+    # Vergleich: jedes Bild komplett neu, ohne Dezimierung
+    sample = n // 10
+    plot = LivePlot(canvas, max_points=2 * n, x_range=1.0, y_range=10.0)
+    for j in range(n - sample):
+        plot.add(xs[j], fs[j])
+    start = time.perf_counter()
+    plot.redraw()
+    if root is not None:
+        root.update_idletasks()
+    full = time.perf_counter() - start
+    print(f"  ohne Dezimierung, komplett neu: {full * 1e3:6.1f} ms pro Bild bei {n - sample} Werten")
+    if root is not None:
+        root.destroy()
+
+
+# ------------------------------------------
+# Prüfprogramme: zyklische Be- und Entlastung auf simulierter Hardware
+# ------------------------------------------
+def _cycle_program(cycles, record):
+    return {"name": "Ermüdung", "record": record, "steps": [
+        {"move": 5, "speed": 10, "until_force": 5},
+        {"hold": 1},
+        {"repeat": cycles, "steps": [
+            {"to": 3, "speed": 60, "until_force": 60},
+            {"to": 0, "speed": 60, "until_force": 5}]}]}
+
+
+def bench_program(cycles=10_000):
+    import gc
+    import os
+    import resource
+    import tempfile
+    from program import compile_program
+    from simulation import Simulation, CyclicSpecimenModel
+    print(f"Prüfprogramm: Vorlast 5 N, 1 s halten, {cycles} Zyklen 5 N <-> 60 N bei 60 mm/min "
+          "(simulierte Probe mit Hysterese)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n, record in ((cycles // 10, True), (cycles, False)):
+            sim = Simulation(specimen=CyclicSpecimenModel())
+            sim.settle()
+            program = compile_program(_cycle_program(n, record), sim.driver.mm_per_step)
+            logfile = os.path.join(tmp, f"zyklen_{n}.csv")
+            r = sim.run_program(program, logfile)
+            gc.collect()
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            runner = r["runner"]
+            last = runner.cycles.recent[-1]
+            with open(os.path.splitext(logfile)[0] + ".cycles.csv") as f:
+                rows = sum(1 for _ in f) - 1
+            print(f"  {n:6d} Zyklen{' mit Rohdaten' if record else ', nur Kennwerte'}: "
+                  f"{r['duration'] / 3600:5.2f} h virtuell in {r['wall_time']:5.1f} s, "
+                  f"{r['samples']} Messwerte, {r['steps']} Schritte, Ende: {r['stop_reason']}")
+            print(f"         {rows} Zeilen in .cycles.csv, letzter Zyklus: Spitze {last[4]:.1f} N, "
+                  f"Tal {last[5]:.1f} N, Hysterese {last[8]:.2f} N·mm; "
+                  f"max. RSS {rss:.0f} MB, {len(gc.get_objects())} Python-Objekte")
+
+
+# ------------------------------------------
+# Ergebniskatalog: Versuche anlegen und abfragen
+# ------------------------------------------
+def _probe_filename(log_dir, base_name):
+    """Bisheriges get_log_filename: nächste freie Nummer per os.path.exists."""
+    import os
+    index = 1
+    filename = f"{log_dir}/{base_name}_{index}.csv"
+    while os.path.exists(filename):
+        index += 1
+        filename = f"{log_dir}/{base_name}_{index}.csv"
+    return filename
+
+
+def bench_catalog(runs=100_000, existing=(1000, 10000), imports=1000):
+    import os
+    import tempfile
+    import numpy as np
+    from catalog import Catalog
+    print(f"Ergebniskatalog: {runs} Versuche anlegen und abfragen")
+    with tempfile.TemporaryDirectory() as tmp:
+        # Vorher: Suche nach dem nächsten freien Namen, wächst mit der Anzahl der Logs
+        old = os.path.join(tmp, "alt")
+        os.makedirs(old)
+        created = 0
+        for n in existing:
+            for i in range(created, n):
+                open(os.path.join(old, f"probe_{i + 1}.csv"), "w").close()
+            created = n
+            start = time.perf_counter()
+            _probe_filename(old, "probe")
+            print(f"  vorher  os.path.exists-Suche bei {n:6d} Logs: {(time.perf_counter() - start) * 1e3:7.2f} ms")
+
+        catalog = Catalog(os.path.join(tmp, "logs"))
+        rng = np.random.default_rng(5)
+        materials = ["PLA", "PETG", "ABS", "Alu", "Stahl", "PA12", "TPU", "Holz"]
+        feeds = [1, 2, 5, 10, 20, 50]
+        t0 = 1.7e9
+        times = np.empty(runs)
+        for i in range(runs):
+            start = time.perf_counter()
+            catalog.reserve(f"probe{i % 50}", created=t0 + i * 600,
+                            material=materials[i % len(materials)], feed_rate=feeds[i % len(feeds)],
+                            zuglaenge=float(1 + i % 10), kraft_abfall_grenze=5.0, profile="Standard")
+            times[i] = time.perf_counter() - start
+        print(f"  nachher reserve(): erste 1000 median {np.median(times[:1000]) * 1e6:6.0f} µs, "
+              f"letzte 1000 median {np.median(times[-1000:]) * 1e6:6.0f} µs, "
+              f"p99 {np.percentile(times, 99) * 1e6:6.0f} µs, gesamt {times.sum():5.1f} s")
+
+        month = 30 * 86400
+        since = t0 + runs * 300
+        queries = (
+            ("Material + Monat", dict(material="PETG", since=since, until=since + month)),
+            ("Parameter-Satz", dict(feed_rate=5, zuglaenge=3.0, kraft_abfall_grenze=5.0, limit=100)),
+            ("neueste 50", dict(limit=50)),
+        )
+        db = catalog._db()
+        for label, query in queries:
+            repeat = 50
+            start = time.perf_counter()
+            for _ in range(repeat):
+                rows = catalog.find(**query)
+            elapsed = (time.perf_counter() - start) / repeat
+            plan = db.execute("EXPLAIN QUERY PLAN SELECT * FROM runs WHERE " + (
+                "material = 'PETG' AND created >= 0 AND created < 1" if "material" in query else
+                "feed_rate = 5 AND zuglaenge = 3 AND kraft_abfall_grenze = 5" if "feed_rate" in query else
+                "1") + " ORDER BY created DESC").fetchall()
+            print(f"  find {label:18s} {elapsed * 1e3:6.2f} ms, {len(rows):4d} Treffer  ({plan[0]['detail']})")
+
+        # Bestehende Logs nachtragen
+        logs = os.path.join(tmp, "bestand")
+        os.makedirs(logs)
+        for i in range(imports):
+            x, force = _synthetic_curve(rng, points=500)
+            with open(os.path.join(logs, f"altversuch_{i + 1}.csv"), "w") as f:
+                f.write("Position;Force\n")
+                np.savetxt(f, np.column_stack((x, force)), fmt="%.2f", delimiter=";")
+        backfill = Catalog(logs)
+        start = time.perf_counter()
+        added = backfill.import_logs(logs)
+        elapsed = time.perf_counter() - start
+        _, path = backfill.reserve("altversuch")
+        print(f"  import_logs: {added} Logs in {elapsed:5.2f} s ({added / elapsed:5.0f} Logs/s), "
+              f"nächster Name {os.path.basename(path)}")
+
+
+# ------------------------------------------
+# GUI-Start: Imports bis zum ersten Bild, Zeit bis die Hardware bereit ist
+# ------------------------------------------
+_GUI_IMPORTS_BEFORE = "zugpruefmaschine, program, stream_server, numpy, service, display, liveplot, catalog, metrics"
+_GUI_IMPORTS_AFTER = "display, liveplot, startup"
+
+
+def _import_time(modules, repeat=5):
+    """Median der Importzeit in einem frischen Interpreter (ohne ttkbootstrap, das brauchen beide)."""
+    import os
+    import statistics
+    import subprocess
+    code = f"import time; t = time.perf_counter(); import {modules}; print(time.perf_counter() - t)"
+    times = [float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout)
+             for _ in range(repeat)]
+    return statistics.median(times)
+
+
+def bench_startup(repeat=3):
+    import os
+    import statistics
+    import tempfile
+    from service import MachineClient
+    from startup import hardware_ready
+    print("GUI-Start: Imports für das erste Bild und Aufbau der Maschine")
+    before = _import_time(_GUI_IMPORTS_BEFORE)
+    after = _import_time(_GUI_IMPORTS_AFTER)
+    print(f"  Imports vorher (alles beim Start)   {before * 1e3:6.1f} ms")
+    print(f"  Imports nachher (nur erstes Bild)   {after * 1e3:6.1f} ms")
+
+    # Service-Prozess mit Mock-Maschine: wie lange die GUI blockiert und wann die Hardware bereit ist
+    blocking = []
+    returned = []
+    ready = []
+    hardware = []
+    for _ in range(repeat):
+        client = MachineClient(factory=_mock_machine)
+        start = time.perf_counter()
+        client.start()
+        blocking.append(time.perf_counter() - start)
+        client.shutdown()
+
+        client = MachineClient(factory=_mock_machine)
+        start = time.perf_counter()
+        client.start(wait=False)
+        returned.append(time.perf_counter() - start)
+        while not client.ready:
+            time.sleep(0.001)
+        ready.append(time.perf_counter() - start)
+        while not hardware_ready(client.device_status(), client.tare_status):
+            time.sleep(0.001)
+        hardware.append(time.perf_counter() - start)
+        client.shutdown()
+    print(f"  vorher  start() blockiert die GUI   {statistics.median(blocking) * 1e3:6.1f} ms (Median über {repeat})")
+    print(f"  nachher start(wait=False) zurück    {statistics.median(returned) * 1e3:6.1f} ms, "
+          f"erster Status {statistics.median(ready) * 1e3:6.1f} ms, "
+          f"HX711 + Tara fertig {statistics.median(hardware) * 1e3:6.1f} ms")
+
+    # Ein-Prozess-Aufbau ohne angeschlossene Wägezelle: kein Warten, der Status zeigt es an.
+    # Gemessen bis from_gpio zurückkehrt, in der GUI läuft das im Aufbau-Thread
+    use_mock_pins()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            from zugpruefmaschine import Zugpruefmaschine
+            reports = []
+            start = time.perf_counter()
+            machine = Zugpruefmaschine.from_gpio(lambda device, text: reports.append((device, text)))
+            machine.hx.dout.pin.drive_high()  # DOUT bleibt high: kein Data ready
+            machine.start()
+            built = time.perf_counter() - start
+            time.sleep(0.6)
+            status = machine.device_status()
+            machine.shutdown()
+        finally:
+            os.chdir(cwd)
+    print(f"  from_gpio ohne Wägezelle: Aufbau {built * 1e3:5.1f} ms ({len(reports)} Meldungen), "
+          f"nach 0.6 s: {', '.join(f'{d}: {t}' for d, t in status.items())}; {machine.tare_status}")
+
+
+BENCHMARKS = {
+    "hx711": bench_hx711,
+    "acquisition": bench_acquisition,
+    "stepper": bench_stepper,
+    "display": bench_display,
+    "recorder": bench_recorder,
+    "pairing": bench_pairing,
+    "analysis": bench_analysis,
+    "filters": bench_filters,
+    "simulation": bench_simulation,
+    "metrics": bench_metrics,
+    "tare": bench_tare,
+    "multi": bench_multi,
+    "service": bench_service,
+    "stream": bench_stream,
+    "liveplot": bench_liveplot,
+    "program": bench_program,
+    "catalog": bench_catalog,
+    "startup": bench_startup,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unbekannter Benchmark: {name} (verfügbar: {', '.join(BENCHMARKS)})")
+            sys.exit(1)
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Tarierung und Kalibrierung aus dem laufenden Messwertstrom.
+
+- WindowAverage: sammelt window Rohwerte aus dem Strom (kein eigenes Takten des
+  HX711) und bildet einen getrimmten Mittelwert. Spätestens nach max_periods
+  Wandlungsperioden ist die Messung fertig, auch wenn Werte fehlen.
+- fit_profile: Ausgleichsgerade durch mehrere (Rohwert, Kraft)-Punkte.
+- ProfileStore: benannte Kraftaufnehmer-Profile in einer JSON-Datei, das
+  aktive Profil wird beim Start geladen.
+
+Kalibrieren über die Konsole:  python calibration.py <profilname> [datei]
+"""
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+DEFAULT_SCALE = -0.0003024406  # N pro Digit (bisheriger fester Wert)
+PROFILE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "loadcells.json")
+
+
+def trimmed_mean(values, trim=0.25):
+    """Mittelwert ohne die trim-Anteile der kleinsten und größten Werte."""
+    values = sorted(values)
+    n = len(values)
+    if n == 0:
+        raise ValueError("keine Werte")
+    k = min(int(n * trim), (n - 1) // 2)
+    kept = values[k:n - k]
+    return math.fsum(kept) / len(kept)
+
+
+class WindowAverage:
+    """
+    Getrimmter Mittelwert über die nächsten window Rohwerte.
+    add() wird vom Sensor-Thread pro Messwert aufgerufen, expire() bei Timeouts.
+    Nach dem Abschluss ist done gesetzt, ok sagt, ob genug Werte da waren,
+    und on_done(self) wird aufgerufen.
+    """
+    def __init__(self, start, window=16, trim=0.25, period=1 / 80, max_periods=None,
+                 min_values=4, on_done=None):
+        self.window = window
+        self.trim = trim
+        self.deadline = start + (max_periods or 2 * window) * period
+        self.min_values = min(min_values, window)
+        self.on_done = on_done
+        self.values = []
+        self.result = None
+        self.ok = False
+        self.done = threading.Event()
+
+    def add(self, t, raw):
+        """Nimmt einen Rohwert auf. True, wenn die Messung damit abgeschlossen ist."""
+        if self.done.is_set():
+            return True
+        self.values.append(raw)
+        if len(self.values) >= self.window or t >= self.deadline:
+            self._finish()
+            return True
+        return False
+
+    def expire(self, now):
+        """Schließt die Messung ab, wenn die Deadline erreicht ist."""
+        if not self.done.is_set() and now >= self.deadline:
+            self._finish()
+        return self.done.is_set()
+
+    def _finish(self):
+        if len(self.values) >= self.min_values:
+            self.result = trimmed_mean(self.values, self.trim)
+            self.ok = True
+        self.done.set()
+        if self.on_done is not None:
+            self.on_done(self)
+
+
+class LoadCellProfile:
+    """Kalibrierung eines Kraftaufnehmers: force = scale * (raw - zero)."""
+    def __init__(self, name, scale=DEFAULT_SCALE, zero=0.0, points=(), rms=None):
+        self.name = name
+        self.scale = scale
+        self.zero = zero
+        self.points = [tuple(p) for p in points]  # (Rohwert, Kraft in N)
+        self.rms = rms                            # Restfehler der Ausgleichsgeraden in N
+
+    def to_dict(self):
+        return {"scale": self.scale, "zero": self.zero,
+                "points": [list(p) for p in self.points], "rms": self.rms}
+
+    @classmethod
+    def from_dict(cls, name, data):
+        return cls(name, data["scale"], data.get("zero", 0.0), data.get("points", ()), data.get("rms"))
+
+
+def fit_profile(name, points):
+    """
+    Kleinste Quadrate durch (Rohwert, Kraft)-Punkte, mindestens zwei
+    verschiedene Rohwerte (z.B. ohne Last und mit einem bekannten Gewicht).
+    """
+    n = len(points)
+    if n < 2:
+        raise ValueError("mindestens zwei Kalibrierpunkte nötig")
+    mean_raw = math.fsum(r for r, _ in points) / n
+    mean_force = math.fsum(f for _, f in points) / n
+    sxx = math.fsum((r - mean_raw) ** 2 for r, _ in points)
+    if sxx == 0:
+        raise ValueError("alle Kalibrierpunkte haben denselben Rohwert")
+    sxy = math.fsum((r - mean_raw) * (f - mean_force) for r, f in points)
+    scale = sxy / sxx
+    if scale == 0:
+        raise ValueError("Kraft ändert sich nicht mit dem Rohwert")
+    intercept = mean_force - scale * mean_raw
+    zero = -intercept / scale
+    rms = math.sqrt(math.fsum((scale * (r - zero) - f) ** 2 for r, f in points) / n)
+    return LoadCellProfile(name, scale, zero, points, rms)
+
+
+class ProfileStore:
+    """Profile in einer JSON-Datei: {"active": name, "profiles": {name: {...}}}."""
+    def __init__(self, path=PROFILE_FILE):
+        self.path = path
+        self.profiles = {}
+        self.active = None
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.profiles = {name: LoadCellProfile.from_dict(name, d)
+                             for name, d in data.get("profiles", {}).items()}
+            self.active = data.get("active")
+
+    def get(self, name=None):
+        """Profil name bzw. das aktive Profil, ohne gespeicherte Profile den bisherigen Standardwert."""
+        name = name or self.active
+        if name in self.profiles:
+            return self.profiles[name]
+        return LoadCellProfile(name or "Standard")
+
+    def put(self, profile, activate=True):
+        self.profiles[profile.name] = profile
+        if activate:
+            self.active = profile.name
+        self.save()
+
+    def save(self):
+        data = {"active": self.active,
+                "profiles": {name: p.to_dict() for name, p in self.profiles.items()}}
+        # Erst temporär schreiben, dann umbenennen: nie eine halbe Datei
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def main():
+    from HX711 import HX711, FastBackend
+    if len(sys.argv) < 2:
+        print("Aufruf: python calibration.py <profilname> [datei]")
+        sys.exit(1)
+    name = sys.argv[1]
+    store = ProfileStore(sys.argv[2] if len(sys.argv) > 2 else PROFILE_FILE)
+    hx = HX711(dout_pin=5, sck_pin=6, backend=FastBackend)
+    points = []
+    print("Kalibrierpunkte aufnehmen: Kraft in N eingeben (0 = ohne Last), leere Eingabe beendet.")
+    while True:
+        entry = input("Kraft [N]: ").strip().replace(",", ".")
+        if not entry:
+            break
+        values = [v for v in hx.read_many(40) if v != 0]
+        if len(values) < 4:
+            print("Keine Messwerte vom HX711, Punkt verworfen.")
+            continue
+        raw = trimmed_mean(values)
+        points.append((raw, float(entry)))
+        print(f"  Rohwert {raw:.1f} ({len(values)} Werte)")
+        time.sleep(0.1)
+    profile = fit_profile(name, points)
+    store.put(profile)
+    print(f"Profil '{name}': {profile.scale:.10f} N/Digit, Nullpunkt {profile.zero:.1f}, "
+          f"Restfehler {profile.rms:.3f} N -> {store.path}")
+
+
+if __name__ == "__main__":
+    main()
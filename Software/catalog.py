@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Ergebniskatalog der Versuche in SQLite (logs/catalog.sqlite).
+
+- reserve(): vergibt die laufende Nummer pro Log-Base (wie bisher _1, _2, ...)
+  und legt den Versuch mit seinen Parametern an, in einer Transaktion. Der
+  Zähler steht in der Tabelle bases, es wird nicht nach freien Dateinamen gesucht.
+- finish(): trägt die Ergebnisse (Höchstkraft, Bruchposition, Dauer, Grund
+  des Endes) zum Logfile nach, aus dem Prozess, der den Versuch gefahren hat.
+- find(): Abfragen nach Material, Zeitraum und Parametern über Indizes.
+- import_logs(): übernimmt bestehende Logs eines Verzeichnisses in einem Rutsch.
+
+GUI und Maschinen-Service öffnen dieselbe Datei (WAL-Modus, mehrere Prozesse).
+
+Aufruf:  python catalog.py import [./logs]
+         python catalog.py list [--material M] [--since 2025-01-01] [--until ...] [--feed-rate 5]
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+LOG_DIR = "./logs"
+CATALOG_FILE = "catalog.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bases (
+    base TEXT PRIMARY KEY,
+    last_seq INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    base TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    created REAL NOT NULL,
+    status TEXT NOT NULL,
+    material TEXT,
+    feed_rate REAL,
+    zuglaenge REAL,
+    kraft_abfall_grenze REAL,
+    profile TEXT,
+    parameters TEXT,
+    max_force REAL,
+    break_position REAL,
+    duration REAL,
+    stop_reason TEXT,
+    UNIQUE (base, seq)
+);
+CREATE INDEX IF NOT EXISTS runs_created ON runs (created);
+CREATE INDEX IF NOT EXISTS runs_material ON runs (material, created);
+CREATE INDEX IF NOT EXISTS runs_parameters ON runs (feed_rate, zuglaenge, kraft_abfall_grenze, created);
+"""
+
+# Spalten der Versuchsparameter, alles Weitere landet als JSON in parameters
+PARAMETER_COLUMNS = ("material", "feed_rate", "zuglaenge", "kraft_abfall_grenze", "profile")
+RESULT_COLUMNS = ("max_force", "break_position", "duration", "stop_reason")
+
+_NUMBERED = re.compile(r"^(.*)_(\d+)$")
+
+
+class Catalog:
+    """Eine Verbindung pro Thread (sqlite3-Verbindungen sind an ihren Thread gebunden)."""
+    def __init__(self, log_dir=LOG_DIR, path=None):
+        self.log_dir = log_dir
+        os.makedirs(log_dir, exist_ok=True)
+        self.path = path or os.path.join(log_dir, CATALOG_FILE)
+        self._local = threading.local()
+        self._db().executescript(SCHEMA)
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _transaction(self):
+        return _Transaction(self._db())
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    # ------------------------------------------
+    # Versuch anlegen und abschließen
+    # ------------------------------------------
+    def reserve(self, base, ext=".csv", created=None, **parameters):
+        """
+        Vergibt die nächste Nummer für base und legt den Versuch an.
+        parameters: material, feed_rate, zuglaenge, kraft_abfall_grenze, profile
+        und beliebige weitere (als JSON). Gibt (Versuchs-ID, Pfad des Logfiles) zurück.
+        """
+        columns = {name: parameters.pop(name, None) for name in PARAMETER_COLUMNS}
+        extra = json.dumps(parameters) if parameters else None
+        created = time.time() if created is None else created
+        with self._transaction() as db:
+            while True:
+                db.execute("INSERT INTO bases (base, last_seq) VALUES (?, 1) "
+                           "ON CONFLICT (base) DO UPDATE SET last_seq = last_seq + 1", (base,))
+                seq = db.execute("SELECT last_seq FROM bases WHERE base = ?", (base,)).fetchone()[0]
+                path = os.path.join(self.log_dir, f"{base}_{seq}{ext}")
+                # Nur für Altbestände, die noch nicht importiert sind: Nummer überspringen
+                if not os.path.exists(path):
+                    break
+            cursor = db.execute(
+                "INSERT INTO runs (base, seq, path, created, status, parameters, "
+                + ", ".join(PARAMETER_COLUMNS) + ") VALUES (?, ?, ?, ?, 'running', ?"
+                + ", ?" * len(PARAMETER_COLUMNS) + ")",
+                (base, seq, path, created, extra, *columns.values()))
+            return cursor.lastrowid, path
+
+    def finish(self, path, status="done", **results):
+        """Trägt die Ergebnisse zum Versuch mit dem Logfile path nach."""
+        values = [results.get(name) for name in RESULT_COLUMNS]
+        with self._transaction() as db:
+            db.execute("UPDATE runs SET status = ?, " + ", ".join(f"{c} = ?" for c in RESULT_COLUMNS)
+                       + " WHERE path = ?", (status, *values, path))
+
+    # ------------------------------------------
+    # Abfragen
+    # ------------------------------------------
+    def get(self, run_id):
+        row = self._db().execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def find(self, material=None, since=None, until=None, limit=None, **parameters):
+        """
+        Versuche nach Material, Zeitraum (Unix-Zeit, since <= created < until) und
+        Parametern (feed_rate=5, ...), neueste zuerst.
+        """
+        where = []
+        args = []
+        if material is not None:
+            where.append("material = ?")
+            args.append(material)
+        if since is not None:
+            where.append("created >= ?")
+            args.append(since)
+        if until is not None:
+            where.append("created < ?")
+            args.append(until)
+        for name, value in parameters.items():
+            if name not in PARAMETER_COLUMNS:
+                raise ValueError(f"unbekannter Parameter: {name}")
+            where.append(f"{name} = ?")
+            args.append(value)
+        sql = "SELECT * FROM runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+        return [dict(row) for row in self._db().execute(sql, args)]
+
+    # ------------------------------------------
+    # Bestehende Logs übernehmen
+    # ------------------------------------------
+    def import_logs(self, directory=None, gauge_length=10.0, workers=None):
+        """
+        Übernimmt alle Logs des Verzeichnisses, die noch nicht im Katalog sind:
+        Kennwerte über analysis.py (parallel), Parameter aus dem Manifest der
+        .rec-Aufzeichnung, falls vorhanden. Logs, die sich nicht auswerten lassen,
+        kommen mit Status "error" und ohne Kennwerte in den Katalog.
+        Gibt die Anzahl neuer Einträge zurück.
+        """
+        from analysis import find_logs
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+        directory = directory or self.log_dir
+        known = {row[0] for row in self._db().execute("SELECT path FROM runs")}
+        paths = [p for p in find_logs(directory) if p not in known]
+        if not paths:
+            return 0
+        if workers == 1:
+            results = [_analyse_import(p, gauge_length) for p in paths]
+        else:
+            results = []
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                try:
+                    for result in pool.map(_analyse_import, paths, [gauge_length] * len(paths), chunksize=64):
+                        results.append(result)
+                except BrokenProcessPool as e:
+                    # Nicht ausgewertete Logs bleiben draußen und kommen beim nächsten Import dran
+                    print(f"Auswertung abgebrochen nach {len(results)} von {len(paths)} Logs: {e}")
+            paths = paths[:len(results)]
+        rows = []
+        last_seq = {}
+        for path, result in zip(paths, results):
+            base, seq = _split_name(path)
+            if seq is not None:
+                last_seq[base] = max(seq, last_seq.get(base, 0))
+            metadata, duration = _recording_info(path)
+            try:
+                created = os.path.getmtime(path)
+            except OSError:
+                continue
+            failed = result is None or not result["points"]
+            rows.append((base, seq if seq is not None else 0, path, created, "error" if failed else "imported",
+                         metadata.get("material"), metadata.get("feed_rate"), metadata.get("zuglaenge"),
+                         metadata.get("kraft_abfall_grenze"), metadata.get("profile"),
+                         None if failed else _nan_to_none(result["max_force"]),
+                         None if failed else _nan_to_none(result["break_position"]), duration))
+        with self._transaction() as db:
+            db.executemany(
+                "INSERT OR IGNORE INTO runs (base, seq, path, created, status, "
+                + ", ".join(PARAMETER_COLUMNS) + ", max_force, break_position, duration) "
+                "VALUES (" + ", ".join("?" * 13) + ")", rows)
+            db.executemany("INSERT INTO bases (base, last_seq) VALUES (?, ?) ON CONFLICT (base) "
+                           "DO UPDATE SET last_seq = max(last_seq, excluded.last_seq)", last_seq.items())
+        return len(rows)
+
+
+class _Transaction:
+    """with-Block als BEGIN IMMEDIATE ... COMMIT (bzw. ROLLBACK bei Fehlern)."""
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("COMMIT" if exc_type is None else "ROLLBACK")
+
+
+def _split_name(path):
+    """(base, Nummer) aus <base>_<n>.csv bzw. .rec, ohne Nummer (base, None)."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    match = _NUMBERED.match(name)
+    if match:
+        return match.group(1), int(match.group(2))
+    return name, None
+
+
+def _recording_info(path):
+    """Metadaten und Dauer aus der .rec-Aufzeichnung zum Log ({} und None ohne Aufzeichnung)."""
+    rec = path if path.endswith(".rec") else os.path.splitext(path)[0] + ".rec"
+    manifest_path = os.path.join(rec, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return {}, None
+    from recorder import load_recording
+    try:
+        columns, manifest = load_recording(rec)
+    except (OSError, ValueError):
+        return {}, None
+    times = columns["time"]
+    duration = float(times[-1] - times[0]) if len(times) > 1 else None
+    return manifest.get("metadata", {}), duration
+
+
+def _analyse_import(path, gauge_length):
+    """analyse_file für den Import, None statt Ausnahme: ein kaputtes Log bricht den Import nicht ab."""
+    from analysis import analyse_file
+    try:
+        return analyse_file(path, gauge_length)
+    except Exception as e:
+        print(f"{path}: {e}")
+        return None
+
+
+def _nan_to_none(value):
+    return None if value != value else value
+
+
+def _parse_date(text):
+    return datetime.fromisoformat(text).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ergebniskatalog der Zugversuche")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="bestehende Logs übernehmen")
+    imp.add_argument("directory", nargs="?", default=LOG_DIR)
+    lst = sub.add_parser("list", help="Versuche auflisten")
+    lst.add_argument("--material")
+    lst.add_argument("--since", type=_parse_date, help="ab Datum (JJJJ-MM-TT)")
+    lst.add_argument("--until", type=_parse_date, help="vor Datum (JJJJ-MM-TT)")
+    lst.add_argument("--feed-rate", type=float)
+    lst.add_argument("--zuglaenge", type=float)
+    lst.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+    if args.command == "import":
+        catalog = Catalog(args.directory)
+        print(f"{catalog.import_logs(args.directory)} Logs übernommen -> {catalog.path}")
+        return
+    catalog = Catalog()
+    parameters = {}
+    if args.feed_rate is not None:
+        parameters["feed_rate"] = args.feed_rate
+    if args.zuglaenge is not None:
+        parameters["zuglaenge"] = args.zuglaenge
+    for run in catalog.find(args.material, args.since, args.until, args.limit, **parameters):
+        created = datetime.fromtimestamp(run["created"]).strftime("%Y-%m-%d %H:%M")
+        max_force = f"{run['max_force']:.2f} N" if run["max_force"] is not None else "-"
+        print(f"{run['id']:6d}  {created}  {os.path.basename(run['path']):30s} {run['status']:9s} "
+              f"{run['material'] or '-':12s} {run['feed_rate'] or '-'} mm/min  max {max_force}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Anzeige-Schicht zwischen Mess-/Motor-Threads und Tk.
+Die Threads schreiben nur den letzten Stand ins DisplayModel (einfache
+Attribut-Zuweisungen, unter dem GIL atomar, kein Lock). Ein einziger
+root.after-Takt im Tk-Thread rendert diesen Stand mit fester Bildrate
+und fasst ein Widget nur an, wenn sich der Text geändert hat.
+"""
+
+
+class DisplayModel:
+    """Letzter Stand der angezeigten Werte. Wird von beliebigen Threads beschrieben."""
+    def __init__(self):
+        self.force = 0.0
+        self.max_force = 0.0
+        self.logfile = ""
+
+    def publish_force(self, force, max_force):
+        self.force = force
+        self.max_force = max_force
+
+
+class DisplayRenderer:
+    """Rendert gebundene Werte im Tk-Thread mit fps Bildern pro Sekunde."""
+    def __init__(self, root, fps=30):
+        self.root = root
+        self.fps = fps
+        self._bindings = []
+        self._callbacks = []
+        self._after_id = None
+        # Erster Fehler je Getter bzw. Callback
+        self.errors = {}
+
+    def bind(self, widget, getter, fmt="{}"):
+        """Bei jedem Bild wird fmt.format(getter()) als Text des Widgets gesetzt."""
+        self._bindings.append([widget, getter, fmt, None])
+
+    def on_frame(self, callback):
+        """callback() wird bei jedem Bild nach den Widgets aufgerufen (z.B. Live-Plot)."""
+        self._callbacks.append(callback)
+
+    def start(self):
+        self._tick()
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def render(self):
+        """Aktualisiert alle Widgets, deren Text sich geändert hat. Gibt deren Anzahl zurück."""
+        changed = 0
+        for binding in self._bindings:
+            widget, getter, fmt, last_text = binding
+            try:
+                text = fmt.format(getter())
+                if text != last_text:
+                    widget.configure(text=text)
+                    binding[3] = text
+                    changed += 1
+            except Exception as e:
+                self._report(getter, e)
+        return changed
+
+    def _tick(self):
+        # Ein Fehler in einer Anzeige oder einem Callback darf den Takt nicht beenden
+        try:
+            self.render()
+            for callback in self._callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    self._report(callback, e)
+        finally:
+            self._after_id = self.root.after(int(1000 / self.fps), self._tick)
+
+    def _report(self, source, error):
+        """Gibt einen Fehler aus, pro Quelle aber nur einmal (der Takt läuft mit fps weiter)."""
+        if source not in self.errors:
+            self.errors[source] = error
+            print(f"Anzeige: {getattr(source, '__qualname__', source)}: {error!r}")
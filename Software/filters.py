@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Kraftfilter als austauschbare, kombinierbare Stufen.
+
+Jede Stufe hat zwei Implementierungen mit gleichem Ergebnis:
+  update(x)  -> ein Wert rein, ein Wert raus (für die laufende Messung,
+                fester Aufwand pro Wert, keine Listen/Arrays pro Wert)
+  batch(xs)  -> NumPy-Array rein, NumPy-Array raus (zum Nachrechnen
+                aufgezeichneter Versuche). Entspricht reset() und danach
+                update() für jeden Wert, ändert den Zustand der Stufe aber nicht.
+                NumPy wird erst hier geladen, die Messung braucht es nicht.
+Bei den linearen Stufen (Mittelwert, EMA, Kalman) unterscheiden sich die
+Ergebnisse nur durch Rundung in den letzten Stellen, weil batch anders summiert.
+
+Beispiel:  chain = FilterChain(SpikeFilter(), MedianFilter(5), EmaFilter(0.3))
+"""
+import math
+from array import array
+from bisect import insort, bisect_left
+
+
+def _linear_recursion(a, u, y0):
+    """
+    Berechnet y[n] = a[n] * y[n-1] + u[n] vektorisiert in Blöcken:
+    innerhalb eines Blocks ist y = C * (y_vor + cumsum(u / C)) mit C = cumprod(a).
+    Die Blocklänge ist so gewählt, dass C nicht unterläuft.
+    """
+    import numpy as np
+    n = len(u)
+    y = np.empty(n)
+    if n == 0:
+        return y
+    a_min = float(a.min())
+    if a_min <= 0.0:
+        prev = y0
+        for i in range(n):
+            prev = a[i] * prev + u[i]
+            y[i] = prev
+        return y
+    block = 256 if a_min >= 1.0 else max(1, min(256, int(200 / -math.log10(a_min))))
+    prev = y0
+    for s in range(0, n, block):
+        c = np.cumprod(a[s:s + block])
+        part = c * (prev + np.cumsum(u[s:s + block] / c))
+        y[s:s + block] = part
+        prev = part[-1]
+    return y
+
+
+class SpikeFilter:
+    """
+    Sprungfilter (bisher filter_force in der GUI): Ein Sprung über threshold
+    wird erst übernommen, wenn zwei aufeinanderfolgende Kandidaten innerhalb
+    von tolerance liegen, sonst bleibt der letzte gültige Wert stehen.
+    """
+    def __init__(self, threshold=15.0, tolerance=2.0):
+        self.threshold = threshold
+        self.tolerance = tolerance
+        self.rejected = 0  # verworfene Ausreißer
+        self.reset()
+
+    def reset(self):
+        self.last_valid = None
+        self.candidate = None
+
+    def update(self, new_val):
+        last = self.last_valid
+        if last is None or abs(new_val - last) <= self.threshold:
+            self.candidate = None
+            self.last_valid = new_val
+            return new_val
+        if self.candidate is None:
+            # Ersten Kandidaten speichern und alten Wert anzeigen.
+            self.candidate = new_val
+            return last
+        candidate = self.candidate
+        self.candidate = None
+        if abs(new_val - candidate) <= self.tolerance:
+            # Übergang akzeptieren: Mittelwert der Kandidaten berechnen.
+            filtered = (candidate + new_val) / 2.0
+            self.last_valid = filtered
+            return filtered
+        # Kandidaten nicht konsistent: Ausreißer verwerfen, alten Wert beibehalten.
+        self.rejected += 1
+        return last
+
+    def batch(self, xs):
+        # Der Zustandsautomat ist von Natur aus sequenziell: dieselbe Logik
+        # läuft über eine Python-Liste (deutlich schneller als über ein ndarray).
+        import numpy as np
+        update = SpikeFilter(self.threshold, self.tolerance).update
+        return np.array([update(x) for x in np.asarray(xs, dtype=float).tolist()])
+
+
+class MedianFilter:
+    """Gleitender Median über window Werte (am Anfang über die bisher vorhandenen)."""
+    def __init__(self, window=5):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self._ring = array('d', bytes(self.window * array('d').itemsize))
+        self._sorted = []
+        self._n = 0
+
+    def update(self, x):
+        window = self.window
+        s = self._sorted
+        i = self._n % window
+        if self._n >= window:
+            del s[bisect_left(s, self._ring[i])]
+        self._ring[i] = x
+        self._n += 1
+        insort(s, x)
+        m = len(s)
+        if m % 2:
+            return s[m // 2]
+        return (s[m // 2 - 1] + s[m // 2]) / 2
+
+    def batch(self, xs):
+        import numpy as np
+        xs = np.asarray(xs, dtype=float)
+        w = self.window
+        out = np.empty(len(xs))
+        for i in range(min(w - 1, len(xs))):
+            out[i] = np.median(xs[:i + 1])
+        if len(xs) >= w:
+            out[w - 1:] = np.median(np.lib.stride_tricks.sliding_window_view(xs, w), axis=1)
+        return out
+
+
+class MovingAverage:
+    """Gleitender Mittelwert über window Werte (am Anfang über die bisher vorhandenen)."""
+    def __init__(self, window=8):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self._ring = array('d', bytes(self.window * array('d').itemsize))
+        self._sum = 0.0
+        self._n = 0
+
+    def update(self, x):
+        i = self._n % self.window
+        if self._n >= self.window:
+            self._sum -= self._ring[i]
+        self._ring[i] = x
+        self._sum += x
+        self._n += 1
+        if i == self.window - 1:
+            # Einmal pro Umlauf neu summieren, damit sich keine Rundungsfehler ansammeln
+            self._sum = math.fsum(self._ring)
+        return self._sum / min(self._n, self.window)
+
+    def batch(self, xs):
+        import numpy as np
+        xs = np.asarray(xs, dtype=float)
+        w = self.window
+        out = np.empty(len(xs))
+        head = min(w - 1, len(xs))
+        out[:head] = np.cumsum(xs[:head]) / np.arange(1, head + 1)
+        if len(xs) >= w:
+            out[w - 1:] = np.lib.stride_tricks.sliding_window_view(xs, w).sum(axis=1) / w
+        return out
+
+
+class EmaFilter:
+    """Exponentieller Mittelwert: y = y + alpha * (x - y), Start mit dem ersten Wert."""
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self._y = None
+
+    def update(self, x):
+        y = self._y
+        y = x if y is None else y + self.alpha * (x - y)
+        self._y = y
+        return y
+
+    def batch(self, xs):
+        import numpy as np
+        xs = np.asarray(xs, dtype=float)
+        if len(xs) == 0:
+            return xs.copy()
+        a = np.full(len(xs) - 1, 1.0 - self.alpha)
+        out = np.empty(len(xs))
+        out[0] = xs[0]
+        out[1:] = _linear_recursion(a, self.alpha * xs[1:], xs[0])
+        return out
+
+
+class KalmanFilter:
+    """
+    Einfacher Kalman-Filter für eine langsam veränderliche Kraft (Random Walk).
+    q: Prozessrauschen (N² pro Wert), r: Messrauschen (N²).
+    """
+    def __init__(self, q=0.01, r=0.25):
+        self.q = q
+        self.r = r
+        self.reset()
+
+    def reset(self):
+        self._x = None
+        self._p = self.r
+
+    def update(self, z):
+        if self._x is None:
+            self._x = z
+            self._p = self.r
+            return z
+        p = self._p + self.q
+        k = p / (p + self.r)
+        self._x += k * (z - self._x)
+        self._p = p * (1 - k)
+        return self._x
+
+    def gains(self, n):
+        """Kalman-Verstärkungen für die Werte 1..n-1 (hängen nicht von den Messwerten ab)."""
+        import numpy as np
+        gains = np.empty(max(n - 1, 0))
+        p = self.r
+        for i in range(len(gains)):
+            p_pred = p + self.q
+            k = p_pred / (p_pred + self.r)
+            p_new = p_pred * (1 - k)
+            gains[i] = k
+            if p_new == p:
+                # stationär: ab hier ändert sich die Verstärkung nicht mehr
+                gains[i:] = k
+                break
+            p = p_new
+        return gains
+
+    def batch(self, zs):
+        import numpy as np
+        zs = np.asarray(zs, dtype=float)
+        if len(zs) == 0:
+            return zs.copy()
+        k = self.gains(len(zs))
+        out = np.empty(len(zs))
+        out[0] = zs[0]
+        out[1:] = _linear_recursion(1.0 - k, k * zs[1:], zs[0])
+        return out
+
+
+class FilterChain:
+    """Hintereinanderschaltung beliebiger Stufen, selbst wieder eine Stufe."""
+    def __init__(self, *stages):
+        self.stages = list(stages)
+
+    def reset(self):
+        for stage in self.stages:
+            stage.reset()
+
+    def update(self, x):
+        for stage in self.stages:
+            x = stage.update(x)
+        return x
+
+    def batch(self, xs):
+        import numpy as np
+        xs = np.asarray(xs, dtype=float)
+        for stage in self.stages:
+            xs = stage.batch(xs)
+        return xs
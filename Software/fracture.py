@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Bruch-Erkennung, die bei jedem Messwert läuft (statt alle 150 ms im Logger).
+
+Kriterien, jeweils 0 = aus, es reicht eines:
+  drop          Abfall vom bisherigen Maximum in N
+  drop_percent  Abfall vom bisherigen Maximum in % des Maximums
+  rate          Abfallrate in N/s über die letzten window Messwerte
+Alle Kriterien werden inkrementell berechnet (Maximum mitführen, Ringpuffer
+der letzten window Werte), der Aufwand pro Messwert ist konstant.
+"""
+from array import array
+
+
+class BreakDetector:
+    """
+    min_peak: Die Kriterien greifen erst, wenn das Maximum über min_peak liegt,
+    damit Rauschen an der unbelasteten Probe keinen Abbruch auslöst.
+    """
+    def __init__(self, drop=0.0, drop_percent=0.0, rate=0.0, window=4, min_peak=2.0):
+        self.drop = drop
+        self.drop_percent = drop_percent
+        self.rate = rate
+        self.window = window
+        self.min_peak = min_peak
+        self.reset()
+
+    @property
+    def enabled(self):
+        return self.drop > 0 or self.drop_percent > 0 or self.rate > 0
+
+    def reset(self):
+        self.peak = float("-inf")
+        self._times = array('d', bytes(self.window * array('d').itemsize))
+        self._forces = array('d', bytes(self.window * array('d').itemsize))
+        self._n = 0
+        self.triggered = False
+        self.reason = None         # "drop", "drop_percent" oder "rate"
+        self.trigger_time = None   # Zeitstempel des auslösenden Messwerts
+        self.trigger_force = None
+
+    def update(self, t, force):
+        """Verarbeitet einen Messwert. True, sobald ein Kriterium erfüllt ist (bleibt dann True)."""
+        if self.triggered:
+            return True
+        if force > self.peak:
+            self.peak = force
+        window = self.window
+        i = self._n % window
+        full = self._n >= window
+        t_old = self._times[i]
+        f_old = self._forces[i]
+        self._times[i] = t
+        self._forces[i] = force
+        self._n += 1
+
+        peak = self.peak
+        if peak < self.min_peak:
+            return False
+        loss = peak - force
+        if self.drop > 0 and loss >= self.drop:
+            reason = "drop"
+        elif self.drop_percent > 0 and loss >= peak * self.drop_percent / 100:
+            reason = "drop_percent"
+        elif self.rate > 0 and full and t > t_old and (f_old - force) / (t - t_old) >= self.rate:
+            reason = "rate"
+        else:
+            return False
+        self.triggered = True
+        self.reason = reason
+        self.trigger_time = t
+        self.trigger_force = force
+        return True
+
+    def settings(self):
+        return {
+            "drop": self.drop,
+            "drop_percent": self.drop_percent,
+            "rate": self.rate,
+            "window": self.window,
+            "min_peak": self.min_peak,
+        }
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Live-Kraft-Weg-Kurve auf einem Tk-Canvas.
+
+- MinMaxDecimator: fasst aufeinanderfolgende Messwerte zu Buckets zusammen und
+  behält je Bucket Minimum und Maximum der Kraft (in zeitlicher Reihenfolge).
+  Spitzen wie der Bruchpunkt bleiben damit sichtbar. Erreicht die Anzahl
+  der Buckets max_points / 2, werden je zwei zusammengelegt, die Anzahl der
+  Punkte auf dem Bildschirm bleibt so unabhängig von der Versuchsdauer begrenzt.
+- LivePlot: zeichnet pro Bild nur die neu abgeschlossenen Buckets als kurze
+  Linie dazu. Alle consolidate Bilder werden die Stücke zu einer Linie
+  zusammengefasst. Komplett neu gezeichnet wird nur beim Vergrößern der
+  Achsen und beim Zusammenlegen der Buckets (beides selten, höchstens
+  max_points Punkte). Die Kurve des vorherigen Versuchs liegt grau darunter.
+"""
+
+
+class MinMaxDecimator:
+    """Min/Max-Dezimierung für einen wachsenden Datenstrom, höchstens max_points Punkte."""
+    def __init__(self, max_points=2000):
+        self.max_buckets = max(2, max_points // 2)
+        self.bucket_size = 1
+        self.generation = 0   # erhöht sich, wenn Buckets zusammengelegt wurden
+        self.count = 0        # Anzahl aller Werte
+        self.buckets = []     # (x1, y1, x2, y2): Min und Max eines Buckets in zeitlicher Reihenfolge
+        self.last = None      # letzter Wert (x, y)
+        self.x_max = 0.0
+        self.y_max = 0.0
+        self._filled = 0
+        self._low = None      # (Index, x, y) des Minimums im laufenden Bucket
+        self._high = None
+
+    def add(self, x, y):
+        self.count += 1
+        self.last = (x, y)
+        if x > self.x_max:
+            self.x_max = x
+        if y > self.y_max:
+            self.y_max = y
+        low = self._low
+        if low is None:
+            self._low = self._high = (self.count, x, y)
+        elif y < low[2]:
+            self._low = (self.count, x, y)
+        elif y > self._high[2]:
+            self._high = (self.count, x, y)
+        self._filled += 1
+        if self._filled >= self.bucket_size:
+            self._close_bucket()
+
+    def _close_bucket(self):
+        low, high = self._low, self._high
+        if low[0] <= high[0]:
+            self.buckets.append((low[1], low[2], high[1], high[2]))
+        else:
+            self.buckets.append((high[1], high[2], low[1], low[2]))
+        self._low = self._high = None
+        self._filled = 0
+        if len(self.buckets) >= self.max_buckets:
+            self._merge()
+
+    def _merge(self):
+        """Legt je zwei Buckets zusammen (Min und Max der vier Punkte, Reihenfolge bleibt)."""
+        buckets = self.buckets
+        merged = []
+        for i in range(0, len(buckets) - 1, 2):
+            a, b = buckets[i], buckets[i + 1]
+            points = ((a[0], a[1]), (a[2], a[3]), (b[0], b[1]), (b[2], b[3]))
+            low = min(range(4), key=lambda k: points[k][1])
+            high = max(range(4), key=lambda k: points[k][1])
+            first, second = (low, high) if low <= high else (high, low)
+            merged.append(points[first] + points[second])
+        if len(buckets) % 2:
+            merged.append(buckets[-1])
+        self.buckets = merged
+        self.bucket_size *= 2
+        self.generation += 1
+
+    def end_point(self, i):
+        """Letzter Punkt von Bucket i."""
+        bucket = self.buckets[i]
+        return bucket[2], bucket[3]
+
+    def points(self, start=0):
+        """Punkte der Buckets ab start als Liste [(x, y), ...]."""
+        result = []
+        for x1, y1, x2, y2 in self.buckets[start:]:
+            result.append((x1, y1))
+            if (x2, y2) != (x1, y1):
+                result.append((x2, y2))
+        return result
+
+
+class LivePlot:
+    """
+    canvas: tk.Canvas (oder ein Objekt mit create_line, create_text, create_rectangle,
+    coords, delete, winfo_width, winfo_height). x_range, y_range: Anfangsbereich
+    der Achsen in mm und N, sie wachsen bei Bedarf um den Faktor grow.
+    """
+    def __init__(self, canvas, max_points=2000, x_range=10.0, y_range=10.0, grow=1.5,
+                 consolidate=32, margin=40, color="#3fa9f5", previous_color="#777777"):
+        self.canvas = canvas
+        self.max_points = max_points
+        self.x_range = x_range
+        self.y_range = y_range
+        self.grow = grow
+        self.consolidate = consolidate
+        self.margin = margin
+        self.color = color
+        self.previous_color = previous_color
+        self.current = MinMaxDecimator(max_points)
+        self.previous = None
+        self.redraws = 0      # komplette Neuzeichnungen
+        self.points_sent = 0  # an Tk übergebene Punkte (für den Benchmark)
+        self._items = []      # Linienstücke der aktuellen Kurve
+        self._main = None     # zusammengefasste Linie der aktuellen Kurve
+        self._head = None     # Verbindung zum letzten Messwert
+        self._drawn = 0       # gezeichnete Buckets
+        self._pieces = 0
+        self._generation = -1
+        self._size = None
+        self._axes = []
+        self._previous_item = None
+
+    def new_run(self, x_range=None):
+        """Beginnt eine neue Kurve, die bisherige wird zur Vergleichskurve."""
+        if self.current.count:
+            self.previous = self.current
+        self.current = MinMaxDecimator(self.max_points)
+        if x_range:
+            self.x_range = x_range
+        self._generation = -1
+
+    def add(self, x, y):
+        self.current.add(x, y)
+
+    # ------------------------------------------
+    # Zeichnen (Tk-Thread)
+    # ------------------------------------------
+    def draw(self):
+        """Einmal pro Bild: zeichnet neue Punkte dazu, nur wenn nötig alles neu."""
+        current = self.current
+        size = (self.canvas.winfo_width(), self.canvas.winfo_height())
+        if (size != self._size or current.generation != self._generation
+                or self._fit_axes(current)):
+            self.redraw(size)
+            return
+        points = current.points(self._drawn)
+        if points:
+            # An den letzten gezeichneten Punkt anschließen
+            start = [current.end_point(self._drawn - 1)] if self._drawn else []
+            item = self._line(start + points, self.color)
+            if item is not None:
+                self._items.append(item)
+            self._drawn = len(current.buckets)
+            self._pieces += 1
+            if self._pieces >= self.consolidate:
+                self._draw_current()
+        self._draw_head()
+
+    def redraw(self, size=None):
+        """Zeichnet Achsen, Vergleichskurve und aktuelle Kurve komplett neu."""
+        canvas = self.canvas
+        self._size = size or (canvas.winfo_width(), canvas.winfo_height())
+        self._fit_axes(self.current)
+        if self.previous is not None:
+            self._fit_axes(self.previous)
+        self._generation = self.current.generation
+        for item in self._axes:
+            canvas.delete(item)
+        self._axes = self._draw_axes()
+        if self._previous_item is not None:
+            canvas.delete(self._previous_item)
+            self._previous_item = None
+        if self.previous is not None:
+            self._previous_item = self._line(self.previous.points(), self.previous_color)
+        self._draw_current()
+        self._draw_head()
+        self.redraws += 1
+
+    def _fit_axes(self, data):
+        """Vergrößert die Achsen, wenn die Daten hinauslaufen. True bei Änderung."""
+        changed = False
+        while data.x_max > self.x_range:
+            self.x_range *= self.grow
+            changed = True
+        while data.y_max > self.y_range:
+            self.y_range *= self.grow
+            changed = True
+        return changed
+
+    def _draw_current(self):
+        canvas = self.canvas
+        for item in self._items:
+            canvas.delete(item)
+        self._items = []
+        self._pieces = 0
+        if self._main is not None:
+            canvas.delete(self._main)
+        self._main = self._line(self.current.points(), self.color)
+        self._drawn = len(self.current.buckets)
+
+    def _draw_head(self):
+        current = self.current
+        if self._head is not None:
+            self.canvas.delete(self._head)
+            self._head = None
+        if current.last is None:
+            return
+        tail = [current.end_point(-1)] if current.buckets else []
+        self._head = self._line(tail + [current.last], self.color)
+
+    def _draw_axes(self):
+        canvas = self.canvas
+        width, height = self._size
+        m = self.margin
+        items = [canvas.create_rectangle(m, m // 2, width - m // 2, height - m, outline="#aaaaaa")]
+        items.append(canvas.create_text(m, height - m + 12, text="0", fill="#aaaaaa"))
+        items.append(canvas.create_text(width - m // 2, height - m + 12,
+                                        text=f"{self.x_range:.3g} mm", anchor="e", fill="#aaaaaa"))
+        items.append(canvas.create_text(m - 4, m // 2, text=f"{self.y_range:.3g} N",
+                                        anchor="ne", fill="#aaaaaa"))
+        return items
+
+    def _line(self, points, color):
+        """Linie durch points (Daten-Koordinaten), None bei weniger als zwei Punkten."""
+        if len(points) < 2:
+            return None
+        width, height = self._size
+        m = self.margin
+        x0 = m
+        y0 = height - m
+        sx = (width - m // 2 - x0) / self.x_range
+        sy = (y0 - m // 2) / self.y_range
+        coords = []
+        for x, y in points:
+            coords.append(x0 + x * sx)
+            coords.append(y0 - y * sy)
+        self.points_sent += len(points)
+        return self.canvas.create_line(*coords, fill=color, width=2)
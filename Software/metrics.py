@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Messgrößen aus den zeitkritischen Schleifen (Erfassung, Motor, Aufzeichnung).
+
+Histogramme haben feste, logarithmisch verteilte Klassen in einem array,
+record() legt nichts an und kostet nur ein paar Rechenoperationen.
+Zähler sind einfache int-Attribute. Am Versuchsende wird eine
+Zusammenfassung als JSON neben das Logfile geschrieben.
+"""
+import json
+import math
+from array import array
+
+
+class Histogram:
+    """
+    Histogramm über [lowest, highest] mit buckets_per_decade Klassen pro Zehnerpotenz.
+    Werte darunter/darüber landen in der ersten/letzten Klasse.
+    """
+    def __init__(self, unit="s", lowest=1e-6, highest=10.0, buckets_per_decade=10):
+        self.unit = unit
+        self.lowest = lowest
+        self.per_decade = buckets_per_decade
+        self._log_low = math.log10(lowest)
+        self.buckets = int(math.ceil((math.log10(highest) - self._log_low) * buckets_per_decade)) + 2
+        self.counts = array('q', bytes(self.buckets * array('q').itemsize))
+        self.reset()
+
+    def reset(self):
+        for i in range(self.buckets):
+            self.counts[i] = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def record(self, value):
+        if value < self.lowest:
+            i = 0
+        else:
+            i = int((math.log10(value) - self._log_low) * self.per_decade) + 1
+            if i >= self.buckets:
+                i = self.buckets - 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def upper_bound(self, i):
+        """Obere Grenze der Klasse i."""
+        if i == 0:
+            return self.lowest
+        return 10 ** (self._log_low + i / self.per_decade)
+
+    def percentile(self, p):
+        """Näherung: obere Grenze der Klasse, in der das p-Quantil liegt (p in 0..100)."""
+        if self.count == 0:
+            return math.nan
+        target = self.count * p / 100
+        seen = 0
+        for i in range(self.buckets):
+            seen += self.counts[i]
+            if seen >= target:
+                return min(self.upper_bound(i), self.max)
+        return self.max
+
+    def summary(self):
+        if self.count == 0:
+            return {"count": 0, "unit": self.unit}
+        return {
+            "count": self.count,
+            "unit": self.unit,
+            "mean": self.total / self.count,
+            "min": self.min,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class Metrics:
+    """Alle Messgrößen einer Maschine."""
+    def __init__(self):
+        self.read_duration = Histogram()                  # Dauer eines HX711-Auslesens
+        self.sample_interval = Histogram()                # Abstand zweier Messwerte
+        self.step_lateness = Histogram()                  # Verspätung je Motorschritt
+        self.logger_queue = Histogram("Blöcke", 1, 1000, 10)  # Warteschlange des Recorders
+        self.backlog = Histogram("Werte", 1, 10000, 10)   # Werte pro Verarbeitungsdurchlauf
+        self.reset()
+
+    def reset(self, hx=None, force_filter=None):
+        """
+        Beginnt neue Messgrößen (z.B. pro Versuch). Die Zähler von hx/force_filter
+        laufen seit dem Start weiter, ihr Stand wird hier gemerkt und in
+        summary() abgezogen.
+        """
+        for h in (self.read_duration, self.sample_interval, self.step_lateness,
+                  self.logger_queue, self.backlog):
+            h.reset()
+        self.timeouts = 0              # keine Flanke innerhalb des Timeouts
+        self.dropped_conversions = 0   # Lücken in den Zeitstempeln
+        self.step_deadline_misses = 0  # Schritte mehr als 0.5 ms zu spät
+        self._external_start = _external_counters(hx, force_filter)
+
+    def summary(self, hx=None, force_filter=None):
+        """Zusammenfassung als dict. hx/force_filter liefern ihre eigenen Zähler dazu."""
+        counters = {
+            "timeouts": self.timeouts,
+            "dropped_conversions": self.dropped_conversions,
+            "step_deadline_misses": self.step_deadline_misses,
+        }
+        for name, value in _external_counters(hx, force_filter).items():
+            counters[name] = value - self._external_start.get(name, 0)
+        return {
+            "counters": counters,
+            "read_duration": self.read_duration.summary(),
+            "sample_interval": self.sample_interval.summary(),
+            "step_lateness": self.step_lateness.summary(),
+            "logger_queue": self.logger_queue.summary(),
+            "backlog": self.backlog.summary(),
+        }
+
+    def dump(self, path, **kwargs):
+        with open(path, "w") as f:
+            json.dump(self.summary(**kwargs), f, indent=2)
+
+
+def _external_counters(hx, force_filter):
+    """Zähler, die HX711 und Filter selbst führen (seit dem Start, nicht pro Versuch)."""
+    counters = {}
+    if hx is not None:
+        counters["hx711_timeouts"] = getattr(hx, "timeouts", 0)
+        counters["hx711_zero_reads"] = getattr(hx, "zero_reads", 0)
+    if force_filter is not None:
+        stages = getattr(force_filter, "stages", [force_filter])
+        counters["filter_rejections"] = sum(getattr(s, "rejected", 0) for s in stages)
+    return counters
+
+
+def format_summary(summary):
+    """Mehrzeiliger Text für das Diagnose-Fenster."""
+    lines = [f"{name}: {value}" for name, value in summary["counters"].items()]
+    for name in ("read_duration", "sample_interval", "step_lateness"):
+        h = summary[name]
+        if h["count"]:
+            lines.append(f"{name}: n={h['count']}  mittel {h['mean'] * 1e3:.3f} ms  "
+                         f"p99 {h['p99'] * 1e3:.3f} ms  max {h['max'] * 1e3:.3f} ms")
+        else:
+            lines.append(f"{name}: -")
+    for name in ("logger_queue", "backlog"):
+        h = summary[name]
+        lines.append(f"{name}: max {h['max']:.0f} {h['unit']}" if h["count"] else f"{name}: -")
+    return "\n".join(lines)
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Prüfprogramme: mehrere Fahrabschnitte, Haltezeiten und Zyklen statt einer
+einzigen Fahrt mit konstantem Vorschub.
+
+Format (JSON), Wege in mm ab der Position beim Programmstart, Geschwindigkeiten in mm/min:
+  {"name": "Ermüdung", "record": false, "steps": [
+      {"move": 5, "speed": 2, "until_force": 10},     Vorlast: bis 10 N, höchstens 5 mm
+      {"hold": 30},                                   30 s halten
+      {"to": 1.0, "speed": 1},                        auf 1 mm fahren (Rate A)
+      {"move": 0.5, "speed": 5, "accel": 2},          0,5 mm weiter (Rate B, mit Rampe in mm/s²)
+      {"repeat": 10000, "steps": [                    Zyklen: Be- und Entlasten
+          {"to": 3, "speed": 60, "until_force": 60},
+          {"to": 0, "speed": 60, "until_force": 5}]}]}
+
+"move" fährt relativ, "to" auf eine Position. Mit "until_force" endet der
+Abschnitt, sobald die Kraft den Wert erreicht (beim Belasten >=, beim
+Entlasten <=), der Weg ist dann die Grenze. Wird sie ohne die Kraft
+erreicht, bricht das Programm ab ("limit"). record: false zeichnet keine
+Rohwerte auf, nur die Zyklus-Kennwerte (für mehrtägige Läufe).
+
+compile_program rechnet die Schrittzeiten der Abschnitte vorab, Zyklen
+werden nicht ausgerollt, die Zeitpläne eines Zyklus werden wiederverwendet.
+Pro Zyklus werden Spitze, Tal und Hysteresefläche im Sensor-Thread
+fortlaufend berechnet und als <log>.cycles.csv geschrieben. Der Speicherbedarf
+hängt damit nicht von der Anzahl der Zyklen ab.
+
+Prüfen eines Programms:  python program.py <programm.json>
+"""
+import json
+import math
+import os
+import queue
+import sys
+import threading
+from collections import deque
+
+from recorder import Recorder
+from stepper import constant_profile, trapezoid_profile
+
+# Wartezeit (s) nach einer Fahrt mit until_force, die ohne Trigger endet: der
+# Messwert, der die Kraft erreicht, kann noch unverarbeitet im Ringpuffer liegen
+TRIGGER_GRACE = 0.05
+
+
+class Segment:
+    """Vorab berechneter Abschnitt: Fahrt ("move") oder Haltezeit ("hold")."""
+    def __init__(self, kind, steps=0, absolute=False, speed=0.0, accel=None,
+                 until_force=None, duration=0.0):
+        self.kind = kind
+        self.steps = steps          # Ziel (absolute) bzw. Weg in Schritten
+        self.absolute = absolute
+        self.speed = speed          # Schritte/s
+        self.accel = accel          # Schritte/s², None = ohne Rampe
+        self.until_force = until_force
+        self.duration = duration    # s (hold)
+        self._schedule = None
+
+    def schedule(self, n):
+        """Schrittzeiten für n Schritte. Ohne Rampe reicht der Anfang eines längeren Zeitplans."""
+        cached = self._schedule
+        if cached is not None:
+            if len(cached) == n:
+                return cached
+            if self.accel is None and len(cached) > n:
+                return memoryview(cached)[:n]
+        if self.accel is None:
+            schedule = constant_profile(n, self.speed)
+        else:
+            schedule = trapezoid_profile(n, self.speed, self.accel)
+        self._schedule = schedule
+        return schedule
+
+    def describe(self, mm_per_step):
+        if self.kind == "hold":
+            return f"halten {self.duration:g} s"
+        target = f"auf {self.steps * mm_per_step:g} mm" if self.absolute else f"{self.steps * mm_per_step:+g} mm"
+        text = f"fahren {target} mit {self.speed * mm_per_step * 60:g} mm/min"
+        if self.accel is not None:
+            text += f", Rampe {self.accel * mm_per_step:g} mm/s²"
+        if self.until_force is not None:
+            text += f", bis {self.until_force:g} N"
+        return text
+
+
+class Repeat:
+    """count Zyklen aus den Abschnitten segments."""
+    def __init__(self, count, segments):
+        self.count = count
+        self.segments = segments
+
+
+class Program:
+    def __init__(self, name, ops, record=True, source=None):
+        self.name = name
+        self.ops = ops
+        self.record = record
+        self.source = source  # ursprüngliche Beschreibung (für die Metadaten)
+
+    @property
+    def cycles(self):
+        return sum(op.count for op in self.ops if isinstance(op, Repeat))
+
+
+def _number(step, key, positive=True):
+    if key not in step:
+        raise ValueError(f"{key} fehlt in {step!r}")
+    value = step[key]
+    if not isinstance(value, (int, float)) or isinstance(value, bool) or not math.isfinite(value):
+        raise ValueError(f"{key}: Zahl erwartet, nicht {value!r}")
+    if positive and value <= 0:
+        raise ValueError(f"{key} muss größer als 0 sein")
+    return float(value)
+
+
+def _compile_step(step, mm_per_step):
+    if "hold" in step:
+        return Segment("hold", duration=_number(step, "hold"))
+    if "move" in step or "to" in step:
+        absolute = "to" in step
+        mm = _number(step, "to" if absolute else "move", positive=False)
+        speed = _number(step, "speed") / 60 / mm_per_step
+        accel = _number(step, "accel") / mm_per_step if "accel" in step else None
+        until_force = _number(step, "until_force", positive=False) if "until_force" in step else None
+        segment = Segment("move", int(round(mm / mm_per_step)), absolute, speed, accel, until_force)
+        if not absolute:
+            # Relativer Weg steht fest: Zeitplan schon jetzt berechnen
+            segment.schedule(abs(segment.steps))
+        return segment
+    raise ValueError(f"unbekannter Abschnitt: {step!r}")
+
+
+def compile_program(data, mm_per_step):
+    """Übersetzt die Programmbeschreibung (dict wie oben) in ein Program. ValueError bei Fehlern."""
+    ops = []
+    for step in data.get("steps", ()):
+        if "repeat" in step:
+            count = step["repeat"]
+            if not isinstance(count, int) or count < 1:
+                raise ValueError(f"repeat: Anzahl >= 1 erwartet, nicht {count!r}")
+            segments = []
+            for inner in step.get("steps", ()):
+                if "repeat" in inner:
+                    raise ValueError("verschachtelte Zyklen werden nicht unterstützt")
+                segments.append(_compile_step(inner, mm_per_step))
+            if not segments:
+                raise ValueError("repeat ohne Abschnitte")
+            ops.append(Repeat(count, segments))
+        else:
+            ops.append(_compile_step(step, mm_per_step))
+    if not ops:
+        raise ValueError("Programm ohne Abschnitte")
+    return Program(data.get("name", "Programm"), ops, bool(data.get("record", True)), data)
+
+
+def load_program(path, mm_per_step):
+    with open(path) as f:
+        return compile_program(json.load(f), mm_per_step)
+
+
+class CycleAggregator:
+    """
+    Kennwerte pro Zyklus aus dem Messwertstrom. begin() (Programm-Thread)
+    markiert ab einem Zeitstempel einen neuen Zyklus, add() (Sensor-Thread)
+    ordnet jeden Messwert über seinen Zeitstempel zu. Abgeschlossene Zyklen
+    landen in completed (zum Schreiben) und in recent (die letzten keep).
+    Hysteresefläche: Integral F dx über den Zyklus (Trapezregel) in N·mm.
+    """
+    FIELDS = ("cycle", "t_start", "t_end", "samples", "peak", "valley", "x_peak", "x_valley", "hysteresis")
+
+    def __init__(self, keep=100):
+        self.recent = deque(maxlen=keep)
+        self.completed = queue.SimpleQueue()
+        self.cycles = 0
+        self._boundaries = deque()
+        self._lock = threading.Lock()
+        self._cycle = None
+        self._last = None  # (x, Kraft) des letzten Messwerts, auch über Zyklusgrenzen
+
+    def begin(self, cycle, t):
+        """Ab Zeitpunkt t gehören die Messwerte zu Zyklus cycle (None = zu keinem)."""
+        with self._lock:
+            self._boundaries.append((t, cycle))
+
+    def add(self, t, x, force):
+        with self._lock:
+            boundaries = self._boundaries
+            while boundaries and t >= boundaries[0][0]:
+                self._switch(*boundaries.popleft())
+            if self._cycle is not None:
+                self._accumulate(t, x, force)
+            self._last = (x, force)
+
+    def flush(self):
+        """Schließt alle angemeldeten Zyklen ab (am Programmende)."""
+        with self._lock:
+            while self._boundaries:
+                self._switch(*self._boundaries.popleft())
+            self._switch(None, None)
+
+    def _switch(self, t, cycle):
+        if self._cycle is not None:
+            row = self._row
+            if t is not None:
+                row[2] = t
+            self.completed.put(tuple(row))
+            self.recent.append(tuple(row))
+            self.cycles += 1
+        self._cycle = cycle
+        if cycle is not None:
+            # cycle, t_start, t_end, samples, peak, valley, x_peak, x_valley, hysteresis
+            self._row = [cycle, t, t, 0, -math.inf, math.inf, None, None, 0.0]
+
+    def _accumulate(self, t, x, force):
+        row = self._row
+        row[2] = t
+        row[3] += 1
+        if force > row[4]:
+            row[4] = force
+            row[6] = x
+        if force < row[5]:
+            row[5] = force
+            row[7] = x
+        last = self._last
+        if last is not None:
+            row[8] += (last[1] + force) * 0.5 * (x - last[0])
+
+    def write_completed(self, f):
+        """Schreibt die abgeschlossenen Zyklen als CSV-Zeilen nach f."""
+        while True:
+            try:
+                row = self.completed.get_nowait()
+            except queue.Empty:
+                return
+            if row[3] == 0:
+                f.write(f"{row[0]};{row[1]:.4f};{row[2]:.4f};0;;;;;\n")
+            else:
+                f.write(f"{row[0]};{row[1]:.4f};{row[2]:.4f};{row[3]};{row[4]:.3f};{row[5]:.3f};"
+                        f"{row[6]:.4f};{row[7]:.4f};{row[8]:.4f}\n")
+
+
+class ProgramRunner:
+    """Führt ein Program auf einer Zugpruefmaschine aus (blockierend, im Versuchs-Thread)."""
+    def __init__(self, machine, program, keep=100):
+        self.machine = machine
+        self.program = program
+        self.cycles = CycleAggregator(keep)
+        self.cycle = 0
+        self.stop_reason = None
+        self._armed = None  # (Kraft, beim Belasten) des laufenden Abschnitts mit until_force
+        self._trigger_hit = False
+        self._mm_per_step = machine.motor.mm_per_step
+
+    # Sensor-Thread: Kraft-Trigger und Zyklus-Kennwerte
+    def observe(self, t, force, steps):
+        self._check_trigger(force)
+        self.cycles.add(t, steps * self._mm_per_step, force)
+
+    def _check_trigger(self, force):
+        armed = self._armed
+        if armed is not None and (force >= armed[0] if armed[1] else force <= armed[0]):
+            self._armed = None
+            self._trigger_hit = True
+            self.machine.process_stop_event.set()
+
+    def run(self, logfile_name):
+        m = self.machine
+        program = self.program
+        t_start = m.clock()
+        base = os.path.splitext(logfile_name)[0]
+        m.logfile_name = logfile_name
+        m.display.logfile = os.path.basename(logfile_name)
+        recording = base + ".rec"
+        recorder = None
+        cycles_file = None
+        try:
+            if program.record:
+                recorder = Recorder(recording, metadata={
+                    "program": program.source,
+                    "break_detection": m.break_detector.settings(),
+                    "mm_per_step": m.motor.mm_per_step,
+                    "profile": m.profile.name,
+                }, metrics=m.metrics, wait=m.recorder_wait)
+            if program.cycles:
+                cycles_file = open(base + ".cycles.csv", "w")
+                cycles_file.write(";".join(CycleAggregator.FIELDS) + "\n")
+            m.recorder = recorder
+            m.observer = self.observe
+            self.stop_reason = self._run_ops(cycles_file)
+            m.process_stop_event.set()
+        finally:
+            m.observer = None
+            m.recorder = None
+            m.detect_break = True
+            # Dieselbe Nachbereitung wie beim einfachen Versuch, vorher die Zyklus-Datei
+            m.finish_test(logfile_name, t_start, recorder, self.stop_reason or "error",
+                          extra=[("Zyklen", lambda: self._close_cycles(cycles_file))])
+        return self.stop_reason
+
+    def _close_cycles(self, cycles_file):
+        self.cycles.flush()
+        if cycles_file is not None:
+            try:
+                self.cycles.write_completed(cycles_file)
+            finally:
+                cycles_file.close()
+
+    def _run_ops(self, cycles_file):
+        clock = self.machine.clock
+        for op in self.program.ops:
+            if not isinstance(op, Repeat):
+                reason = self._run_segment(op)
+                if reason:
+                    return reason
+                continue
+            for _ in range(op.count):
+                self.cycles.begin(self.cycle + 1, clock())
+                for segment in op.segments:
+                    reason = self._run_segment(segment)
+                    if reason:
+                        return reason
+                self.cycle += 1
+                # Abgeschlossene Zyklen zwischen den Fahrten schreiben, nie im Sensor-Thread
+                self.cycles.write_completed(cycles_file)
+            self.cycles.begin(None, clock())
+        return "done"
+
+    def _stopped(self):
+        """Grund für ein gesetztes Stop-Event: None, wenn es nur ein Kraft-Trigger war."""
+        m = self.machine
+        if m.break_detector.triggered:
+            return "break"
+        if m.stop_requested or not self._trigger_hit:
+            return "stop"
+        self._trigger_hit = False
+        m.process_stop_event.clear()
+        return None
+
+    def _run_segment(self, segment):
+        m = self.machine
+        stop_event = m.process_stop_event
+        if stop_event.is_set():
+            # z.B. ein Kraft-Trigger, der erst nach dem Ende der letzten Fahrt kam
+            reason = self._stopped()
+            if reason:
+                return reason
+        if segment.kind == "hold":
+            m.detect_break = False
+            if m.motor.wait(stop_event, segment.duration):
+                return self._stopped()
+            return None
+        n = segment.steps - m.motor.position_steps if segment.absolute else segment.steps
+        direction = 1 if n >= 0 else -1
+        # Bruch-Erkennung nur beim Belasten, jeweils ab dem Beginn des Abschnitts
+        if direction > 0:
+            m.break_detector.reset()
+        m.detect_break = direction > 0
+        self._trigger_hit = False
+        if segment.until_force is not None:
+            self._armed = (segment.until_force, direction > 0)
+        m.motor.run(segment.schedule(abs(n)), direction, stop_event)
+        if segment.until_force is not None and not stop_event.is_set():
+            # Kraft evtl. mit den letzten Schritten erreicht: Sensor-Thread nachziehen lassen
+            m.motor.wait(stop_event, TRIGGER_GRACE)
+            self._check_trigger(m.current_force)
+        self._armed = None
+        if stop_event.is_set():
+            return self._stopped()
+        if segment.until_force is not None:
+            return "limit"
+        return None
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Aufruf: python program.py <programm.json>")
+        sys.exit(1)
+    mm_per_step = 3.125 / 1600
+    try:
+        program = load_program(sys.argv[1], mm_per_step)
+    except (OSError, ValueError) as e:
+        print(f"Fehler: {e}")
+        sys.exit(1)
+    print(f"Programm '{program.name}'" + ("" if program.record else " (ohne Rohdaten)"))
+    for op in program.ops:
+        if isinstance(op, Repeat):
+            print(f"  {op.count} Zyklen:")
+            for segment in op.segments:
+                print(f"    {segment.describe(mm_per_step)}")
+        else:
+            print(f"  {op.describe(mm_per_step)}")
+
+
+if __name__ == "__main__":
+    main()
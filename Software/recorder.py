@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Aufzeichnung aller Messwerte eines Versuchs in Spalten-Dateien.
+
+Jede Spalte (Zeit, Rohwert, Kraft, Position in Schritten zum Zeitpunkt
+des Messwerts) wird in einen vorab angelegten Puffer geschrieben. Volle
+Puffer schreibt ein eigener Thread am Stück an die Spaltendatei an
+(reines Binärformat, per np.memmap lesbar) und aktualisiert danach
+atomar das Manifest mit der Anzahl sicher geschriebener Werte. Nach einem
+Absturz gilt, was im Manifest steht.
+
+Die Erfassung wartet nicht auf die Platte: ist kein Puffer frei (Writer zu
+langsam oder nach einem Schreibfehler), wird der volle Puffer verworfen und
+gezählt. Nur ohne Echtzeit (Simulation, Benchmark) darf append mit wait
+begrenzt auf einen freien Puffer warten. Ein Schreibfehler wird in error
+festgehalten und von finalise() geworfen.
+
+Layout:  <name>.rec/manifest.json, time.bin, raw.bin, force.bin, steps.bin
+"""
+import json
+import os
+import queue
+import sys
+import threading
+from array import array
+
+# Spaltenname, array-Typecode, NumPy-dtype
+COLUMNS = (
+    ("time", 'd', "f8"),
+    ("raw", 'i', "i4"),
+    ("force", 'd', "f8"),
+    ("steps", 'd', "f8"),
+)
+
+
+class Recorder:
+    """
+    Nimmt Werte mit append() entgegen. Speicherbedarf ist fest:
+    buffers Puffer mit je chunk Werten pro Spalte. wait: so viele Sekunden
+    wartet append höchstens auf einen freien Puffer (0 = nie, an der Maschine).
+    """
+    def __init__(self, path, chunk=1024, buffers=4, metadata=None, metrics=None, wait=0.0):
+        self.path = path
+        self.wait = wait
+        self.metrics = metrics
+        self.chunk = chunk
+        self.metadata = dict(metadata or {})
+        self.committed = 0  # Werte, die sicher auf der Platte sind
+        self.stalls = 0     # wie oft kein Puffer frei war (Puffer verworfen)
+        self.dropped = 0    # verworfene Werte (kein freier Puffer oder nach Schreibfehler)
+        self.error = None   # erster Schreibfehler des Writer-Threads
+        self.closed = False
+        os.makedirs(path, exist_ok=True)
+        self._files = [open(os.path.join(path, f"{name}.bin"), "wb") for name, _, _ in COLUMNS]
+        self._free = queue.Queue()
+        for _ in range(buffers):
+            self._free.put([array(code, bytes(chunk * array(code).itemsize)) for _, code, _ in COLUMNS])
+        self._pending = queue.Queue()
+        self._cols = self._free.get()
+        self._n = 0
+        self._lock = threading.Lock()
+        self._write_manifest(complete=False)
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def append(self, t, raw, force, steps):
+        with self._lock:
+            if self.closed:
+                return
+            i = self._n
+            cols = self._cols
+            cols[0][i] = t
+            cols[1][i] = raw
+            cols[2][i] = force
+            cols[3][i] = steps
+            self._n = i + 1
+            if self._n == self.chunk:
+                self._swap()
+
+    def _swap(self):
+        try:
+            cols = self._free.get(timeout=self.wait) if self.wait else self._free.get_nowait()
+        except queue.Empty:
+            # Nicht warten (Sensor-Thread, Bruch-Erkennung): Puffer verwerfen und weiterschreiben
+            self.stalls += 1
+            self.dropped += self._n
+            self._n = 0
+            return
+        self._pending.put((self._cols, self._n))
+        if self.metrics is not None:
+            self.metrics.logger_queue.record(self._pending.qsize())
+        self._cols = cols
+        self._n = 0
+
+    def _write_loop(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                break
+            cols, n = item
+            if self.error is None:
+                committed = self.committed
+                try:
+                    for f, col in zip(self._files, cols):
+                        f.write(memoryview(col)[:n])
+                        f.flush()
+                        os.fsync(f.fileno())
+                    self.committed += n
+                    self._write_manifest(complete=False)
+                except (OSError, ValueError) as e:
+                    # Manifest bleibt beim letzten sicheren Stand, weitere Puffer werden verworfen
+                    self.error = e
+                    if self.committed == committed:
+                        self.dropped += n
+            else:
+                self.dropped += n
+            # Puffer immer zurückgeben, sonst fehlt er der Erfassung
+            self._free.put(cols)
+
+    def _write_manifest(self, complete):
+        manifest = {
+            "count": self.committed,
+            "complete": complete,
+            "byteorder": sys.byteorder,
+            "columns": [[name, dtype] for name, _, dtype in COLUMNS],
+            "metadata": self.metadata,
+        }
+        tmp = os.path.join(self.path, "manifest.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, "manifest.json"))
+
+    def finalise(self):
+        """
+        Schreibt den Rest, schließt die Dateien und markiert die Aufzeichnung als
+        vollständig. Nach einem Schreibfehler bleibt sie unvollständig, der Fehler
+        wird geworfen.
+        """
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            if self._n:
+                self._pending.put((self._cols, self._n))
+            self._pending.put(None)
+        self._writer.join()
+        for f in self._files:
+            try:
+                f.close()
+            except OSError as e:
+                self.error = self.error or e
+        if self.error is not None:
+            raise self.error
+        self._write_manifest(complete=True)
+
+
+def load_recording(path):
+    """
+    Öffnet eine Aufzeichnung als dict Spaltenname -> np.memmap (nur lesend).
+    Gelesen werden nur die laut Manifest sicher geschriebenen Werte.
+    """
+    import numpy as np
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    order = "<" if manifest["byteorder"] == "little" else ">"
+    count = manifest["count"]
+    columns = {}
+    for name, dtype in manifest["columns"]:
+        if count == 0:
+            columns[name] = np.zeros(0, dtype=order + dtype)
+        else:
+            columns[name] = np.memmap(os.path.join(path, f"{name}.bin"), dtype=order + dtype,
+                                      mode="r", shape=(count,))
+    return columns, manifest
+
+
+def export_csv(path, csv_path, mm_per_step, block=65536):
+    """Schreibt die Aufzeichnung als Position;Force-CSV (wie das alte Logfile), blockweise."""
+    import numpy as np
+    columns, _ = load_recording(path)
+    steps = columns["steps"]
+    force = columns["force"]
+    with open(csv_path, "w") as f:
+        f.write("Position;Force\n")
+        for start in range(0, len(force), block):
+            rows = np.column_stack((steps[start:start + block] * mm_per_step,
+                                    force[start:start + block]))
+            np.savetxt(f, rows, fmt="%.2f", delimiter=";")
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+Maschinensteuerung als eigener Prozess.
+
+Erfassung, Filter, Bruch-Erkennung und Schrittausgabe laufen in einem
+eigenen Python-Prozess (eigener GIL, optional auf eine CPU gebunden und mit
+erhöhter Priorität). Die GUI ist nur noch Client:
+- Messwerte und Status kommen über einen Ringpuffer in
+  multiprocessing.shared_memory (SharedSampleRing), ohne Kopie über Pipes.
+- Befehle (Verfahren, Versuch starten, Tarieren, Stop, Einstellungen) gehen
+  über eine Pipe, Antworten und Statusänderungen kommen darüber zurück.
+  Anfragen tragen eine laufende Nummer, die Antwort nennt sie wieder: eine
+  verspätete Antwort wird verworfen statt der nächsten Anfrage zugeordnet.
+
+MachineClient bietet dieselben Attribute und Methoden, die die GUI von
+Zugpruefmaschine benutzt, und ist dort direkt einsetzbar. start(wait=False)
+kehrt sofort zurück, der Aufbau der Hardware im Service-Prozess wird pro
+Gerät gemeldet (devices, device_status()), ready zeigt den ersten Status an.
+"""
+import multiprocessing as mp
+import os
+import threading
+from multiprocessing import shared_memory
+
+# Kopf des Ringpuffers, je 8 Byte
+_COUNT, _POSITION, _FORCE, _MAX_FORCE, _FLAGS = range(5)
+_HEADER = 8
+_TESTING = 1
+_BUSY = 2
+
+class ServiceTimeout(RuntimeError):
+    """Der Service hat eine Anfrage nicht rechtzeitig beantwortet."""
+
+
+class ServiceError(RuntimeError):
+    """Ein Befehl ist im Service mit einer Ausnahme gescheitert (Meldung aus dem Service)."""
+
+
+# Einstellungen, die der Client setzen darf
+SETTINGS = ("feed_rate", "zuglaenge", "kraft_abfall_grenze", "abfall_vom_maximum")
+
+
+class SharedSampleRing:
+    """
+    Ringpuffer in Shared Memory: (Zeitstempel, Rohwert, Kraft, Schritte) pro
+    Messwert plus Statuskopf (Position, Kraft, Maximum, Flags).
+    Ein Schreiber (Service), beliebig viele Leser. Der Zähler wird erst nach
+    dem Eintrag erhöht, Leser prüfen nach dem Kopieren, ob der Schreiber sie
+    inzwischen überholt hat.
+    """
+    def __init__(self, name=None, size=8192):
+        self.size = size
+        nbytes = (_HEADER + 4 * size) * 8
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            self.owner = True
+        else:
+            self.shm = _attach(name)
+            self.owner = False
+        self.name = self.shm.name
+        self._q = self.shm.buf.cast('q')
+        self._d = self.shm.buf.cast('d')
+        self._count = self._q[_COUNT]
+
+    @property
+    def count(self):
+        return self._q[_COUNT]
+
+    def publish(self, t, raw, force, steps):
+        """Schreibt einen Messwert (nur der Service)."""
+        size = self.size
+        i = _HEADER + self._count % size
+        d = self._d
+        d[i] = t
+        self._q[i + size] = raw
+        d[i + 2 * size] = force
+        d[i + 3 * size] = steps
+        self._count += 1
+        self._q[_COUNT] = self._count
+
+    def set_status(self, position_mm, force, max_force, testing, busy):
+        d = self._d
+        d[_POSITION] = position_mm
+        d[_FORCE] = force
+        d[_MAX_FORCE] = max_force
+        self._q[_FLAGS] = (_TESTING if testing else 0) | (_BUSY if busy else 0)
+
+    def status(self):
+        d = self._d
+        flags = self._q[_FLAGS]
+        return d[_POSITION], d[_FORCE], d[_MAX_FORCE], bool(flags & _TESTING), bool(flags & _BUSY)
+
+    def read_since(self, seq):
+        """Wie RingBuffer.read_since: (neue Sequenznummer, [(t, roh, kraft, schritte), ...], verlorene Werte)."""
+        size = self.size
+        end = self._q[_COUNT]
+        dropped = 0
+        if end - seq > size:
+            dropped = end - seq - size
+            seq = end - size
+        d = self._d
+        q = self._q
+        items = []
+        for k in range(seq, end):
+            i = _HEADER + k % size
+            items.append((d[i], q[i + size], d[i + 2 * size], d[i + 3 * size]))
+        # Während des Kopierens überschriebene Einträge verwerfen
+        overwritten = q[_COUNT] - size
+        if overwritten > seq:
+            lost = min(overwritten - seq, len(items))
+            items = items[lost:]
+            dropped += lost
+        return end, items, dropped
+
+    def close(self):
+        self._q.release()
+        self._d.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _attach(name):
+    """
+    Öffnet einen bestehenden Block. Aufräumen (unlink) macht der Besitzer.
+    Vor Python 3.13 meldet auch das Öffnen den Block beim resource_tracker an;
+    der Service-Prozess teilt sich den Tracker mit der GUI, dort ist er schon
+    angemeldet und wird mit dem unlink der GUI wieder abgemeldet.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        return shared_memory.SharedMemory(name=name)
+
+
+def set_realtime(cpu=None, priority=None):
+    """
+    Bindet den Prozess an eine CPU und erhöht die Priorität (SCHED_FIFO,
+    sonst nice -10). Ohne Rechte geht es ohne weiter, die Hinweise werden zurückgegeben.
+    """
+    notes = []
+    if cpu is not None:
+        try:
+            os.sched_setaffinity(0, {cpu})
+        except (AttributeError, OSError) as e:
+            notes.append(f"CPU-Bindung nicht möglich: {e}")
+    if priority is not None:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        except (AttributeError, OSError):
+            try:
+                os.nice(-10)
+            except OSError as e:
+                notes.append(f"Priorität nicht erhöht: {e}")
+    return notes
+
+
+class MachineService:
+    """Läuft im Service-Prozess: führt Befehle aus und hält den Statuskopf aktuell."""
+    def __init__(self, machine, conn, ring, status_interval=0.1):
+        self.machine = machine
+        self.conn = conn
+        self.ring = ring
+        self.status_interval = status_interval
+        self._sent = {}
+        machine.publisher = self._publish
+
+    def _publish(self, t, raw, force, steps):
+        self.ring.publish(t, raw, force, steps)
+        self._update_header()
+
+    def _update_header(self):
+        m = self.machine
+        self.ring.set_status(m.motor.position_mm, m.current_force, m.max_force_value,
+                             m.is_testing, m.motor.busy)
+
+    def serve(self):
+        conn = self.conn
+        self._send_status()
+        while True:
+            if conn.poll(self.status_interval):
+                try:
+                    command, args, request_id = conn.recv()
+                except EOFError:
+                    break
+                if command == "shutdown":
+                    break
+                self._handle(command, args, request_id)
+            self._update_header()
+            self._send_status()
+        self.machine.shutdown()
+
+    def _reply(self, request_id, value, error=None):
+        self.conn.send(("reply", (request_id, value, error)))
+
+    def _handle(self, command, args, request_id=None):
+        """Führt einen Befehl aus. Eine Ausnahme beendet nicht den Service, sondern geht als Antwort zurück."""
+        try:
+            self._execute(command, args, request_id)
+        except Exception as e:
+            print(f"Service: {command}{args!r}: {e!r}")
+            if request_id is not None:
+                self._reply(request_id, None, f"{command}: {e}")
+
+    def _execute(self, command, args, request_id):
+        m = self.machine
+        if command == "move_by":
+            m.move_by(*args)
+        elif command == "reset_position":
+            m.reset_position()
+        elif command == "return_to_zero":
+            m.return_to_zero()
+        elif command == "tare":
+            m.tare()
+        elif command == "stop":
+            m.stop()
+        elif command == "start_test":
+            started = m.start_test(*args)
+            # Erst den Status, dann die Antwort: der Client sieht danach is_testing
+            self._update_header()
+            self._reply(request_id, started)
+        elif command == "start_program":
+            from program import compile_program
+            data, logfile_name = args
+            try:
+                started = m.start_program(compile_program(data, m.motor.mm_per_step), logfile_name)
+            except ValueError as e:
+                started = str(e)
+            self._update_header()
+            self._reply(request_id, started)
+        elif command == "set":
+            name, value = args
+            if name in SETTINGS:
+                setattr(m, name, value)
+        elif command == "metrics":
+            self._reply(request_id, m.metrics_summary())
+        else:
+            raise ValueError("unbekannter Befehl")
+
+    def _send_status(self):
+        m = self.machine
+        status = {"tare_status": m.tare_status, "logfile": m.display.logfile,
+                  "mm_per_step": m.motor.mm_per_step, "profile_name": m.profile_name,
+                  "devices": m.device_status()}
+        status.update((name, getattr(m, name)) for name in SETTINGS)
+        if status != self._sent:
+            self.conn.send(("status", status))
+            self._sent = status
+
+
+def run_service(conn, ring_name, ring_size, factory, cpu=None, priority=None):
+    """Einstiegspunkt des Service-Prozesses."""
+    notes = set_realtime(cpu, priority)
+    ring = SharedSampleRing(ring_name, ring_size)
+    try:
+        # Fortschritt pro Gerät geht sofort an die GUI, nicht erst mit dem ersten Status
+        machine = factory(report=lambda device, text: conn.send(("device", (device, text))))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        ring.close()
+        return
+    service = MachineService(machine, conn, ring)
+    conn.send(("notes", notes))
+    machine.start()
+    try:
+        service.serve()
+    finally:
+        machine.publisher = None
+        if machine.sensor_thread is not None:
+            machine.sensor_thread.join(1.0)
+        ring.close()
+
+
+def _gpio_machine(report=None):
+    from zugpruefmaschine import Zugpruefmaschine
+    return Zugpruefmaschine.from_gpio(report)
+
+
+class _RemoteDisplay:
+    """Wie DisplayModel, aber aus dem Statuskopf im Shared Memory."""
+    def __init__(self, ring):
+        self._ring = ring
+        self.logfile = ""
+
+    @property
+    def force(self):
+        return self._ring.status()[1]
+
+    @property
+    def max_force(self):
+        return self._ring.status()[2]
+
+
+class _RemoteMotor:
+    def __init__(self, ring):
+        self._ring = ring
+        self.mm_per_step = None
+
+    @property
+    def position_mm(self):
+        return self._ring.status()[0]
+
+    @property
+    def busy(self):
+        return self._ring.status()[4]
+
+
+class MachineClient:
+    """
+    GUI-Seite: startet den Service-Prozess und spricht mit ihm.
+    factory(report=...) baut im Service-Prozess die Maschine (muss picklebar
+    sein), ohne Angabe die echte Hardware (Zugpruefmaschine.from_gpio).
+    """
+    def __init__(self, factory=None, cpu=None, priority=None, ring_size=8192):
+        self.ring = SharedSampleRing(size=ring_size)
+        self.display = _RemoteDisplay(self.ring)
+        self.motor = _RemoteMotor(self.ring)
+        self.tare_status = ""
+        self.logfile_name = None
+        self.profile_name = None
+        self.devices = {}
+        self.error = None   # Meldung, wenn der Aufbau der Maschine fehlschlägt
+        self.notes = []
+        self._settings = {}
+        # Offene Anfragen: request_id -> [Event, Antwort, Fehler], gefüllt vom Empfangs-Thread
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._request_id = 0
+        self._conn, child = mp.Pipe()
+        self.process = mp.Process(target=run_service,
+                                  args=(child, self.ring.name, ring_size, factory or _gpio_machine, cpu, priority),
+                                  daemon=True)
+        self._receiver = None
+        self._started = threading.Event()
+
+    def start(self, timeout=10.0, wait=True):
+        """Startet den Service-Prozess, mit wait bis zum ersten Status (sonst sofort zurück)."""
+        self.process.start()
+        self._receiver = threading.Thread(target=self._receive, daemon=True)
+        self._receiver.start()
+        if not wait:
+            return
+        if not self._started.wait(timeout):
+            raise RuntimeError("Maschinen-Service startet nicht")
+        if self.error is not None:
+            raise RuntimeError(self.error)
+
+    @property
+    def ready(self):
+        """True, sobald der Service läuft und der erste Status da ist."""
+        return self._started.is_set() and self.error is None
+
+    def device_status(self):
+        return dict(self.devices)
+
+    def _receive(self):
+        while True:
+            try:
+                kind, payload = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            if kind == "reply":
+                request_id, value, error = payload
+                # Antworten auf abgelaufene Anfragen haben keinen Eintrag mehr
+                entry = self._pending.get(request_id)
+                if entry is not None:
+                    entry[1:] = value, error
+                    entry[0].set()
+            elif kind == "notes":
+                self.notes = payload
+            elif kind == "device":
+                device, text = payload
+                self.devices = {**self.devices, device: text}
+            elif kind == "error":
+                self.error = payload
+                self._started.set()
+            elif kind == "status":
+                self.tare_status = payload.pop("tare_status")
+                self.display.logfile = payload.pop("logfile")
+                self.motor.mm_per_step = payload.pop("mm_per_step")
+                self.profile_name = payload.pop("profile_name")
+                self.devices = payload.pop("devices")
+                self._settings = payload
+                self._started.set()
+
+    def _send(self, command, *args):
+        with self._lock:
+            self._conn.send((command, args, None))
+
+    def _request(self, command, *args, timeout=5.0):
+        """
+        Sendet eine Anfrage und wartet auf ihre Antwort. ServiceTimeout nach
+        timeout s, ServiceError, wenn der Befehl im Service scheitert. Gewartet
+        wird ohne Lock, _send aus dem Tk-Thread kommt währenddessen durch.
+        """
+        entry = [threading.Event(), None, None]
+        with self._lock:
+            self._request_id += 1
+            request_id = self._request_id
+        self._pending[request_id] = entry
+        try:
+            with self._lock:
+                self._conn.send((command, args, request_id))
+            if not entry[0].wait(timeout):
+                raise ServiceTimeout(f"keine Antwort auf {command} nach {timeout:.1f} s")
+        finally:
+            del self._pending[request_id]
+        event, value, error = entry
+        if error is not None:
+            raise ServiceError(error)
+        return value
+
+    # Zustand aus dem Shared Memory
+    @property
+    def is_testing(self):
+        return self.ring.status()[3]
+
+    @property
+    def current_force(self):
+        return self.ring.status()[1]
+
+    @property
+    def max_force_value(self):
+        return self.ring.status()[2]
+
+    # Einstellungen: lokal gespiegelt, Änderungen gehen an den Service
+    def __getattr__(self, name):
+        if name in SETTINGS:
+            return self._settings.get(name)
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if name in SETTINGS:
+            self._settings[name] = value
+            self._send("set", name, value)
+        else:
+            super().__setattr__(name, value)
+
+    # Befehle
+    def move_by(self, mm):
+        self._send("move_by", mm)
+
+    def reset_position(self):
+        self._send("reset_position")
+
+    def return_to_zero(self):
+        self._send("return_to_zero")
+
+    def tare(self):
+        self._send("tare")
+
+    def stop(self):
+        self._send("stop")
+
+    # start_test, start_program, metrics_summary: ServiceTimeout, wenn der Service nicht antwortet,
+    # ServiceError, wenn der Befehl dort scheitert (beides RuntimeError)
+    def start_test(self, logfile_name):
+        started = self._request("start_test", logfile_name)
+        if started:
+            self.logfile_name = logfile_name
+        return started
+
+    def start_program(self, data, logfile_name):
+        """
+        Startet ein Prüfprogramm (Beschreibung als dict, siehe program.py).
+        True/False wie start_test oder die Fehlermeldung des Programms.
+        """
+        started = self._request("start_program", data, logfile_name)
+        if started is True:
+            self.logfile_name = logfile_name
+        return started
+
+    def metrics_summary(self, timeout=1.0):
+        return self._request("metrics", timeout=timeout)
+
+    def shutdown(self, timeout=5.0):
+        try:
+            self._send("shutdown")
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.close()
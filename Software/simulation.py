@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Simulation der Zugprüfmaschine ohne Raspberry Pi.
+
+- VirtualClock: virtuelle Zeit mit Ereignisliste. sleep() springt direkt
+  zum nächsten Ereignis, ein ganzer Versuch läuft so viel schneller als in Echtzeit.
+- SpecimenModel: Kraft-Weg-Verlauf einer Probe (elastisch, plastisch, Bruch).
+- CyclicSpecimenModel: Probe mit Hysterese für zyklische Prüfprogramme.
+- VirtualLoadCell + VirtualHX711Backend: liefern die Kraft der Probe als
+  HX711-Rohwerte mit 80 SPS, Rauschen und Takt-Jitter. Der HX711 läuft dabei
+  unverändert über die gpiozero MockFactory, nur das Backend ist virtuell.
+- VirtualStepperDriver: nimmt die STEP/DIR-Pulse des Motors entgegen und
+  bewegt die Probe.
+- Simulation: baut daraus eine komplette Zugpruefmaschine zusammen.
+"""
+import heapq
+import itertools
+import math
+import random
+import time
+
+from gpiozero import Device
+from gpiozero.pins.mock import MockFactory
+
+from HX711 import HX711
+from program import ProgramRunner
+from zugpruefmaschine import Zugpruefmaschine
+
+
+class VirtualClock:
+    """Virtuelle Zeit in Sekunden. Aufrufbar wie time.perf_counter."""
+    def __init__(self, start=0.0):
+        self.now = start
+        self._events = []
+        self._order = itertools.count()
+
+    def __call__(self):
+        return self.now
+
+    def schedule(self, t, callback):
+        heapq.heappush(self._events, (t, next(self._order), callback))
+
+    def sleep(self, dt):
+        self.advance_to(self.now + dt)
+
+    def advance_to(self, t):
+        """Arbeitet alle Ereignisse bis t ab und stellt die Uhr auf t."""
+        events = self._events
+        while events and events[0][0] <= t:
+            self._run_next()
+        if t > self.now:
+            self.now = t
+
+    def wait(self, event, timeout):
+        """Wie threading.Event.wait, aber in virtueller Zeit: endet beim Ereignis, das event setzt."""
+        end = self.now + timeout
+        events = self._events
+        while not event.is_set() and events and events[0][0] <= end:
+            self._run_next()
+        if event.is_set():
+            return True
+        if end > self.now:
+            self.now = end
+        return False
+
+    def _run_next(self):
+        et, _, callback = heapq.heappop(self._events)
+        if et > self.now:
+            self.now = et
+        callback()
+
+
+class SpecimenModel:
+    """
+    Probe mit elastischem Bereich (stiffness N/mm bis yield_force), danach
+    Verfestigung fy + hardening * sqrt(x - x_yield) bis zum Bruch bei
+    break_elongation mm. Nach dem Bruch fällt die Kraft innerhalb von
+    break_duration s linear auf residual_force (0 = schlagartig).
+    """
+    def __init__(self, stiffness=400.0, yield_force=45.0, hardening=8.0,
+                 break_elongation=1.5, residual_force=0.0, break_duration=0.0):
+        self.stiffness = stiffness
+        self.yield_force = yield_force
+        self.hardening = hardening
+        self.break_elongation = break_elongation
+        self.residual_force = residual_force
+        self.break_duration = break_duration
+        self.broken_at = None  # Zeitpunkt des Bruchs
+        self._break_force = 0.0
+
+    def force(self, x, t=None):
+        if self.broken_at is not None:
+            if t is not None and t - self.broken_at < self.break_duration:
+                fade = 1.0 - (t - self.broken_at) / self.break_duration
+                return self.residual_force + (self._break_force - self.residual_force) * fade
+            return self.residual_force
+        x_yield = self.yield_force / self.stiffness
+        if x <= x_yield:
+            return self.stiffness * max(x, 0.0)
+        return self.yield_force + self.hardening * (x - x_yield) ** 0.5
+
+    def update(self, x, t):
+        if self.broken_at is None and x >= self.break_elongation:
+            self._break_force = self.force(x)
+            self.broken_at = t
+
+
+class CyclicSpecimenModel:
+    """
+    Bilineare kinematische Verfestigung: elastisch mit stiffness N/mm, nach
+    Überschreiten der Fließgrenze (um die Rückspannung verschoben) plastisch
+    mit hardening N/mm. Be- und Entlastung über einen Kraftbereich größer als
+    2 * yield_force ergeben in jedem Zyklus eine Hystereseschleife.
+    """
+    def __init__(self, stiffness=400.0, yield_force=20.0, hardening=40.0):
+        self.stiffness = stiffness
+        self.yield_force = yield_force
+        self.hardening = hardening
+        self.broken_at = None
+        self.x_plastic = 0.0
+        self.back_force = 0.0
+
+    def force(self, x, t=None):
+        return self.stiffness * (x - self.x_plastic)
+
+    def update(self, x, t):
+        f = self.stiffness * (x - self.x_plastic) - self.back_force
+        excess = abs(f) - self.yield_force
+        if excess > 0:
+            dx = math.copysign(excess / (self.stiffness + self.hardening), f)
+            self.x_plastic += dx
+            self.back_force += self.hardening * dx
+
+
+class VirtualOutput:
+    """Ausgang mit on()/off() wie gpiozero DigitalOutputDevice."""
+    def __init__(self, on_rise=None):
+        self.value = 0
+        self._on_rise = on_rise
+
+    def on(self):
+        if not self.value and self._on_rise is not None:
+            self._on_rise()
+        self.value = 1
+
+    def off(self):
+        self.value = 0
+
+    def close(self):
+        pass
+
+
+class VirtualStepperDriver:
+    """Schrittmotor-Treiber: jede steigende STEP-Flanke bewegt die Traverse um einen Schritt."""
+    def __init__(self, clock, specimen=None, mm_per_step=3.125 / 1600):
+        self.clock = clock
+        self.specimen = specimen
+        self.mm_per_step = mm_per_step
+        self.position_steps = 0
+        self.pulses = 0
+        self.last_step_time = None
+        self.step_times = None  # Liste: Zeitpunkt jeder Flanke wird angehängt (Auswertung)
+        self.step = VirtualOutput(self._on_step)
+        self.direction = VirtualOutput()
+        self.enable = VirtualOutput()
+
+    @property
+    def position_mm(self):
+        return self.position_steps * self.mm_per_step
+
+    def _on_step(self):
+        self.position_steps += 1 if self.direction.value else -1
+        self.pulses += 1
+        t = self.clock()
+        self.last_step_time = t
+        if self.step_times is not None:
+            self.step_times.append(t)
+        if self.specimen is not None:
+            self.specimen.update(self.position_mm, t)
+
+
+class VirtualHX711Backend:
+    """HX711-Backend, das statt zu takten den vorbereiteten Wert der VirtualLoadCell liefert."""
+    def __init__(self, dout, sck):
+        self.dout = dout
+        self.sck = sck
+        self.value = 0
+
+    def shift_in(self, pulses=1):
+        # Nach dem Auslesen geht DOUT wie beim echten Chip wieder auf HIGH
+        self.dout.pin.drive_high()
+        return self.value & 0xFFFFFF
+
+
+class VirtualLoadCell:
+    """
+    Erzeugt im Takt des HX711 neue Wandlungen: Kraft der Probe an der aktuellen
+    Traversenposition plus Rauschen, umgerechnet in Rohwerte, dann DOUT auf LOW.
+    """
+    def __init__(self, clock, hx, specimen, driver, sample_rate=80.0, noise=0.05,
+                 zero=12000, scale=-0.0003024406, jitter=0.0001, seed=1, on_sample=None):
+        self.clock = clock
+        self.hx = hx
+        self.specimen = specimen
+        self.driver = driver
+        self.period = 1.0 / sample_rate
+        self.noise = noise
+        self.zero = zero
+        self.scale = scale
+        self.jitter = jitter
+        self.on_sample = on_sample
+        self.conversions = 0
+        self.dropped = 0  # Wandlungen, die nicht ausgelesen wurden
+        self._random = random.Random(seed)
+        hx.dout.pin.drive_high()
+
+    def start(self):
+        self.clock.schedule(self.clock() + self.period, self._convert)
+
+    def _convert(self):
+        force = self.specimen.force(self.driver.position_mm, self.clock()) + self._random.gauss(0.0, self.noise)
+        pin = self.hx.dout.pin
+        if not pin.state:
+            self.dropped += 1
+            pin.drive_high()
+        self.hx.backend.value = int(round(self.zero + force / self.scale))
+        self.conversions += 1
+        pin.drive_low()
+        if self.on_sample is not None:
+            self.on_sample()
+        self.clock.schedule(self.clock() + self.period + self._random.gauss(0.0, self.jitter), self._convert)
+
+
+class Simulation:
+    """Komplette Maschine auf virtueller Hardware und virtueller Zeit."""
+    def __init__(self, specimen=None, sample_rate=80.0, noise=0.05, seed=1):
+        if not isinstance(Device.pin_factory, MockFactory):
+            Device.pin_factory = MockFactory()
+        else:
+            Device.pin_factory.reset()
+        self.clock = VirtualClock()
+        self.specimen = specimen or SpecimenModel()
+        self.driver = VirtualStepperDriver(self.clock, self.specimen)
+        self.hx = HX711(dout_pin=5, sck_pin=6, backend=VirtualHX711Backend)
+        # MockPin protokolliert jede Flanke - bei langen Läufen unnötig
+        self.hx.dout.pin.states = NoHistory()
+        self.machine = Zugpruefmaschine(self.hx, self.driver.step, self.driver.direction,
+                                        self.driver.enable, clock=self.clock,
+                                        sleep=self.clock.sleep, wait=self.clock.wait, spin=0.0)
+        # Virtuelle Zeit läuft schneller als die Platte schreibt
+        self.machine.recorder_wait = 5.0
+        self.load_cell = VirtualLoadCell(self.clock, self.hx, self.specimen, self.driver,
+                                         sample_rate=sample_rate, noise=noise, seed=seed,
+                                         on_sample=self._on_sample)
+        self.stop_time = None  # wann der Versuch gestoppt wurde (Bruch erkannt)
+        self.machine.acquisition.start()
+        self.load_cell.start()
+
+    def _on_sample(self):
+        self.machine.process_pending()
+
+    def settle(self, seconds=0.5, tare=True):
+        """Lässt die Erfassung ohne Bewegung laufen und tariert danach."""
+        self.clock.sleep(seconds)
+        if tare:
+            averaging = self.machine.tare()
+            self.clock.wait(averaging.done, 1.0)
+
+    def run_test(self, logfile_name, feed_rate=5, zuglaenge=5, kraft_abfall_grenze=5, abfall_vom_maximum=0,
+                 **criteria):
+        """
+        Führt einen Versuch in virtueller Zeit aus und gibt Kennzahlen zurück.
+        Zeiten in s (virtuell), wall_time in s (echt). criteria setzt weitere
+        Attribute der Bruch-Erkennung (drop_percent, rate, window, min_peak).
+        """
+        m = self.machine
+        m.feed_rate = feed_rate
+        m.zuglaenge = zuglaenge
+        m.kraft_abfall_grenze = kraft_abfall_grenze
+        m.abfall_vom_maximum = abfall_vom_maximum
+        for name, value in criteria.items():
+            setattr(m.break_detector, name, value)
+        samples_before = m.samples.count
+        t_start = self.clock()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        m.prepare_test()
+        m.run_test(logfile_name)
+        cpu = time.process_time() - cpu
+        wall = time.perf_counter() - wall
+        duration = self.clock() - t_start
+        samples = m.samples.count - samples_before
+        broken_at = self.specimen.broken_at
+        detector = m.break_detector
+        self.stop_time = detector.trigger_time
+        last_step = self.driver.last_step_time
+        return {
+            "duration": duration,
+            "wall_time": wall,
+            "cpu_time": cpu,
+            "samples": samples,
+            "sample_rate": samples / duration if duration else 0.0,
+            "dropped": self.load_cell.dropped + m.acquisition.dropped,
+            "steps": self.driver.pulses,
+            "max_step_lateness": m.motor.max_lateness,
+            "late_steps": m.motor.late_steps,
+            "max_force": m.max_force_value,
+            "broken_at": broken_at,
+            "stop_time": self.stop_time,
+            "stop_reason": detector.reason,
+            "last_step_time": last_step,
+            "detection_latency": (self.stop_time - broken_at)
+            if broken_at is not None and self.stop_time is not None else None,
+            # > 0: Schritte nach der Erkennung, <= 0: kein Schritt mehr danach
+            "stop_to_last_step": (last_step - self.stop_time)
+            if self.stop_time is not None else None,
+            "last_step_latency": (last_step - broken_at)
+            if broken_at is not None else None,
+        }
+
+    def run_program(self, program, logfile_name):
+        """
+        Führt ein Prüfprogramm (program.Program) in virtueller Zeit aus.
+        Gibt Kennzahlen und den ProgramRunner (Zyklus-Kennwerte) zurück.
+        """
+        m = self.machine
+        runner = ProgramRunner(m, program)
+        t_start = self.clock()
+        samples_before = m.samples.count
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        m.prepare_test()
+        runner.run(logfile_name)
+        return {
+            "duration": self.clock() - t_start,
+            "wall_time": time.perf_counter() - wall,
+            "cpu_time": time.process_time() - cpu,
+            "samples": m.samples.count - samples_before,
+            "steps": self.driver.pulses,
+            "cycles": runner.cycle,
+            "stop_reason": runner.stop_reason,
+            "runner": runner,
+        }
+
+
+class NoHistory(list):
+    """Ersatz für MockPin.states: merkt sich keine Flanken (bei langen Läufen unnötig)."""
+    def append(self, item):
+        pass
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Startzeiten der GUI, vergleichbar über Versionen hinweg.
+
+Gemessen ab dem Beginn des GUI-Skripts (vor den Imports):
+- import:         Module für das erste Bild geladen
+- first_frame:    Fenster und Layout sind gezeichnet
+- hardware_ready: Geräte aufgebaut, der HX711 liefert Messwerte und die
+                  erste Tarierung ist fertig
+Jeder Start hängt eine Zeile an logs/startup_times.jsonl an, mit Datum und
+Version (kurzer git-Hash, falls vorhanden). Wird die Hardware nicht fertig
+(z.B. Wägezelle nicht angeschlossen), steht hardware_ready auf null.
+
+Aufruf:  python startup.py   -> Median der Zeiten pro Version
+"""
+import json
+import os
+import time
+from datetime import datetime
+
+LOG_DIR = "./logs"
+REPORT_FILE = "startup_times.jsonl"
+MARKS = ("import", "first_frame", "hardware_ready")
+
+
+def hardware_ready(devices, tare_status):
+    """True, wenn kein Gerät einen Fehler meldet, der HX711 Daten liefert und tariert ist."""
+    return (devices.get("HX711") == "ok"
+            and not any(text.startswith("Fehler") for text in devices.values())
+            and tare_status.startswith("Tariert"))
+
+
+def version():
+    """Kurzer git-Hash des Programmstands oder None (kein git, kein Repository)."""
+    import subprocess
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=2.0, cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+class StartupReport:
+    """t0: time.perf_counter() beim Start des Skripts. Jede Marke zählt nur beim ersten Mal."""
+    def __init__(self, t0, log_dir=LOG_DIR, clock=time.perf_counter):
+        self.t0 = t0
+        self.clock = clock
+        self.path = os.path.join(log_dir, REPORT_FILE)
+        self.marks = {}
+        self.saved = False
+
+    def mark(self, name, t=None):
+        if name not in self.marks:
+            self.marks[name] = (self.clock() if t is None else t) - self.t0
+
+    def entry(self, **info):
+        entry = {"date": datetime.now().isoformat(timespec="seconds"), "version": version()}
+        entry.update((name, round(self.marks[name] * 1000, 1) if name in self.marks else None)
+                     for name in MARKS)
+        entry.update(info)
+        return entry
+
+    def save(self, **info):
+        """Hängt den Eintrag (Zeiten in ms, dazu info, z.B. mode) an die Datei an, nur einmal."""
+        if self.saved:
+            return None
+        entry = self.entry(**info)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        self.saved = True
+        return entry
+
+
+def format_entry(entry):
+    def ms(value):
+        return f"{value:8.1f} ms" if value is not None else "       - ms"
+    return "  ".join(f"{name} {ms(entry.get(name))}" for name in MARKS)
+
+
+def summarize(path):
+    """Median der Startzeiten pro Version und Betriebsart, in der Reihenfolge des ersten Auftretens."""
+    import statistics
+    groups = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                groups.setdefault((entry.get("version"), entry.get("mode")), []).append(entry)
+    result = []
+    for (ver, mode), entries in groups.items():
+        median = {}
+        for name in MARKS:
+            values = [e[name] for e in entries if e.get(name) is not None]
+            median[name] = statistics.median(values) if values else None
+        result.append((ver, mode, len(entries), median))
+    return result
+
+
+def main():
+    path = os.path.join(LOG_DIR, REPORT_FILE)
+    if not os.path.exists(path):
+        print(f"Noch keine Startzeiten ({path})")
+        return
+    for ver, mode, n, median in summarize(path):
+        print(f"{ver or '?':10s} {mode or '-':12s} {n:4d} Starts  {format_entry(median)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Schrittmotor-Ansteuerung mit vorab berechneten Fahrprofilen.
+Die Schrittzeitpunkte werden als Array berechnet (Trapez oder S-Kurve)
+und gegen absolute Deadlines ausgegeben, so summiert sich kein
+Sleep-Fehler über die Fahrt auf. Die Position ist ein ganzzahliger
+Schrittzähler, den die GUI in ihrem eigenen Takt abfragt. Zusätzlich
+führt der Motor eine Zeitleiste der Schrittzeitpunkte, aus der sich die
+Position zu einem beliebigen Zeitstempel (z.B. eines Kraftwerts) ergibt.
+"""
+import math
+import time
+from array import array
+from bisect import bisect_right
+
+# Mindestzeiten am Treiber-Eingang (STEP/DIR). Typische Treiber verlangen
+# >= 2.5 µs Puls high/low und >= 5 µs DIR vor der ersten Flanke; hier mit Reserve.
+# Sie werden aktiv abgewartet (time.perf_counter, auch in der Simulation echte
+# Zeit), statt sich auf die Laufzeit von on()/off() zu verlassen - die hängt
+# auf dem Pi 5 vom GPIO-Backend (lgpio) ab und ist nicht garantiert.
+STEP_HIGH_MIN = 5e-6   # s, STEP high
+STEP_LOW_MIN = 5e-6    # s, STEP low bis zur nächsten Flanke
+DIR_SETUP_MIN = 10e-6  # s, DIR stabil vor dem ersten Schritt
+
+
+def _hold(seconds, clock=time.perf_counter):
+    """Aktives Warten für wenige µs (sleep ist dafür viel zu grob)."""
+    end = clock() + seconds
+    while clock() < end:
+        pass
+
+
+def _build_profile(n, v_peak, k_acc, ramp_time):
+    """
+    Schrittzeiten für n Schritte: Rampe hoch bis k_acc, konstante Fahrt
+    mit v_peak, Rampe runter (gespiegelt). ramp_time(k) liefert die Zeit,
+    bis in der Beschleunigungsphase die Position k erreicht ist.
+    """
+    times = array('d', bytes(n * array('d').itemsize))
+    if n == 0:
+        return times
+    t_acc = ramp_time(k_acc)
+    total = 2 * t_acc + (n - 2 * k_acc) / v_peak
+    for k in range(n):
+        if k <= k_acc:
+            times[k] = ramp_time(k)
+        elif k < n - k_acc:
+            times[k] = t_acc + (k - k_acc) / v_peak
+        else:
+            times[k] = total - ramp_time(n - k)
+    return times
+
+
+def _ramp_limits(n, v_max, accel, v_start):
+    """Spitzengeschwindigkeit und Länge der Rampe (in Schritten)."""
+    k_acc = (v_max ** 2 - v_start ** 2) / (2 * accel)
+    if 2 * k_acc > n:
+        # Dreiecksprofil: v_max wird nicht erreicht
+        k_acc = n / 2
+        v_max = math.sqrt(v_start ** 2 + 2 * accel * k_acc)
+    return v_max, k_acc
+
+
+def constant_profile(n, v):
+    """Schrittzeiten ohne Rampe (wie die alte Schleife mit time.sleep(1/f))."""
+    times = array('d', bytes(n * array('d').itemsize))
+    for k in range(n):
+        times[k] = k / v
+    return times
+
+
+def trapezoid_profile(n, v_max, accel, v_start=0.0):
+    """Schrittzeiten mit konstanter Beschleunigung accel (Schritte/s²)."""
+    v_start = min(v_start, v_max)
+    v_peak, k_acc = _ramp_limits(n, v_max, accel, v_start)
+
+    def ramp_time(k):
+        return (math.sqrt(v_start ** 2 + 2 * accel * k) - v_start) / accel
+    return _build_profile(n, v_peak, k_acc, ramp_time)
+
+
+def s_curve_profile(n, v_max, accel, v_start=0.0):
+    """
+    Schrittzeiten mit sinusförmiger Geschwindigkeitsrampe (ruckbegrenzt).
+    accel ist die mittlere Beschleunigung, die Rampe ist damit genauso
+    lang wie beim Trapezprofil.
+    """
+    v_start = min(v_start, v_max)
+    v_peak, k_acc = _ramp_limits(n, v_max, accel, v_start)
+    t_ramp = (v_peak - v_start) / accel
+    dv = v_peak - v_start
+
+    def pos(t):
+        return v_start * t + dv / 2 * (t - t_ramp / math.pi * math.sin(math.pi * t / t_ramp))
+
+    def vel(t):
+        return v_start + dv / 2 * (1 - math.cos(math.pi * t / t_ramp))
+
+    def ramp_time(k):
+        if k <= 0:
+            return 0.0
+        if k >= k_acc:
+            return t_ramp
+        # Newton-Verfahren, eingeschränkt auf [lo, hi] (pos ist monoton)
+        lo, hi = 0.0, t_ramp
+        t = t_ramp * k / k_acc
+        for _ in range(50):
+            err = pos(t) - k
+            if abs(err) < 1e-9:
+                break
+            if err > 0:
+                hi = t
+            else:
+                lo = t
+            v = vel(t)
+            t_new = t - err / v if v > 0 else (lo + hi) / 2
+            t = t_new if lo < t_new < hi else (lo + hi) / 2
+        return t
+    return _build_profile(n, v_peak, k_acc, ramp_time)
+
+
+class StepTimeline:
+    """
+    Ringpuffer mit (Zeitpunkt, Position nach dem Schritt) für jeden Schritt.
+    Ein Schreiber (der Motor-Thread) und ein Leser (die Messwertverarbeitung).
+    position_at() merkt sich die letzte Stelle und sucht von dort per
+    Bisektion weiter, die Kosten pro Messwert sind O(log k) für k Schritte
+    seit dem letzten Messwert. clear() läuft in einem anderen Thread als
+    position_at(), die gemerkte Stelle wird deshalb bei jedem Aufruf auf
+    den gültigen Bereich begrenzt.
+    """
+    def __init__(self, size=4096):
+        self.size = size
+        self.times = array('d', bytes(size * array('d').itemsize))
+        self.positions = array('q', bytes(size * array('q').itemsize))
+        self.count = 0
+        # Nächster geplanter Schritt (vom Motor gesetzt, None im Stillstand)
+        self.next_time = None
+        self.next_position = 0
+        self._cursor = 0
+
+    def clear(self, t, position):
+        """Neuer Anfang, z.B. nach dem Nullsetzen der Position."""
+        self.next_time = None
+        self._cursor = 0
+        self.count = 0
+        self.record(t, position)
+
+    def record(self, t, position):
+        i = self.count % self.size
+        self.times[i] = t
+        self.positions[i] = position
+        self.count += 1
+
+    def _last_before(self, lo, hi, t):
+        """Größter Index j in [lo, hi) mit times[j] <= t (lo, falls keiner)."""
+        size = self.size
+        start = lo % size
+        n = hi - lo
+        if start + n <= size:
+            k = bisect_right(self.times, t, start, start + n)
+            return max(lo, lo + k - start - 1)
+        # Bereich läuft über das Ende des Ringpuffers
+        first = size - start
+        if self.times[size - 1] <= t:
+            k = bisect_right(self.times, t, 0, n - first)
+            return lo + first + k - 1
+        k = bisect_right(self.times, t, start, size)
+        return max(lo, lo + k - start - 1)
+
+    def position_at(self, t):
+        """Position in Schritten (linear interpoliert) zum Zeitpunkt t."""
+        times = self.times
+        positions = self.positions
+        size = self.size
+        end = self.count
+        oldest = max(0, end - size)
+        # Nach clear() kann die gemerkte Stelle hinter count liegen
+        i = max(oldest, min(self._cursor, end - 1))
+        if times[i % size] <= t:
+            i = self._last_before(i, end, t)
+        else:
+            i = self._last_before(oldest, i, t)
+        self._cursor = i
+        t0 = times[i % size]
+        p0 = positions[i % size]
+        if t <= t0:
+            return float(p0)
+        if i + 1 < end:
+            t1 = times[(i + 1) % size]
+            p1 = positions[(i + 1) % size]
+        else:
+            # Nach dem letzten Schritt: bis zum geplanten nächsten Schritt interpolieren
+            t1 = self.next_time
+            p1 = self.next_position
+            if t1 is None or t1 <= t0:
+                return float(p0)
+        if t >= t1:
+            return float(p1)
+        return p0 + (t - t0) / (t1 - t0) * (p1 - p0)
+
+
+def _event_wait(event, timeout):
+    return event.wait(timeout)
+
+
+class StepperEngine:
+    """
+    Gibt Schritte nach einem vorab berechneten Zeitplan aus.
+    step/direction sind Ausgänge mit on()/off() (z.B. gpiozero DigitalOutputDevice).
+    wait(event, timeout) wartet auf das Stop-Event und liefert True, wenn es gesetzt
+    wurde - so endet eine Fahrt sofort und nicht erst beim nächsten Schritt.
+    """
+    def __init__(self, step, direction, steps_per_rev=1600, rotation_distance=3.125,
+                 clock=time.perf_counter, sleep=time.sleep, spin=0.0002, metrics=None,
+                 wait=_event_wait):
+        self.step = step
+        self.wait = wait
+        self.metrics = metrics
+        self.direction = direction
+        self.steps_per_rev = steps_per_rev
+        self.rotation_distance = rotation_distance  # mm pro Umdrehung
+        self.clock = clock
+        self.sleep = sleep
+        self.spin = spin  # letzte Zeitspanne vor einer Deadline wird aktiv gewartet
+        self.position_steps = 0
+        self.timeline = StepTimeline()
+        self.timeline.clear(clock(), 0)
+        self.busy = False
+        self.late_steps = 0      # Schritte, die mehr als 0.5 ms zu spät kamen
+        self.max_lateness = 0.0  # größte Verspätung der letzten Fahrt in s
+        # Mindestzeiten für den Treiber, siehe STEP_HIGH_MIN usw.
+        self.step_high_min = STEP_HIGH_MIN
+        self.step_low_min = STEP_LOW_MIN
+        self.dir_setup_min = DIR_SETUP_MIN
+
+    @property
+    def mm_per_step(self):
+        return self.rotation_distance / self.steps_per_rev
+
+    @property
+    def position_mm(self):
+        return self.position_steps * self.mm_per_step
+
+    def reset_position(self):
+        self.position_steps = 0
+        self.timeline.clear(self.clock(), 0)
+
+    def move_mm(self, mm, speed, accel=None, stop_event=None, profile=trapezoid_profile):
+        """
+        Fährt mm Millimeter mit speed (mm/s). accel in mm/s², None = ohne Rampe.
+        Gibt die Anzahl der tatsächlich gefahrenen Schritte zurück.
+        """
+        steps = int(mm / self.mm_per_step)
+        v = speed / self.mm_per_step
+        if accel:
+            schedule = profile(abs(steps), v, accel / self.mm_per_step)
+        else:
+            schedule = constant_profile(abs(steps), v)
+        return self.run(schedule, 1 if steps >= 0 else -1, stop_event)
+
+    def run(self, schedule, direction=1, stop_event=None):
+        """Gibt die Schritte zu den Zeiten in schedule (s ab Start) aus."""
+        if direction > 0:
+            self.direction.on()
+        else:
+            self.direction.off()
+        _hold(self.dir_setup_min)
+        high_min = self.step_high_min
+        low_min = self.step_low_min
+        step_on = self.step.on
+        step_off = self.step.off
+        clock = self.clock
+        sleep = self.sleep
+        wait = self.wait if stop_event is not None else None
+        spin = self.spin
+        is_stopped = stop_event.is_set if stop_event is not None else (lambda: False)
+        timeline = self.timeline
+        record = timeline.record
+        metrics = self.metrics
+        record_lateness = metrics.step_lateness.record if metrics is not None else None
+        self.busy = True
+        self.late_steps = 0
+        self.max_lateness = 0.0
+        done = 0
+        try:
+            start = clock()
+            # Anker: bis zum ersten Schritt steht der Motor auf der alten Position
+            record(start, self.position_steps)
+            for offset in schedule:
+                if is_stopped():
+                    break
+                deadline = start + offset
+                timeline.next_time = deadline
+                timeline.next_position = self.position_steps + direction
+                remaining = deadline - clock()
+                while remaining > 0:
+                    if remaining > spin:
+                        if wait is None:
+                            sleep(remaining - spin)
+                        elif wait(stop_event, remaining - spin):
+                            break
+                    remaining = deadline - clock()
+                # Stop während des Wartens: der anstehende Schritt entfällt
+                if is_stopped():
+                    break
+                late = -remaining
+                if late > self.max_lateness:
+                    self.max_lateness = late
+                if record_lateness is not None:
+                    record_lateness(late)
+                if late > 0.0005:
+                    self.late_steps += 1
+                    if metrics is not None:
+                        metrics.step_deadline_misses += 1
+                step_on()
+                _hold(high_min)
+                step_off()
+                _hold(low_min)
+                self.position_steps += direction
+                record(deadline + late, self.position_steps)
+                done += 1
+        finally:
+            timeline.next_time = None
+            self.busy = False
+        return done
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Live-Daten der Maschine über TCP (asyncio), z.B. für Dashboards im lokalen Netz.
+
+Der Server liest nur den Ringpuffer im Shared Memory (service.SharedSampleRing)
+und die Dateien der laufenden Aufzeichnung. In der Erfassung oder im Motor
+läuft dafür kein Code, und der Server wartet nie auf einen Client.
+
+Protokoll: der Client schickt Textzeilen, der Server antwortet mit Binär-Frames.
+  LIVE [n]     -> laufend Frames mit neuen Messwerten (jeder n-te, Standard 1)
+  FETCH <ab>   -> ein Frame mit den aufgezeichneten Werten des aktuellen Versuchs ab Index <ab>
+Frame: Kopf FRAME (b"ZP", Typ, Status, Index des ersten Werts, Anzahl, Dezimierung),
+danach Anzahl x (Zeit s, Kraft N, Position mm) als little-endian float64.
+Status: Bit 0 Versuch läuft, Bit 1 Motor fährt, Bit 2 Aufzeichnung vollständig.
+
+Langsame Clients: Ist der Sendepuffer eines Clients über high_water, wird sein
+Batch übersprungen und die Dezimierung verdoppelt (bis max_decimation), leert
+er sich wieder, wird sie halbiert.
+"""
+import asyncio
+import os
+import socket
+import struct
+import threading
+
+import numpy as np
+
+from recorder import load_recording
+
+FRAME = struct.Struct("<2sBBqIH")
+LIVE = 1
+RECORDED = 2
+RUNNING = 1
+MOVING = 2
+COMPLETE = 4
+
+
+def pack_frame(kind, status, first, block, decimation=1):
+    """block: float64-Array der Form (n, 3) mit Zeit, Kraft, Position."""
+    return FRAME.pack(b"ZP", kind, status, first, len(block), decimation) + block.astype("<f8").tobytes()
+
+
+def read_frame_header(data):
+    """(Typ, Status, erster Index, Anzahl, Dezimierung) aus den ersten FRAME.size Bytes."""
+    magic, kind, status, first, n, decimation = FRAME.unpack(data[:FRAME.size])
+    if magic != b"ZP":
+        raise ValueError("kein Frame")
+    return kind, status, first, n, decimation
+
+
+class _Subscriber:
+    def __init__(self, writer, min_decimation=1):
+        self.writer = writer
+        self.min_decimation = max(1, min_decimation)
+        self.decimation = self.min_decimation
+        self.sent = 0     # gesendete Werte
+        self.skipped = 0  # übersprungene Werte (Batch wegen vollem Puffer ausgelassen)
+
+
+class StreamServer:
+    """
+    ring: Objekt mit count, read_since(seq) und status() wie service.SharedSampleRing.
+    recording: Funktion, die den Pfad der aktuellen Aufzeichnung (.rec) liefert oder None.
+    """
+    def __init__(self, ring, mm_per_step, recording=None, host="127.0.0.1", port=8765,
+                 interval=0.02, high_water=32 * 1024, max_decimation=64, fetch_limit=65536,
+                 send_buffer=16 * 1024):
+        self.ring = ring
+        self.mm_per_step = mm_per_step
+        self.recording = recording
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.high_water = high_water
+        self.max_decimation = max_decimation
+        self.fetch_limit = fetch_limit
+        # Kleiner Kernel-Sendepuffer: ein Rückstau zeigt sich früh im Transport
+        # (-> Dezimierung), statt sekundenalte Daten im Kernel zu puffern
+        self.send_buffer = send_buffer
+        self.subscribers = set()
+        self._writers = set()
+        self._producer = None
+        self.frames = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+
+    # ------------------------------------------
+    # Start/Stop: eigener Thread mit eigener Event-Loop
+    # ------------------------------------------
+    def start(self):
+        """Startet den Server im Hintergrund und kehrt zurück, sobald er lauscht."""
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+            self._thread.join(5.0)
+
+    async def _shutdown(self):
+        self._server.close()
+        self._producer.cancel()
+        # Verbindungen schließen, die Handler enden dann von selbst
+        for writer in list(self._writers):
+            writer.close()
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        if tasks:
+            await asyncio.wait(tasks, timeout=1.0)
+        self._loop.stop()
+
+    def _run(self, ready):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._producer = self._loop.create_task(self._produce())
+        ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    # ------------------------------------------
+    # Live-Daten: ein Batch pro interval an alle Abonnenten
+    # ------------------------------------------
+    async def _produce(self):
+        ring = self.ring
+        seq = ring.count
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.subscribers:
+                seq = ring.count
+                continue
+            end, items, _ = ring.read_since(seq)
+            if not items:
+                continue
+            first = end - len(items)
+            seq = end
+            self.publish(first, items)
+
+    def publish(self, first, items):
+        """Verteilt einen Batch (t, roh, kraft, schritte) an alle Abonnenten, ohne zu warten."""
+        data = np.array(items, dtype=float)
+        block = np.empty((len(data), 3))
+        block[:, 0] = data[:, 0]
+        block[:, 1] = data[:, 2]
+        block[:, 2] = data[:, 3] * self.mm_per_step
+        index = np.arange(first, first + len(data))
+        _, _, _, testing, busy = self.ring.status()
+        status = (RUNNING if testing else 0) | (MOVING if busy else 0)
+        frames = {}
+        for sub in list(self.subscribers):
+            transport = sub.writer.transport
+            if transport.is_closing():
+                self.subscribers.discard(sub)
+                continue
+            if transport.get_write_buffer_size() > self.high_water:
+                # Client kommt nicht hinterher: Batch auslassen, künftig weniger Werte
+                sub.skipped += len(block)
+                sub.decimation = min(sub.decimation * 2, self.max_decimation)
+                continue
+            if sub.decimation > sub.min_decimation and transport.get_write_buffer_size() < self.high_water // 4:
+                sub.decimation //= 2
+            d = sub.decimation
+            frame = frames.get(d)
+            if frame is None:
+                rows = block if d == 1 else block[index % d == 0]
+                start = first if d == 1 else first + (-first) % d
+                frame = frames[d] = (pack_frame(LIVE, status, start, rows, d), len(rows))
+            sub.writer.write(frame[0])
+            sub.sent += frame[1]
+            self.frames += 1
+
+    # ------------------------------------------
+    # Verbindungen und Befehle
+    # ------------------------------------------
+    async def _handle(self, reader, writer):
+        sub = None
+        self._writers.add(writer)
+        sock = writer.get_extra_info("socket")
+        if sock is not None and self.send_buffer:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode(errors="replace").split()
+                if not parts:
+                    continue
+                command = parts[0].upper()
+                if command == "LIVE":
+                    if sub is None:
+                        sub = _Subscriber(writer, int(parts[1]) if len(parts) > 1 else 1)
+                        self.subscribers.add(sub)
+                elif command == "FETCH":
+                    offset = int(parts[1]) if len(parts) > 1 else 0
+                    frame = await asyncio.get_running_loop().run_in_executor(None, self.read_recorded, offset)
+                    writer.write(frame)
+                    await writer.drain()
+                elif command == "QUIT":
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            if sub is not None:
+                self.subscribers.discard(sub)
+            self._writers.discard(writer)
+            writer.close()
+
+    def read_recorded(self, offset):
+        """Frame mit den sicher geschriebenen Werten der aktuellen Aufzeichnung ab offset."""
+        path = self.recording() if self.recording is not None else None
+        if not path or not os.path.exists(os.path.join(path, "manifest.json")):
+            return pack_frame(RECORDED, 0, offset, np.empty((0, 3)))
+        columns, manifest = load_recording(path)
+        end = min(manifest["count"], offset + self.fetch_limit)
+        offset = min(offset, end)
+        mm_per_step = manifest["metadata"].get("mm_per_step", self.mm_per_step)
+        block = np.empty((end - offset, 3))
+        block[:, 0] = columns["time"][offset:end]
+        block[:, 1] = columns["force"][offset:end]
+        block[:, 2] = columns["steps"][offset:end] * mm_per_step
+        status = COMPLETE if manifest["complete"] and end == manifest["count"] else 0
+        return pack_frame(RECORDED, status, offset, block)
+
+
+async def read_frame(reader):
+    """Liest einen Frame (für Clients): (Typ, Status, erster Index, Dezimierung, Array (n, 3))."""
+    head = await reader.readexactly(FRAME.size)
+    kind, status, first, n, decimation = read_frame_header(head)
+    body = await reader.readexactly(n * 24)
+    return kind, status, first, decimation, np.frombuffer(body, dtype="<f8").reshape(n, 3)
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Maschinensteuerung ohne GUI: Erfassung, Filter, Aufzeichnung, Bruch-Erkennung
+und Motor. Die Hardware wird von außen übergeben, damit dieselbe Logik auf
+dem Pi (from_gpio) und in der Simulation (simulation.py) läuft.
+"""
+import os
+import threading
+import time
+
+from acquisition import RingBuffer, ContinuousAcquisition
+from stepper import StepperEngine
+from display import DisplayModel
+from recorder import Recorder, export_csv
+from filters import FilterChain, SpikeFilter
+from fracture import BreakDetector
+from calibration import WindowAverage, ProfileStore, LoadCellProfile, fit_profile
+from metrics import Metrics
+from catalog import Catalog
+from program import ProgramRunner
+
+# Zeitabstand der Werte, zwischen denen kraft_abfall_grenze gilt (wie früher der 150-ms-Logger)
+KRAFT_ABFALL_ZEIT = 0.15
+
+
+class Zugpruefmaschine:
+    def __init__(self, hx, step, direction, enable=None, clock=time.perf_counter,
+                 sleep=time.sleep, spin=0.0002, profiles=None, catalog=None, **motor_options):
+        self.hx = hx
+        self.clock = clock
+        # Ergebniskatalog (catalog.py): Ergebnisse werden am Versuchsende nachgetragen
+        self.catalog = catalog
+        # Zähler und Histogramme aus Erfassung, Motor und Aufzeichnung
+        self.metrics = Metrics()
+
+        # Rohwerte werden per DOUT-Flanke erfasst und landen im Ringpuffer
+        self.samples = RingBuffer(size=4096)
+        self.acquisition = ContinuousAcquisition(hx, self.samples, clock=clock, metrics=self.metrics)
+
+        # Kalibrierung (N pro Digit) aus einem Kraftaufnehmer-Profil, siehe calibration.py
+        self.profiles = profiles
+        self.profile = None
+        self.scale = None
+        self.apply_profile(profiles.get() if profiles is not None else LoadCellProfile("Standard"))
+        # Laufende Tarierung/Kalibriermessung, wird vom Sensor-Thread mit Rohwerten gefüttert
+        self._averaging = None
+        self.tare_status = ""
+        self.calibration_points = []
+
+        # Kraftwerte
+        self.current_force = 0.0
+        self.max_force_value = 0.0
+        # Threads schreiben nur ins Model, gerendert wird im Tk-Takt
+        self.display = DisplayModel()
+
+        # Kraftfilter: Stufen aus filters.py, z.B. zusätzlich MedianFilter(5) oder EmaFilter(0.3)
+        self.force_filter = FilterChain(SpikeFilter(threshold=15.0, tolerance=2.0))
+
+        # Schrittmotor
+        self.step = step
+        self.dir = direction
+        self.enable = enable
+        self.steps_per_rev = 1600
+        self.rotation_distance = 3.125  # mm pro Umdrehung
+        self.jog_frequency = 853        # Schritte/s beim Verfahren
+        self.jog_accel = 4000           # Schritte/s² beim Verfahren
+        # Position wird als Schrittzähler im Motor geführt (self.motor.position_mm)
+        self.motor = StepperEngine(step, direction, self.steps_per_rev, self.rotation_distance,
+                                   clock=clock, sleep=sleep, spin=spin, metrics=self.metrics,
+                                   **motor_options)
+        self.motion_thread = None
+
+        # Versuchsparameter
+        # Bruch-Erkennung bei jedem Messwert. kraft_abfall_grenze behält ihre bisherige
+        # Bedeutung (Abfall zwischen zwei Werten im Abstand von KRAFT_ABFALL_ZEIT) und
+        # ist deren Kriterium "rate", abfall_vom_maximum das Kriterium "drop"
+        window = max(2, round(KRAFT_ABFALL_ZEIT / self.acquisition.period))
+        self.break_detector = BreakDetector(window=window)
+        self.kraft_abfall_grenze = 0
+        # Prüfprogramme schalten sie z.B. beim Entlasten ab (program.py)
+        self.detect_break = True
+        self.zuglaenge = 5
+        self.feed_rate = 5
+
+        # Prozess-Flags
+        self.is_testing = False
+        self.process_stop_event = threading.Event()
+        self.jog_stop_event = threading.Event()
+        self.stop_requested = False  # Stop vom Bediener (nicht Bruch oder Kraft-Trigger)
+        self.process_thread = None
+        self.logfile_name = None
+
+        # Aufzeichnung aller Messwerte während eines Versuchs
+        self.recorder = None
+        # Wartezeit des Recorders auf einen freien Puffer: an der Maschine 0 (lieber
+        # Werte verwerfen als die Bruch-Erkennung aufhalten), in virtueller Zeit länger
+        self.recorder_wait = 0.0
+        # Optional: publisher(t, raw, kraft, schritte) bekommt jeden Messwert (z.B. service.py)
+        self.publisher = None
+        # Während eines Prüfprogramms: observer(t, kraft, schritte) für Trigger und Zyklus-Kennwerte
+        self.observer = None
+
+        self.stop_event = threading.Event()
+        self.sensor_thread = None
+        self._seq = 0
+
+        # Aufbau der Geräte (from_gpio), Anzeige über device_status()
+        self.devices = {}
+        self.started_at = None
+
+    @property
+    def kraft_abfall_grenze(self):
+        """Abbruch, wenn die Kraft innerhalb von KRAFT_ABFALL_ZEIT um so viele N fällt (0 = aus)."""
+        return self._kraft_abfall_grenze
+
+    @kraft_abfall_grenze.setter
+    def kraft_abfall_grenze(self, value):
+        detector = self.break_detector
+        self._kraft_abfall_grenze = value
+        detector.rate = value / (detector.window * self.acquisition.period)
+
+    @property
+    def abfall_vom_maximum(self):
+        """Abbruch, wenn die Kraft um so viele N unter das bisherige Maximum fällt (0 = aus)."""
+        return self.break_detector.drop
+
+    @abfall_vom_maximum.setter
+    def abfall_vom_maximum(self, value):
+        self.break_detector.drop = value
+
+    @classmethod
+    def from_gpio(cls, report=None):
+        """
+        Baut die Maschine mit der echten Hardware am Pi auf. Das aktive
+        Kraftaufnehmer-Profil wird geladen, tariert wird mit den ersten Messwerten.
+        report(gerät, text) meldet den Aufbau pro Gerät (z.B. an die GUI), ein
+        Fehler wird gemeldet und weitergereicht. Ob der HX711 wirklich Daten
+        liefert, zeigt erst device_status() nach start().
+        """
+        report = report or (lambda device, text: None)
+        devices = {}
+
+        def bring_up(device, build):
+            report(device, "startet...")
+            try:
+                result = build()
+            except Exception as e:
+                report(device, f"Fehler: {e}")
+                raise
+            devices[device] = "ok"
+            report(device, "ok")
+            return result
+
+        def build_hx711():
+            from HX711 import HX711, FastBackend
+            return HX711(dout_pin=5, sck_pin=6, readings=1, backend=FastBackend)
+
+        def build_motor():
+            # STEP 18, DIR 19, ENABLE 26. Mindest-Pulsbreite und DIR-Vorlauf:
+            # stepper.STEP_HIGH_MIN, STEP_LOW_MIN, DIR_SETUP_MIN
+            from gpiozero import DigitalOutputDevice
+            return [DigitalOutputDevice(pin, active_high=True, initial_value=False) for pin in (18, 19, 26)]
+
+        hx = bring_up("HX711", build_hx711)
+        step, direction, enable = bring_up("Motor", build_motor)
+        profiles = bring_up("Profil", ProfileStore)
+        machine = cls(hx, step, direction, enable, profiles=profiles, catalog=Catalog())
+        machine.devices = devices
+        machine.tare()
+        return machine
+
+    @property
+    def profile_name(self):
+        return self.profile.name
+
+    def apply_profile(self, profile):
+        """Übernimmt die Kalibrierung eines Profils (der Nullpunkt kommt aus der Tarierung)."""
+        self.profile = profile
+        self.scale = profile.scale
+        self.hx.set_reference_unit(1 / profile.scale)
+        if not self.hx.offset:
+            self.hx.offset = profile.zero
+
+    def start(self):
+        """Startet die Erfassung und den Sensor-Thread."""
+        self.started_at = self.clock()
+        self.acquisition.start()
+        self.sensor_thread = threading.Thread(target=self.update_force_loop, daemon=True)
+        self.sensor_thread.start()
+
+    def device_status(self, timeout=0.5):
+        """
+        Zustand pro Gerät als {gerät: text}: der Aufbau aus from_gpio, dazu ob
+        der HX711 seit start() Messwerte liefert (nach timeout s ohne Wert:
+        "keine Daten", z.B. Wägezelle nicht angeschlossen).
+        """
+        status = dict(self.devices)
+        if self.started_at is not None:
+            if self.samples.count:
+                status["HX711"] = "ok"
+            elif self.clock() - self.started_at > timeout:
+                status["HX711"] = "keine Daten"
+            else:
+                status["HX711"] = "warte auf Daten"
+        return status
+
+    def shutdown(self):
+        self.stop_event.set()
+        self.process_stop_event.set()
+        self.acquisition.stop()
+
+    # ------------------------------------------
+    # Sensor-Thread: Holt neue Werte aus dem Ringpuffer (80 Hz) und wendet den Filter an
+    # ------------------------------------------
+    def update_force_loop(self):
+        self._seq = self.samples.count
+        while not self.stop_event.is_set():
+            if not self.samples.wait(self._seq, timeout=0.05):
+                # Keine Flanke gesehen (evtl. verpasst) -> DOUT direkt prüfen
+                self.metrics.timeouts += 1
+                averaging = self._averaging
+                if averaging is not None and averaging.expire(self.clock()):
+                    self._averaging = None
+                self.acquisition.kick()
+                continue
+            self.process_pending()
+
+    def process_pending(self):
+        """Verarbeitet alle neuen Werte im Ringpuffer."""
+        self._seq, samples, _ = self.samples.read_since(self._seq)
+        self.metrics.backlog.record(len(samples))
+        for t, raw_value in samples:
+            self.process_sample(t, raw_value)
+
+    def process_sample(self, t, raw_value):
+        averaging = self._averaging
+        if averaging is not None and averaging.add(t, raw_value):
+            self._averaging = None
+        force = (raw_value - self.hx.offset) * self.scale
+        # Filterung: neuer Wert wird durch den Filter verarbeitet.
+        filtered_force = self.force_filter.update(force)
+        self.current_force = filtered_force
+        if filtered_force > self.max_force_value:
+            self.max_force_value = filtered_force
+        self.display.publish_force(filtered_force, self.max_force_value)
+        recorder = self.recorder
+        publisher = self.publisher
+        testing = self.is_testing
+        if recorder is None and publisher is None and not testing:
+            return
+        # Position zum Zeitpunkt des Messwerts, nicht zum Zeitpunkt der Verarbeitung
+        steps = self.motor.timeline.position_at(t)
+        if publisher is not None:
+            publisher(t, raw_value, filtered_force, steps)
+        if recorder is not None:
+            recorder.append(t, raw_value, filtered_force, steps)
+        if testing:
+            # Bruch -> Stop-Event, der Motor wartet darauf und hält sofort an
+            if self.detect_break and self.break_detector.update(t, filtered_force):
+                self.process_stop_event.set()
+            observer = self.observer
+            if observer is not None:
+                observer(t, filtered_force, steps)
+
+    # ------------------------------------------
+    # Tarierung und Kalibrierung aus dem Messwertstrom (blockiert nicht)
+    # ------------------------------------------
+    def _start_averaging(self, window, trim, on_done):
+        if self._averaging is not None or self.is_testing:
+            return None
+        averaging = WindowAverage(self.clock(), window, trim, self.acquisition.period, on_done=on_done)
+        self._averaging = averaging
+        return averaging
+
+    def tare(self, window=16, trim=0.25):
+        """
+        Startet die Tarierung über die nächsten window Messwerte und kehrt sofort zurück.
+        Liefert die laufende Messung (done-Event) oder None, wenn gerade nicht möglich.
+        Spätestens nach 2 * window Wandlungsperioden ist sie abgeschlossen.
+        """
+        averaging = self._start_averaging(window, trim, self._finish_tare)
+        if averaging is not None:
+            self.tare_status = "Tariere..."
+        return averaging
+
+    def _finish_tare(self, averaging):
+        if averaging.ok:
+            self.hx.offset = averaging.result
+            self.max_force_value = 0.0
+            self.display.max_force = 0.0
+            self.tare_status = f"Tariert ({len(averaging.values)} Werte)"
+        else:
+            self.tare_status = "Tarierung fehlgeschlagen (keine Messwerte)"
+
+    def capture_calibration_point(self, force, window=40, trim=0.25):
+        """Nimmt einen Kalibrierpunkt auf: Rohwert-Mittel bei bekannter Kraft in N."""
+        def done(averaging):
+            if averaging.ok:
+                self.calibration_points.append((averaging.result, force))
+        return self._start_averaging(window, trim, done)
+
+    def calibrate(self, name):
+        """Ausgleichsgerade durch die aufgenommenen Punkte, als Profil speichern und aktivieren."""
+        profile = fit_profile(name, self.calibration_points)
+        if self.profiles is not None:
+            self.profiles.put(profile)
+        self.apply_profile(profile)
+        self.calibration_points = []
+        return profile
+
+    # ------------------------------------------
+    # Motorsteuerung
+    # ------------------------------------------
+    def move_by(self, mm):
+        # Fahrt läuft im eigenen Thread, die Anzeige holt sich die Position selbst
+        if self.motor.busy or self.is_testing:
+            return
+        mm_per_step = self.motor.mm_per_step
+        self.jog_stop_event.clear()
+        self.motion_thread = threading.Thread(
+            target=self.motor.move_mm,
+            args=(mm, self.jog_frequency * mm_per_step, self.jog_accel * mm_per_step),
+            kwargs={"stop_event": self.jog_stop_event},
+            daemon=True)
+        self.motion_thread.start()
+
+    def stop(self):
+        """Hält Versuch und Verfahrbewegung an."""
+        self.stop_requested = True
+        self.process_stop_event.set()
+        self.jog_stop_event.set()
+
+    def reset_position(self):
+        if self.motor.busy:
+            return
+        self.motor.reset_position()
+
+    def return_to_zero(self):
+        self.move_by(-self.motor.position_mm)
+
+    # ------------------------------------------
+    # Versuch
+    # ------------------------------------------
+    def start_test(self, logfile_name):
+        """Startet den Zugversuch im eigenen Thread. False, wenn die Maschine belegt ist."""
+        if not self.prepare_test():
+            return False
+        self.process_thread = threading.Thread(target=self.run_test, args=(logfile_name,), daemon=True)
+        self.process_thread.start()
+        return True
+
+    def prepare_test(self):
+        if self.is_testing or self.motor.busy:
+            return False
+        self.max_force_value = 0.0
+        self.display.max_force = 0.0
+        self.motor.reset_position()
+        self.metrics.reset(hx=self.hx, force_filter=self.force_filter)
+        self.break_detector.reset()
+        self.detect_break = True
+        self.stop_requested = False
+        self.is_testing = True
+        self.process_stop_event.clear()
+        return True
+
+    def start_program(self, program, logfile_name):
+        """Startet ein Prüfprogramm (program.Program) im eigenen Thread. False, wenn belegt."""
+        if not self.prepare_test():
+            return False
+        runner = ProgramRunner(self, program)
+        self.process_thread = threading.Thread(target=runner.run, args=(logfile_name,), daemon=True)
+        self.process_thread.start()
+        return True
+
+    def test_results(self, t_start, stop_reason=None):
+        """Kennwerte des letzten Versuchs für den Ergebniskatalog."""
+        detector = self.break_detector
+        break_position = None
+        if detector.trigger_time is not None:
+            break_position = self.motor.timeline.position_at(detector.trigger_time) * self.motor.mm_per_step
+        if stop_reason is None:
+            stop_reason = detector.reason or ("stop" if self.stop_requested else "done")
+        return {
+            "max_force": self.max_force_value,
+            "break_position": break_position,
+            "duration": self.clock() - t_start,
+            "stop_reason": stop_reason,
+        }
+
+    def record_results(self, logfile_name, t_start, stop_reason=None):
+        if self.catalog is not None:
+            results = self.test_results(t_start, stop_reason)
+            status = "failed" if results["stop_reason"] == "error" else "done"
+            self.catalog.finish(logfile_name, status, **results)
+
+    def metrics_summary(self):
+        return self.metrics.summary(hx=self.hx, force_filter=self.force_filter)
+
+    def run_test(self, logfile_name):
+        """Führt den Zugversuch aus (blockierend) und zeichnet alle Messwerte auf."""
+        feed = self.feed_rate  # mm/min
+        t_start = self.clock()
+        self.logfile_name = logfile_name
+        self.display.logfile = os.path.basename(logfile_name)
+        stop_event = self.process_stop_event
+        # Binäre Aufzeichnung neben dem CSV, das CSV wird nach dem Versuch exportiert
+        recording = os.path.splitext(logfile_name)[0] + ".rec"
+        recorder = None
+        try:
+            recorder = Recorder(recording, metadata={
+                "feed_rate": feed,
+                "zuglaenge": self.zuglaenge,
+                "kraft_abfall_grenze": self.kraft_abfall_grenze,
+                "abfall_vom_maximum": self.abfall_vom_maximum,
+                "break_detection": self.break_detector.settings(),
+                "mm_per_step": self.motor.mm_per_step,
+                "profile": self.profile.name,
+            }, metrics=self.metrics, wait=self.recorder_wait)
+            self.recorder = recorder
+            # Konstanter Vorschub ohne Rampe, Schrittzeiten gegen absolute Deadlines
+            self.motor.move_mm(self.zuglaenge, feed / 60, stop_event=stop_event)
+            stop_event.set()
+        finally:
+            self.recorder = None
+            self.finish_test(logfile_name, t_start, recorder)
+
+    def finish_test(self, logfile_name, t_start, recorder=None, stop_reason=None, extra=()):
+        """
+        Nachbereitung am Versuchsende: Aufzeichnung abschließen, CSV exportieren,
+        Messgrößen neben das Logfile, Ergebnisse in den Katalog. Jeder Schritt
+        läuft für sich, ein Fehler (volle Platte, gesperrter Katalog) verhindert
+        die übrigen nicht und wird im Logfile-Feld der Anzeige gemeldet.
+        is_testing wird in jedem Fall zurückgesetzt. Gibt die Fehler zurück.
+        extra: weitere Schritte (Name, Funktion) davor, z.B. Zyklus-Datei (program.py).
+        """
+        base = os.path.splitext(logfile_name)[0]
+        steps = list(extra)
+        if recorder is not None:
+            steps.append(("Aufzeichnung", recorder.finalise))
+            # Nach einem Schreibfehler exportiert das CSV den sicher geschriebenen Teil
+            steps.append(("CSV", lambda: export_csv(recorder.path, logfile_name, self.motor.mm_per_step)))
+        steps.append(("Messgrößen", lambda: self.metrics.dump(
+            base + ".metrics.json", hx=self.hx, force_filter=self.force_filter)))
+        steps.append(("Katalog", lambda: self.record_results(logfile_name, t_start, stop_reason)))
+        errors = []
+        try:
+            for name, step in steps:
+                try:
+                    step()
+                except Exception as e:
+                    errors.append(f"{name}: {e}")
+            if errors:
+                self.display.logfile = f"{os.path.basename(logfile_name)} - Fehler: {'; '.join(errors)}"
+        finally:
+            self.is_testing = False
+        return errors